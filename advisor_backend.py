@@ -0,0 +1,63 @@
+"""
+Giao diện chung của các backend tư vấn tài chính.
+
+- ai_advisor.AIAdvisor: Google Gemini (mất phí, vài giây mỗi câu trả lời)
+- local_advisor.LocalAdvisor: bộ quy tắc offline, tất định, trả lời tức thì
+- ai_client.FallbackAdvisor: dùng Gemini, lỗi/bị giới hạn thì chuyển sang LocalAdvisor
+
+Các hàm trả về dict luôn có ``success``; lỗi không ném ra ngoài mà trả
+``{'success': False, 'error': ...}`` để caller (hoặc FallbackAdvisor) quyết định.
+Backend con phải cài đủ các phương thức abstract - thiếu thì lỗi ngay khi khởi tạo.
+"""
+from abc import ABC, abstractmethod
+from typing import Any, Dict, Iterator, List, Optional, Tuple
+
+
+class AdvisorBackend(ABC):
+    """Backend tư vấn; ``source`` xuất hiện trong kết quả để biết câu trả lời từ đâu"""
+
+    source = 'base'
+
+    def probe(self) -> bool:
+        """Kiểm tra backend có dùng được không"""
+        return True
+
+    @abstractmethod
+    def analyze_financial_health(self, data: Dict[str, Any], refresh: bool = False) -> Dict[str, Any]:
+        """{'success', 'analysis', 'raw_data', 'cached'}"""
+
+    @abstractmethod
+    def suggest_savings_plan(self, goal: Dict[str, Any], financial_data: Dict[str, Any],
+                             refresh: bool = False) -> Dict[str, Any]:
+        """{'success', 'plan', 'goal', 'cached'}"""
+
+    @abstractmethod
+    def suggest_savings_plans(self, goals: List[Dict[str, Any]], financial_data: Dict[str, Any],
+                              refresh: bool = False) -> Dict[str, Any]:
+        """{'success', 'plans': [{'goal_id', 'monthly_amount', 'plan'}], 'missing', 'cached'}"""
+
+    @abstractmethod
+    def ask(self, question: str, context: Optional[Dict] = None, refresh: bool = False) -> Dict[str, Any]:
+        """{'success', 'answer'}"""
+
+    def quick_advice(self, question: str, context: Optional[Dict] = None, refresh: bool = False) -> str:
+        """Câu trả lời dạng chuỗi (lỗi thì trả thông báo lỗi)"""
+        result = self.ask(question, context, refresh)
+        if result.get('success'):
+            return result['answer']
+        return f"Lỗi: {result.get('error')}"
+
+    def stream_analysis(self, data: Dict[str, Any], refresh: bool = False) -> Iterator[Tuple[str, bool]]:
+        """Yield (đoạn text, cached)"""
+        result = self.analyze_financial_health(data, refresh)
+        if not result.get('success'):
+            raise RuntimeError(result.get('error'))
+        yield result['analysis'], result.get('cached', False)
+
+    def stream_savings_plan(self, goal: Dict[str, Any], financial_data: Dict[str, Any],
+                            refresh: bool = False) -> Iterator[Tuple[str, bool]]:
+        """Yield (đoạn text, cached)"""
+        result = self.suggest_savings_plan(goal, financial_data, refresh)
+        if not result.get('success'):
+            raise RuntimeError(result.get('error'))
+        yield result['plan'], result.get('cached', False)
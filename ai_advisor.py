@@ -1,61 +1,478 @@
-import google.generativeai as genai
+import hashlib
+import json
+import logging
 import os
-from typing import Dict, Any, List, Optional
+import re
+import sqlite3
+import threading
+import time
+from typing import Callable, Dict, Any, List, Optional
 from datetime import datetime, timedelta
 from dotenv import load_dotenv
 
+import metrics
+from advisor_backend import AdvisorBackend
+from throttle import CallGuard, Throttled, is_quota_error
+
 load_dotenv()
+log = logging.getLogger(__name__)
+
+MODEL_NAME = 'gemini-3-flash-preview'
+
+# Tăng khi sửa nội dung prompt để các câu trả lời đã cache theo prompt cũ không còn được dùng
+PROMPT_VERSION = 2
+
+# Giới hạn độ dài (ký tự, ~4 ký tự/token) của phần bối cảnh gửi kèm quick_advice
+CONTEXT_BUDGET = int(os.getenv('AI_CONTEXT_BUDGET', '1200'))
+
+# Số mục tiêu tối đa trong một lời gọi tạo kế hoạch hàng loạt
+PLAN_BATCH_SIZE = int(os.getenv('AI_PLAN_BATCH_SIZE', '10'))
+
+# Các trường không xuất hiện trong prompt - bỏ khỏi khóa cache
+VOLATILE_KEYS = {'id', 'userId', 'createdAt', 'updatedAt'}
+
+
+def _normalize(value):
+    """Chuẩn hóa dữ liệu đầu vào trước khi hash: bỏ trường thừa, làm tròn số tiền"""
+    if isinstance(value, dict):
+        return {k: _normalize(v) for k, v in sorted(value.items()) if k not in VOLATILE_KEYS}
+    if isinstance(value, (list, tuple)):
+        return [_normalize(v) for v in value]
+    if isinstance(value, float):
+        return round(value)
+    if isinstance(value, str):
+        return ' '.join(value.split())
+    return value
+
+
+def _goal_priority(goal: Dict[str, Any], question: str):
+    """Mục tiêu được nhắc trong câu hỏi trước, rồi mục tiêu chưa xong có hạn gần nhất, còn thiếu nhiều"""
+    name = (goal.get('name') or '').lower()
+    mentioned = bool(name) and name in question
+    remaining = (goal.get('targetAmount') or 0) - (goal.get('currentAmount') or 0)
+    return (not mentioned, remaining <= 0, goal.get('deadline') or '9999', -remaining)
+
+
+def compact_context(data: Dict[str, Any], question: str = '', budget: int = None,
+                    max_goals: int = 5, top_categories: int = 5) -> str:
+    """
+    Tóm tắt dữ liệu get_financial_data_for_ai thành vài dòng gọn cho prompt:
+    số tổng, top danh mục, tối đa ``max_goals`` mục tiêu liên quan nhất (không lặp
+    savings_goals/other_goals, không kèm id/timestamp), cắt theo ``budget`` ký tự.
+    """
+    budget = CONTEXT_BUDGET if budget is None else budget
+    period = data.get('period_months', 1)
+    income = data.get('total_income', 0) or 0
+    expense = data.get('total_expense', 0) or 0
+    rate = (income - expense) / income * 100 if income > 0 else 0
+
+    lines = [
+        f"Thu nhập {period} tháng: {income:,.0f} VNĐ (TB {data.get('monthly_avg_income', 0):,.0f}/tháng)",
+        f"Chi tiêu {period} tháng: {expense:,.0f} VNĐ (TB {data.get('monthly_avg_expense', 0):,.0f}/tháng)",
+        f"Tỷ lệ tiết kiệm: {rate:.1f}%; tiết kiệm hiện có: {data.get('current_savings', 0):,.0f} VNĐ",
+    ]
+    for label, key in (('Chi nhiều nhất', 'expense_by_category'), ('Nguồn thu chính', 'income_by_category')):
+        by_category = data.get(key) or {}
+        top = sorted(by_category.items(), key=lambda item: item[1], reverse=True)[:top_categories]
+        if top:
+            lines.append(f"{label}: " + ', '.join(f'{name} {total:,.0f}' for name, total in top))
+
+    seen = set()
+    goals = []
+    for goal in (data.get('savings_goals') or []) + (data.get('other_goals') or []):
+        key = goal.get('id', id(goal))
+        if key not in seen:
+            seen.add(key)
+            goals.append(goal)
+    question = question.lower()
+    goals.sort(key=lambda g: _goal_priority(g, question))
+
+    goal_lines = []
+    for goal in goals[:max_goals]:
+        line = (f"- {goal.get('name', 'Mục tiêu')}: {goal.get('currentAmount', 0):,.0f}"
+                f"/{goal.get('targetAmount', 0):,.0f} VNĐ")
+        if goal.get('deadline'):
+            line += f", hạn {str(goal['deadline'])[:10]}"
+        goal_lines.append(line)
+    if goal_lines:
+        lines.append(f"Mục tiêu ({len(goals)}):")
+        lines.extend(goal_lines)
+
+    text = '\n'.join(lines)
+    if len(text) <= budget:
+        return text
+
+    # Vượt ngân sách: giữ các dòng đầu (số tổng quan trọng nhất), chừa chỗ cho dòng ghi chú
+    kept = []
+    size = len('... (bỏ 99 dòng)')
+    for line in lines:
+        if size + len(line) + 1 > budget:
+            break
+        kept.append(line)
+        size += len(line) + 1
+    kept.append(f"... (bỏ {len(lines) - len(kept)} dòng)")
+    return '\n'.join(kept)
+
+
+def parse_batch_plans(text: str, goal_ids) -> List[Dict[str, Any]]:
+    """
+    Đọc JSON ``{"plans": [{"goal_id", "monthly_amount", "plan"}]}`` từ câu trả lời model
+    (bỏ qua ```json fence / chữ thừa quanh JSON). Chỉ giữ phần tử có goal_id nằm trong
+    ``goal_ids`` và plan không rỗng. ValueError nếu không đọc được JSON.
+    """
+    start, end = text.find('{'), text.rfind('}')
+    if start < 0 or end < start:
+        raise ValueError('Câu trả lời không chứa JSON')
+    payload = json.loads(text[start:end + 1])
+    wanted = {str(goal_id) for goal_id in goal_ids}
+    plans = []
+    for item in payload.get('plans') or []:
+        if not isinstance(item, dict) or str(item.get('goal_id')) not in wanted:
+            continue
+        plan = str(item.get('plan') or '').strip()
+        if not plan:
+            continue
+        try:
+            monthly = float(item['monthly_amount']) if item.get('monthly_amount') is not None else None
+        except (TypeError, ValueError):
+            monthly = None
+        wanted.discard(str(item['goal_id']))
+        plans.append({'goal_id': item['goal_id'], 'monthly_amount': monthly, 'plan': plan})
+    return plans
+
+
+class ResponseCache:
+    """
+    Cache câu trả lời Gemini trên đĩa (SQLite), khóa = sha256 của dữ liệu đầu vào đã chuẩn hóa.
+    Hết hạn sau ``ttl`` giây; vượt ``max_entries`` thì xóa mục ít dùng gần đây nhất (LRU).
+    """
+
+    def __init__(self, path: str, ttl: int = 86400, max_entries: int = 500):
+        self.path = path
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+        cache_dir = os.path.dirname(path)
+        if cache_dir:
+            os.makedirs(cache_dir, exist_ok=True)
+        with self._connect() as conn:
+            conn.execute('''
+                CREATE TABLE IF NOT EXISTS AIResponse (
+                    key TEXT PRIMARY KEY,
+                    kind TEXT NOT NULL,
+                    response TEXT NOT NULL,
+                    createdAt REAL NOT NULL,
+                    lastUsed REAL NOT NULL,
+                    hits INTEGER NOT NULL DEFAULT 0
+                )
+            ''')
+            conn.execute('CREATE INDEX IF NOT EXISTS idx_airesponse_lastused ON AIResponse (lastUsed)')
+
+    @classmethod
+    def from_env(cls) -> Optional['ResponseCache']:
+        """AI_CACHE_PATH, AI_CACHE_TTL (giây, 0 = tắt cache), AI_CACHE_MAX_ENTRIES"""
+        ttl = int(os.getenv('AI_CACHE_TTL', '86400'))
+        if ttl <= 0:
+            return None
+        return cls(
+            os.getenv('AI_CACHE_PATH', 'prisma/ai_cache.db'),
+            ttl=ttl,
+            max_entries=int(os.getenv('AI_CACHE_MAX_ENTRIES', '500'))
+        )
 
-class AIAdvisor:
+    def _connect(self):
+        conn = sqlite3.connect(self.path, timeout=5)
+        conn.execute('PRAGMA journal_mode = WAL')
+        return conn
+
+    @staticmethod
+    def make_key(kind: str, *inputs, model: str = MODEL_NAME) -> str:
+        payload = [kind, model, PROMPT_VERSION, _normalize(list(inputs))]
+        raw = json.dumps(payload, sort_keys=True, default=str, separators=(',', ':'))
+        return hashlib.sha256(raw.encode('utf-8')).hexdigest()
+
+    def get(self, key: str) -> Optional[str]:
+        now = time.time()
+        conn = self._connect()
+        try:
+            with conn:
+                row = conn.execute(
+                    'UPDATE AIResponse SET lastUsed = ?, hits = hits + 1 '
+                    'WHERE key = ? AND createdAt > ? RETURNING response',
+                    (now, key, now - self.ttl)
+                ).fetchone()
+        finally:
+            conn.close()
+        with self._lock:
+            if row:
+                self.hits += 1
+            else:
+                self.misses += 1
+        return row[0] if row else None
+
+    def set(self, key: str, kind: str, response: str):
+        now = time.time()
+        conn = self._connect()
+        try:
+            with conn:
+                conn.execute(
+                    'INSERT OR REPLACE INTO AIResponse (key, kind, response, createdAt, lastUsed) '
+                    'VALUES (?, ?, ?, ?, ?)',
+                    (key, kind, response, now, now)
+                )
+                conn.execute('DELETE FROM AIResponse WHERE createdAt <= ?', (now - self.ttl,))
+                conn.execute('''
+                    DELETE FROM AIResponse WHERE key IN (
+                        SELECT key FROM AIResponse ORDER BY lastUsed DESC LIMIT -1 OFFSET ?
+                    )
+                ''', (self.max_entries,))
+        finally:
+            conn.close()
+
+    def clear(self):
+        conn = self._connect()
+        try:
+            with conn:
+                conn.execute('DELETE FROM AIResponse')
+        finally:
+            conn.close()
+
+    def stats(self) -> Dict[str, Any]:
+        conn = self._connect()
+        try:
+            entries = conn.execute('SELECT COUNT(*) FROM AIResponse').fetchone()[0]
+        finally:
+            conn.close()
+        with self._lock:
+            hits, misses = self.hits, self.misses
+        total = hits + misses
+        return {
+            'entries': entries,
+            'hits': hits,
+            'misses': misses,
+            'hit_ratio': round(hits / total, 4) if total else 0.0,
+        }
+
+class _FakeChunk:
+    def __init__(self, text: str):
+        self.text = text
+
+
+class FakeModel:
+    """
+    Model giả lập chạy offline (AI_FAKE_MODEL=1): câu trả lời cố định, hỗ trợ stream=True
+    như Gemini. Mỗi đoạn trễ AI_FAKE_DELAY giây (mặc định 0.05) để mô phỏng sinh token.
+    """
+
+    name = 'fake'
+
+    ANSWER = (
+        "📊 Đánh giá nhanh (model giả lập)\n"
+        "1. Thu nhập và chi tiêu đã được ghi nhận đầy đủ.\n"
+        "2. Nên duy trì tỷ lệ tiết kiệm 20-30% thu nhập mỗi tháng.\n"
+        "3. Ưu tiên quỹ dự phòng 3-6 tháng chi tiêu trước các mục tiêu khác.\n"
+        "💡 Hành động: đặt lịch chuyển tiền tiết kiệm tự động ngay sau ngày nhận lương.\n"
+    )
+
+    def __init__(self, delay: Optional[float] = None):
+        self.delay = float(os.getenv('AI_FAKE_DELAY', '0.05')) if delay is None else delay
+
+    def generate_content(self, prompt: str, stream: bool = False):
+        if '"plans"' in prompt:
+            # Prompt kế hoạch hàng loạt: trả JSON một kế hoạch cho mỗi [id=N]
+            plans = [{'goal_id': int(goal_id), 'monthly_amount': 1000000, 'plan': self.ANSWER.strip()}
+                     for goal_id in re.findall(r'\[id=(\d+)\]', prompt)]
+            time.sleep(self.delay)
+            return _FakeChunk(json.dumps({'plans': plans}, ensure_ascii=False))
+        words = (self.ANSWER + f"(prompt: {len(prompt)} ký tự)").split(' ')
+        chunks = [' '.join(words[i:i + 4]) + ' ' for i in range(0, len(words), 4)]
+        if stream:
+            return self._stream(chunks)
+        time.sleep(self.delay * len(chunks))
+        return _FakeChunk(''.join(chunks))
+
+    def _stream(self, chunks):
+        for chunk in chunks:
+            time.sleep(self.delay)
+            yield _FakeChunk(chunk)
+
+
+class AIAdvisor(AdvisorBackend):
     """AI Financial Advisor sử dụng Google Gemini"""
+
+    source = 'gemini'
     
     def __init__(self):
-        print("=" * 60)
-        print("🤖 Đang khởi tạo AI Advisor...")
+        log.info("Đang khởi tạo AI Advisor...")
+
+        if os.getenv('AI_FAKE_MODEL') == '1':
+            # Model giả lập chạy offline (dev/test/load test) - không cần API key
+            self.model = FakeModel()
+            self.model_name = FakeModel.name
+            log.info("Dùng model giả lập (AI_FAKE_MODEL=1)")
+        else:
+            self._init_gemini()
         
+        # Cache câu trả lời - lần phân tích lặp lại với cùng số liệu không gọi API
+        self.cache = ResponseCache.from_env()
+        if self.cache:
+            log.info("AI response cache: %s (TTL %ss)", self.cache.path, self.cache.ttl)
+
+        # Gộp prompt trùng đang chạy, rate limit và giới hạn số lời gọi đồng thời tới Gemini
+        self.guard = CallGuard(
+            rate_per_min=float(os.getenv('AI_RATE_PER_MIN', '60')),
+            burst=int(os.getenv('AI_BURST', '10')),
+            max_concurrency=int(os.getenv('AI_MAX_CONCURRENCY', '4')),
+            max_wait=float(os.getenv('AI_MAX_WAIT', '10')),
+            quota_cooldown=float(os.getenv('AI_QUOTA_COOLDOWN', '30'))
+        )
+
+    def _init_gemini(self):
+        """Cấu hình Gemini (không gọi API - xem probe())"""
+        # Import ở đây: google.generativeai nặng, chỉ nạp khi thực sự dùng AI
+        import google.generativeai as genai
+
         # Kiểm tra API key
         api_key = os.getenv('GEMINI_API_KEY')
         if not api_key:
-            print("❌ GEMINI_API_KEY chưa được cấu hình trong .env")
+            log.error("GEMINI_API_KEY chưa được cấu hình trong .env")
             raise ValueError("GEMINI_API_KEY chưa được cấu hình trong .env")
         
         # Mask API key khi hiển thị (chỉ hiện 8 ký tự đầu + cuối)
         masked_key = f"{api_key[:8]}...{api_key[-4:]}" if len(api_key) > 12 else "***"
-        print(f"✓ API Key tìm thấy: {masked_key}")
+        log.info("API Key tìm thấy: %s", masked_key)
+        
+        # Cấu hình Gemini
+        genai.configure(api_key=api_key)
+        log.debug("Đã cấu hình Google Generative AI")
         
+        # Khởi tạo model
+        self.model = genai.GenerativeModel(MODEL_NAME)
+        self.model_name = MODEL_NAME
+        log.info("Đã khởi tạo model: %s", MODEL_NAME)
+
+    def probe(self) -> bool:
+        """Test kết nối bằng một request nhỏ; True nếu model trả lời"""
         try:
-            # Cấu hình Gemini
-            genai.configure(api_key=api_key)
-            print("✓ Đã cấu hình Google Generative AI")
-            
-            # Khởi tạo model
-            self.model = genai.GenerativeModel('gemini-3-flash-preview')  
-            print("✓ Đã khởi tạo model: gemini-3-flash-preview")
-            
-            # Test kết nối đơn giản
-            print("⏳ Đang test kết nối API...")
-            test_response = self.model.generate_content("Hello")
+            log.debug("Đang test kết nối API...")
+            with self.guard.slot():
+                test_response = self.model.generate_content("Hello")
             
             if test_response and test_response.text:
-                print("✅ Kết nối AI thành công!")
-                print(f"   Test response: {test_response.text[:50]}...")
-            else:
-                print("⚠️  Kết nối OK nhưng không nhận được response")
+                log.info("Kết nối AI thành công (test response: %s...)", test_response.text[:50])
+                return True
+            log.warning("Kết nối AI OK nhưng không nhận được response")
+            return False
                 
         except Exception as e:
-            print(f"❌ Lỗi khi khởi tạo AI: {type(e).__name__}")
-            print(f"   Chi tiết: {str(e)}")
+            hint = ""
             if "API_KEY_INVALID" in str(e):
-                print("   → API key không hợp lệ. Kiểm tra lại GEMINI_API_KEY trong .env")
+                hint = " - API key không hợp lệ, kiểm tra lại GEMINI_API_KEY trong .env"
             elif "quota" in str(e).lower():
-                print("   → Đã hết quota API. Kiểm tra giới hạn tại https://makersuite.google.com")
+                hint = " - đã hết quota API, kiểm tra giới hạn tại https://makersuite.google.com"
             elif "network" in str(e).lower() or "connection" in str(e).lower():
-                print("   → Lỗi kết nối mạng. Kiểm tra internet và firewall")
+                hint = " - lỗi kết nối mạng, kiểm tra internet và firewall"
+            log.warning("Lỗi khi test kết nối AI: %s: %s%s", type(e).__name__, e, hint)
+            return False
+
+    def _cached_generate(self, kind: str, prompt: str, inputs: tuple, refresh: bool = False,
+                         validate: Optional[Callable[[str], bool]] = None):
+        """
+        Gọi model qua cache. Trả về (text, cached); text None nếu response trống.
+        ``refresh=True`` bỏ qua bản đã cache và ghi đè bằng câu trả lời mới.
+        ``validate(text)`` False thì không ghi cache (vd. JSON hỏng).
+        """
+        key = ResponseCache.make_key(kind, *inputs, model=self.model_name) if self.cache else None
+        if key and not refresh:
+            text = self.cache.get(key)
+            if text is not None:
+                log.debug("Dùng câu trả lời đã cache (%s)", kind)
+                metrics.record_model_call(kind, 'cached')
+                return text, True
+
+        def generate():
+            log.debug("Đang gọi model (%s, prompt %d ký tự)", kind, len(prompt))
+            started = time.perf_counter()
+            try:
+                response = self.model.generate_content(prompt)
+                text = response.text if response and response.text else None
+            except Exception as e:
+                metrics.record_model_call(kind, 'quota' if is_quota_error(e) else 'error',
+                                          time.perf_counter() - started, len(prompt))
+                raise
+            metrics.record_model_call(kind, 'ok' if text else 'empty', time.perf_counter() - started, len(prompt))
+            if key and text and (validate is None or validate(text)):
+                self.cache.set(key, kind, text)
+            return text
+
+        # Request trùng prompt đang chạy ở thread khác dùng chung một lời gọi
+        try:
+            return self.guard.call(self._flight_key(prompt), generate), False
+        except Throttled:
+            metrics.record_model_call(kind, 'throttled')
             raise
-        
-        print("=" * 60)
+
+    def _flight_key(self, prompt: str) -> str:
+        return hashlib.sha256(f'{self.model_name}\n{prompt}'.encode('utf-8')).hexdigest()
+
+    def _stream_generate(self, kind: str, prompt: str, inputs: tuple, refresh: bool = False):
+        """
+        Như _cached_generate nhưng yield (đoạn text, cached) ngay khi model trả về từng đoạn
+        (generate_content(stream=True)). Bản đã cache được trả nguyên trong một đoạn;
+        câu trả lời stream đầy đủ được ghi vào cache khi kết thúc.
+        """
+        key = ResponseCache.make_key(kind, *inputs, model=self.model_name) if self.cache else None
+        if key and not refresh:
+            text = self.cache.get(key)
+            if text is not None:
+                log.debug("Dùng câu trả lời đã cache (%s)", kind)
+                metrics.record_model_call(kind, 'cached')
+                yield text, True
+                return
+
+        # Stream không gộp được với request khác nhưng vẫn tính rate limit và giữ
+        # một slot đồng thời tới khi stream kết thúc (hoặc client ngắt kết nối)
+        parts = []
+        started = None
+        outcome = 'throttled'
+        try:
+            with self.guard.slot():
+                started = time.perf_counter()
+                outcome = 'error'
+                log.debug("Đang gọi model (stream, %s, prompt %d ký tự)", kind, len(prompt))
+                for chunk in self.model.generate_content(prompt, stream=True):
+                    text = chunk.text
+                    if text:
+                        parts.append(text)
+                        yield text, False
+                outcome = 'ok' if parts else 'empty'
+        except GeneratorExit:
+            outcome = 'cancelled'
+            raise
+        except Exception as e:
+            if started is not None and is_quota_error(e):
+                outcome = 'quota'
+            raise
+        finally:
+            if started is None:
+                metrics.record_model_call(kind, outcome)
+            else:
+                metrics.record_model_call(kind, outcome, time.perf_counter() - started, len(prompt))
+        if key and parts:
+            self.cache.set(key, kind, ''.join(parts))
+
+    def stream_analysis(self, data: Dict[str, Any], refresh: bool = False):
+        """Phân tích tài chính dạng stream - xem analyze_financial_health"""
+        return self._stream_generate('analysis', self._build_analysis_prompt(data), (data,), refresh)
+
+    def stream_savings_plan(self, goal: Dict[str, Any], financial_data: Dict[str, Any], refresh: bool = False):
+        """Kế hoạch tiết kiệm dạng stream - xem suggest_savings_plan"""
+        prompt = self._build_savings_plan_prompt(goal, financial_data)
+        return self._stream_generate('plan', prompt, (goal, financial_data), refresh)
     
-    def analyze_financial_health(self, data: Dict[str, Any]) -> Dict[str, Any]:
+    def analyze_financial_health(self, data: Dict[str, Any], refresh: bool = False) -> Dict[str, Any]:
         """
         Phân tích tình hình tài chính tổng thể
         
@@ -69,26 +486,21 @@ class AIAdvisor:
                 'period_months': int
             }
         """
-        print("\n" + "=" * 60)
-        print("🔍 Đang phân tích tài chính...")
-        
         prompt = self._build_analysis_prompt(data)
-        print(f"✓ Đã tạo prompt (độ dài: {len(prompt)} ký tự)")
         
         try:
-            print("⏳ Đang gọi Gemini API...")
-            response = self.model.generate_content(prompt)
+            text, cached = self._cached_generate('analysis', prompt, (data,), refresh)
             
-            if response and response.text:
-                print(f"✅ Nhận được phân tích (độ dài: {len(response.text)} ký tự)")
-                print("=" * 60 + "\n")
+            if text:
+                log.debug("Nhận được phân tích (%d ký tự, cached=%s)", len(text), cached)
                 return {
                     'success': True,
-                    'analysis': response.text,
-                    'raw_data': data
+                    'analysis': text,
+                    'raw_data': data,
+                    'cached': cached
                 }
             else:
-                print("⚠️  Response trống")
+                log.warning("Phân tích tài chính: response trống")
                 return {
                     'success': False,
                     'error': 'Empty response',
@@ -96,12 +508,12 @@ class AIAdvisor:
                 }
                 
         except Exception as e:
-            print(f"❌ Lỗi khi phân tích: {type(e).__name__}")
-            print(f"   Chi tiết: {str(e)}")
-            print("=" * 60 + "\n")
+            log.warning("Lỗi khi phân tích: %s: %s", type(e).__name__, e)
             
             error_msg = str(e)
-            if "quota" in error_msg.lower():
+            if isinstance(e, Throttled):
+                user_msg = error_msg
+            elif "quota" in error_msg.lower():
                 user_msg = "Đã hết quota API Gemini. Vui lòng kiểm tra giới hạn."
             elif "invalid" in error_msg.lower() or "key" in error_msg.lower():
                 user_msg = "API key không hợp lệ. Kiểm tra GEMINI_API_KEY trong .env"
@@ -116,7 +528,8 @@ class AIAdvisor:
                 'message': user_msg
             }
     
-    def suggest_savings_plan(self, goal: Dict[str, Any], financial_data: Dict[str, Any]) -> Dict[str, Any]:
+    def suggest_savings_plan(self, goal: Dict[str, Any], financial_data: Dict[str, Any],
+                             refresh: bool = False) -> Dict[str, Any]:
         """
         Gợi ý kế hoạch tiết kiệm cho mục tiêu cụ thể
         
@@ -124,40 +537,100 @@ class AIAdvisor:
             goal: {'name', 'targetAmount', 'currentAmount', 'deadline'}
             financial_data: {'monthly_income', 'monthly_expense', 'other_goals'}
         """
-        print("\n" + "=" * 60)
-        print(f"📋 Đang tạo kế hoạch cho mục tiêu: {goal.get('name', 'N/A')}")
-        
         prompt = self._build_savings_plan_prompt(goal, financial_data)
-        print(f"✓ Đã tạo prompt (độ dài: {len(prompt)} ký tự)")
         
         try:
-            print("⏳ Đang gọi Gemini API...")
-            response = self.model.generate_content(prompt)
+            text, cached = self._cached_generate('plan', prompt, (goal, financial_data), refresh)
             
-            if response and response.text:
-                print(f"✅ Nhận được kế hoạch (độ dài: {len(response.text)} ký tự)")
-                print("=" * 60 + "\n")
+            if text:
+                log.debug("Nhận được kế hoạch cho mục tiêu %s (%d ký tự, cached=%s)", goal.get('name'), len(text), cached)
                 return {
                     'success': True,
-                    'plan': response.text,
-                    'goal': goal
+                    'plan': text,
+                    'goal': goal,
+                    'cached': cached
                 }
             else:
-                print("⚠️  Response trống")
+                log.warning("Kế hoạch mục tiêu %s: response trống", goal.get('name'))
                 return {
                     'success': False,
                     'error': 'Empty response'
                 }
                 
         except Exception as e:
-            print(f"❌ Lỗi khi tạo kế hoạch: {type(e).__name__}")
-            print(f"   Chi tiết: {str(e)}")
-            print("=" * 60 + "\n")
+            log.warning("Lỗi khi tạo kế hoạch: %s: %s", type(e).__name__, e)
             return {
                 'success': False,
                 'error': str(e)
             }
     
+    def suggest_savings_plans(self, goals: List[Dict[str, Any]], financial_data: Dict[str, Any],
+                              refresh: bool = False) -> Dict[str, Any]:
+        """
+        Tạo kế hoạch cho nhiều mục tiêu bằng một lời gọi model (mỗi PLAN_BATCH_SIZE mục tiêu)
+        thay vì gọi suggest_savings_plan cho từng mục tiêu.
+
+        Returns:
+            {'success', 'plans': [{'goal_id', 'monthly_amount', 'plan'}],
+             'missing': [goal_id không có kế hoạch], 'cached'}
+        """
+        plans = []
+        cached = True
+        try:
+            for i in range(0, len(goals), PLAN_BATCH_SIZE):
+                batch = goals[i:i + PLAN_BATCH_SIZE]
+                ids = [g['id'] for g in batch]
+                prompt = self._build_batch_plan_prompt(batch, financial_data)
+
+                def valid(text, ids=ids):
+                    try:
+                        return bool(parse_batch_plans(text, ids))
+                    except ValueError:
+                        return False
+
+                text, batch_cached = self._cached_generate(
+                    'plans', prompt, (ids, batch, compact_context(financial_data, max_goals=0)), refresh, valid
+                )
+                cached = cached and batch_cached
+                plans.extend(parse_batch_plans(text or '', ids))
+        except Exception as e:
+            log.warning("Lỗi khi tạo kế hoạch hàng loạt: %s: %s", type(e).__name__, e)
+            return {'success': False, 'error': str(e)}
+
+        done = {str(p['goal_id']) for p in plans}
+        missing = [g['id'] for g in goals if str(g['id']) not in done]
+        log.debug("Nhận được %d/%d kế hoạch (cached=%s)", len(plans), len(goals), cached)
+        return {'success': bool(plans), 'plans': plans, 'missing': missing, 'cached': cached,
+                **({} if plans else {'error': 'AI không trả về kế hoạch hợp lệ'})}
+
+    def _build_batch_plan_prompt(self, goals: List[Dict[str, Any]], financial_data: Dict[str, Any]) -> str:
+        """Prompt một lần cho nhiều mục tiêu, yêu cầu trả về JSON theo goal_id"""
+        lines = []
+        for goal in goals:
+            target = goal.get('targetAmount', 0)
+            current = goal.get('currentAmount', 0)
+            line = (f"- [id={goal['id']}] {goal.get('name', 'Mục tiêu')}: cần {target:,.0f} VNĐ, "
+                    f"đã có {current:,.0f} VNĐ, còn thiếu {target - current:,.0f} VNĐ")
+            if goal.get('deadline'):
+                line += f", hạn {str(goal['deadline'])[:10]}"
+            lines.append(line)
+        goal_list = '\n'.join(lines)
+
+        return f"""
+Bạn là chuyên gia lập kế hoạch tài chính. Hãy lập kế hoạch tiết kiệm cho TẤT CẢ các mục tiêu sau bằng tiếng Việt, cân đối giữa các mục tiêu với số tiền còn dư mỗi tháng.
+
+💰 TÌNH HÌNH TÀI CHÍNH:
+{compact_context(financial_data, max_goals=0)}
+
+🎯 CÁC MỤC TIÊU:
+{goal_list}
+
+Với mỗi mục tiêu, nêu: số tiền nên tiết kiệm mỗi tháng, các mốc thời gian, 2-3 mẹo cụ thể.
+Trả về DUY NHẤT một JSON (không markdown, không giải thích thêm) theo dạng:
+{{"plans": [{{"goal_id": <id>, "monthly_amount": <số VNĐ mỗi tháng>, "plan": "<kế hoạch ngắn gọn, có emoji>"}}]}}
+Mỗi mục tiêu trong danh sách phải có đúng một phần tử, goal_id lấy từ [id=...].
+"""
+
     def _build_analysis_prompt(self, data: Dict[str, Any]) -> str:
         """Xây dựng prompt phân tích tài chính"""
         total_income = data.get('total_income', 0)
@@ -259,29 +732,25 @@ Trả lời bằng tiếng Việt, súc tích, dễ hiểu, có emoji.
 """
         return prompt
 
-    def quick_advice(self, question: str, context: Optional[Dict] = None) -> str:
-        """Tư vấn nhanh dựa trên câu hỏi người dùng"""
-        print("\n" + "=" * 60)
-        print(f"💬 Câu hỏi: {question[:50]}...")
-        
+    def ask(self, question: str, context: Optional[Dict] = None, refresh: bool = False) -> Dict[str, Any]:
+        """Tư vấn nhanh dựa trên câu hỏi người dùng (quick_advice trả về chuỗi)"""
         prompt = f"Bạn là chuyên gia tài chính cá nhân. Trả lời ngắn gọn bằng tiếng Việt:\n\n{question}"
         
-        if context:
-            prompt += f"\n\nBối cảnh: {context}"
+        summary = compact_context(context, question) if context else ''
+        if summary:
+            prompt += f"\n\nBối cảnh tài chính:\n{summary}"
         
         try:
-            print("⏳ Đang gọi Gemini API...")
-            response = self.model.generate_content(prompt)
+            # Câu hỏi được chuẩn hóa khoảng trắng và chữ hoa/thường trước khi hash
+            text, cached = self._cached_generate('advice', prompt, (question.lower(), summary), refresh)
             
-            if response and response.text:
-                print(f"✅ Nhận được câu trả lời (độ dài: {len(response.text)} ký tự)")
-                print("=" * 60 + "\n")
-                return response.text
+            if text:
+                log.debug("Nhận được câu trả lời (%d ký tự, cached=%s)", len(text), cached)
+                return {'success': True, 'answer': text, 'cached': cached}
             else:
-                print("⚠️  Response trống")
-                return "Xin lỗi, AI không thể trả lời lúc này."
+                log.warning("Hỏi đáp: response trống")
+                return {'success': False, 'error': 'Xin lỗi, AI không thể trả lời lúc này.'}
                 
         except Exception as e:
-            print(f"❌ Lỗi: {type(e).__name__}: {str(e)}")
-            print("=" * 60 + "\n")
-            return f"Lỗi: {str(e)}"
+            log.warning("Lỗi khi trả lời câu hỏi: %s: %s", type(e).__name__, e)
+            return {'success': False, 'error': str(e)}
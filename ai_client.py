@@ -0,0 +1,218 @@
+"""
+Khởi tạo AI Advisor lười + kiểm tra sức khỏe chạy nền.
+
+``import app`` không còn nạp ai_advisor / google.generativeai hay gọi thử API:
+AIAdvisor chỉ được tạo ở lần đầu route AI cần tới (``ai_client.get()``), còn
+request "Hello" kiểm tra kết nối chạy trong một thread nền (``start_probe``).
+Trạng thái probe quyết định ``ai_client.enabled`` (biến ``ai_enabled`` của template).
+
+``ai_client.get()`` trả về FallbackAdvisor: gọi Gemini trước, nếu Gemini chưa cấu hình,
+đang down, lỗi hoặc bị giới hạn thì trả lời bằng local_advisor.LocalAdvisor (offline).
+AI_BACKEND=local chỉ dùng bộ quy tắc offline; AI_LOCAL_FALLBACK=0 tắt dự phòng.
+"""
+import os
+import threading
+import time
+from typing import Any, Callable, Dict, Iterator, Optional
+
+import metrics
+from advisor_backend import AdvisorBackend
+from local_advisor import LocalAdvisor
+
+
+class AIUnavailable(Exception):
+    """AI chưa cấu hình hoặc không khởi tạo được"""
+
+
+class FallbackAdvisor(AdvisorBackend):
+    """
+    Gọi backend chính (``get_primary()``), lỗi thì chuyển sang ``fallback``.
+
+    Kết quả có thêm ``source`` (backend đã trả lời) và ``fallback`` (True khi
+    backend chính lỗi). ``get_primary`` trả None khi biết trước backend chính
+    không dùng được (chưa cấu hình/đang down) để khỏi tốn một lần gọi.
+    """
+
+    def __init__(self, get_primary: Callable[[], Optional[AdvisorBackend]], fallback: Optional[AdvisorBackend]):
+        self.get_primary = get_primary
+        self.fallback = fallback
+        self.fallback_count = 0
+
+    @property
+    def source(self) -> str:
+        primary = self._primary()
+        return primary.source if primary is not None else self.fallback.source
+
+    def _primary(self) -> Optional[AdvisorBackend]:
+        try:
+            return self.get_primary()
+        except AIUnavailable:
+            if self.fallback is None:
+                raise
+            return None
+
+    def _call(self, method: str, *args, **kwargs) -> Dict[str, Any]:
+        primary = self._primary()
+        error = None
+        if primary is not None:
+            try:
+                result = getattr(primary, method)(*args, **kwargs)
+            except Exception as e:
+                if self.fallback is None:
+                    raise
+                result = {'success': False, 'error': str(e)}
+            if result.get('success') or self.fallback is None:
+                return dict(result, source=primary.source, fallback=False)
+            error = result.get('error')
+
+        self.fallback_count += 1
+        metrics.AI_FALLBACKS.inc(method)
+        result = getattr(self.fallback, method)(*args, **kwargs)
+        return dict(result, source=self.fallback.source, fallback=True, primary_error=error)
+
+    def probe(self) -> bool:
+        primary = self._primary()
+        return primary.probe() if primary is not None else self.fallback.probe()
+
+    def analyze_financial_health(self, data, refresh=False):
+        return self._call('analyze_financial_health', data, refresh)
+
+    def suggest_savings_plan(self, goal, financial_data, refresh=False):
+        return self._call('suggest_savings_plan', goal, financial_data, refresh)
+
+    def suggest_savings_plans(self, goals, financial_data, refresh=False):
+        return self._call('suggest_savings_plans', goals, financial_data, refresh)
+
+    def ask(self, question, context=None, refresh=False):
+        return self._call('ask', question, context, refresh)
+
+    def _stream(self, method: str, *args) -> Iterator:
+        """Chỉ chuyển sang fallback khi backend chính lỗi trước đoạn text đầu tiên"""
+        primary = self._primary()
+        if primary is not None:
+            chunks = getattr(primary, method)(*args)
+            try:
+                first = next(chunks, None)
+            except Exception:
+                if self.fallback is None:
+                    raise
+            else:
+                if first is not None:
+                    yield first
+                yield from chunks
+                return
+        self.fallback_count += 1
+        metrics.AI_FALLBACKS.inc(method)
+        yield from getattr(self.fallback, method)(*args)
+
+    def stream_analysis(self, data, refresh=False):
+        return self._stream('stream_analysis', data, refresh)
+
+    def stream_savings_plan(self, goal, financial_data, refresh=False):
+        return self._stream('stream_savings_plan', goal, financial_data, refresh)
+
+
+class LazyAdvisor:
+    """
+    Giữ AIAdvisor dùng chung cho cả process.
+
+    status (của Gemini): ``unknown`` (chưa probe xong) -> ``up`` | ``down``;
+    ``disabled`` khi không có GEMINI_API_KEY (và không bật AI_FAKE_MODEL) hoặc
+    AI_BACKEND=local. Khi chưa biết kết quả probe, AI được coi là bật để trang
+    web không phải chờ; có bộ quy tắc offline thì AI luôn bật.
+    """
+
+    def __init__(self, probe_interval: int = 300):
+        self.probe_interval = probe_interval
+        self._advisor = None
+        self._lock = threading.Lock()
+        self._probe_thread: Optional[threading.Thread] = None
+        self.status = 'unknown'
+        self.error: Optional[str] = None
+        self.checked_at: Optional[float] = None
+        self.backend = os.getenv('AI_BACKEND', 'gemini')
+        local = self.backend == 'local' or os.getenv('AI_LOCAL_FALLBACK', '1') != '0'
+        self.local = LocalAdvisor() if local else None
+        self._fallback = FallbackAdvisor(self._get_primary, self.local)
+        if not self.configured() or self.backend == 'local':
+            self.status = 'disabled'
+
+    @staticmethod
+    def configured() -> bool:
+        return bool(os.getenv('GEMINI_API_KEY')) or os.getenv('AI_FAKE_MODEL') == '1'
+
+    @property
+    def enabled(self) -> bool:
+        self.start_probe()
+        return self.local is not None or self.status in ('unknown', 'up')
+
+    def get(self) -> FallbackAdvisor:
+        """Advisor cho các route AI (Gemini, dự phòng bằng bộ quy tắc offline)"""
+        if self.local is None and self.status == 'disabled':
+            raise AIUnavailable('GEMINI_API_KEY chưa được cấu hình trong .env')
+        return self._fallback
+
+    def _get_primary(self, probing: bool = False):
+        """AIAdvisor (tạo ở lần gọi đầu tiên); AIUnavailable nếu không tạo được/đang down"""
+        if self.status == 'disabled':
+            raise AIUnavailable('GEMINI_API_KEY chưa được cấu hình trong .env')
+        if self.status == 'down' and self.local is not None and not probing:
+            # Probe nền sẽ đưa về 'up' khi Gemini hoạt động lại
+            raise AIUnavailable(self.error or 'AI đang không khả dụng')
+        if self._advisor is not None:
+            return self._advisor
+        with self._lock:
+            if self._advisor is None:
+                try:
+                    from ai_advisor import AIAdvisor
+                    self._advisor = AIAdvisor()
+                except Exception as e:
+                    self._set_status('down', f'{type(e).__name__}: {e}')
+                    raise AIUnavailable(str(e)) from e
+        return self._advisor
+
+    def start_probe(self):
+        """Chạy probe nền một lần cho mỗi process; thất bại thì thử lại sau ``probe_interval`` giây"""
+        if self._probe_thread is not None or self.status == 'disabled':
+            return
+        if os.getenv('AI_HEALTH_PROBE', '1') == '0':
+            return
+        with self._lock:
+            if self._probe_thread is None:
+                self._probe_thread = threading.Thread(target=self._probe_loop, name='ai-probe', daemon=True)
+                self._probe_thread.start()
+
+    def _probe_loop(self):
+        while True:
+            if self.probe() or self.probe_interval <= 0:
+                return
+            time.sleep(self.probe_interval)
+
+    def probe(self) -> bool:
+        """Gọi thử model một lần và cập nhật trạng thái"""
+        try:
+            ok = self._get_primary(probing=True).probe()
+        except AIUnavailable:
+            return False
+        self._set_status('up' if ok else 'down', None if ok else 'Probe thất bại')
+        return ok
+
+    def _set_status(self, status: str, error: Optional[str] = None):
+        self.status = status
+        self.error = error
+        self.checked_at = time.time()
+
+    def health(self) -> Dict[str, Any]:
+        return {
+            'status': self.status,
+            'backend': self.backend,
+            'fallback': self.local is not None,
+            'fallbackCount': self._fallback.fallback_count,
+            'error': self.error,
+            'checkedAt': self.checked_at,
+            'loaded': self._advisor is not None,
+            'limits': self._advisor.guard.stats() if self._advisor is not None else None,
+        }
+
+
+ai_client = LazyAdvisor(probe_interval=int(os.getenv('AI_HEALTH_INTERVAL', '300')))
@@ -1,16 +1,30 @@
-from flask import Flask, render_template, request, jsonify, redirect, url_for, flash, session
+from flask import Flask, render_template, request, jsonify, redirect, url_for, flash, session, Response, g
 from datetime import datetime
+import hmac
+import json
+import logging
 import os
+import sqlite3
 from dotenv import load_dotenv
 
 # Load .env
 load_dotenv()
 
+# Log theo mức: LOG_LEVEL=DEBUG để xem log chi tiết (mặc định INFO)
+logging.basicConfig(
+    level=os.getenv('LOG_LEVEL', 'INFO').upper(),
+    format='%(asctime)s %(levelname)s %(name)s: %(message)s'
+)
+log = logging.getLogger(__name__)
+
 # Import services và models
 from services import SavingsService, TransactionService, AnalysisService
-from utils import format_currency, format_date, validate_amount
-from models import User, Category, Transaction
-from ai_advisor import AIAdvisor
+from utils import format_currency, format_date, validate_amount, period_range
+from models import User, Category, Transaction, AIJob, SavingsPlan, db
+from models import DEFAULT_EXPENSE_CATEGORIES, DEFAULT_INCOME_CATEGORIES
+from ai_client import ai_client, AIUnavailable
+from jobs import ai_jobs, QueueFull, job_status, job_result
+import metrics
 from flask import abort
 from functools import wraps
 
@@ -22,20 +36,66 @@ app.config['SESSION_COOKIE_SECURE'] = False
 app.config['SESSION_COOKIE_HTTPONLY'] = True
 app.config['PERMANENT_SESSION_LIFETIME'] = 86400
 
-# THÊM: Khởi tạo AI Advisor
-try:
-    ai_advisor = AIAdvisor()
-    AI_ENABLED = True
-except Exception as e:
-    print(f"⚠️  AI không khả dụng: {e}")
-    ai_advisor = None
-    AI_ENABLED = False
+# Tháng bắt đầu năm tài chính (dùng cho period=fiscal_year)
+FISCAL_YEAR_START_MONTH = int(os.getenv('FISCAL_YEAR_START_MONTH', '1'))
+
+# Stream SSE giữ một worker thread suốt thời gian model sinh câu trả lời, nên là tùy chọn:
+# AI_STREAMING=1 bật /ai/.../stream và giao diện ưu tiên stream; mặc định dùng hàng đợi job
+AI_STREAMING = os.getenv('AI_STREAMING', '0') == '1'
+
+# Số giao dịch mỗi trang ở /analysis (tải thêm khi cuộn)
+TRANSACTION_PAGE_SIZE = int(os.getenv('TRANSACTION_PAGE_SIZE', '50'))
+
+# AI Advisor được tạo lười ở lần dùng đầu tiên (ai_client.get()); kiểm tra kết nối
+# chạy nền, kết quả phản ánh qua ai_client.enabled
     
+# /metrics không qua đăng nhập (Prometheus scrape) nhưng lộ latency, pool và số lời gọi AI:
+# đặt METRICS_TOKEN thì yêu cầu header "Authorization: Bearer <token>", không thì chỉ localhost
+METRICS_TOKEN = os.getenv('METRICS_TOKEN', '')
+METRICS_LOCAL_ADDRS = {'127.0.0.1', '::1'}
+
+# Latency theo endpoint + số/thời gian câu SQL mỗi request, xem /metrics
+if metrics.ENABLED:
+    db.add_query_listener(metrics.on_query)
+
+    @app.before_request
+    def start_request_metrics():
+        metrics.start_request()
+
+    @app.after_request
+    def record_request_metrics(response):
+        metrics.finish_request(request.endpoint or 'unmatched', request.method, response.status_code)
+        return response
+
+    metrics.registry.gauge('db_pool_in_use', 'Kết nối SQLite đang được dùng',
+                           lambda: db.pool_stats()['in_use'])
+    metrics.registry.gauge('db_pool_waits_total', 'Số lần phải chờ kết nối rảnh',
+                           lambda: db.pool_stats()['waits'])
+    metrics.registry.gauge('ai_jobs_queued', 'Job AI đang chờ trong hàng đợi',
+                           lambda: ai_jobs.stats()['queued'])
+
+# Job AI dở dang của process trước (đã dừng) không bao giờ chạy tiếp - đánh dấu lỗi
+try:
+    stale_jobs = ai_jobs.recover_stale()
+    if stale_jobs:
+        log.warning('Đánh dấu lỗi %d job AI dở dang của process đã dừng', stale_jobs)
+except sqlite3.OperationalError as e:
+    log.warning('Bỏ qua kiểm tra job AI dở dang: %s (chạy python init_db.py?)', e)
+
+# Mỗi request dùng chung một kết nối lấy từ pool (trả lại ở teardown)
+@app.before_request
+def pin_db_connection():
+    db.pin()
+
+@app.teardown_request
+def unpin_db_connection(exc):
+    db.unpin()
+
 # Bắt buộc đăng nhập cho hầu hết các route
 @app.before_request
 def require_login():
     # các endpoint được phép truy cập khi chưa đăng nhập
-    public_endpoints = {'login', 'register', 'static', 'not_found', 'internal_error'}
+    public_endpoints = {'login', 'register', 'static', 'not_found', 'internal_error', 'metrics_endpoint'}
     endpoint = request.endpoint
     if endpoint is None:
         return
@@ -44,21 +104,24 @@ def require_login():
     if not session.get('user_id'):
         return redirect(url_for('login'))
 
+def get_current_user():
+    """User đang đăng nhập - tra cứu tối đa một lần mỗi request (lưu ở flask.g)"""
+    if 'current_user' not in g:
+        user = None
+        user_id = session.get('user_id')
+        if user_id:
+            try:
+                user = User.find_by_id_cached(user_id)
+            except Exception as e:
+                log.debug('find_by_id(%s) error: %s', user_id, e)
+        g.current_user = user
+    return g.current_user
+
 # Inject current_user into templates
 @app.context_processor
 def inject_user():
-    user = None
-    user_id = session.get('user_id')
-    print(f"[DEBUG] inject_user: session user_id = {user_id}")
-    if user_id:
-        # if id is str/bytes/int, ensure passing the right type
-        try:
-            user = User.find_by_id(user_id)
-        except Exception as _e:
-            print(f"[DEBUG] inject_user: find_by_id error: {_e}")
-            user = None
-    print(f"[DEBUG] inject_user: current_user = {user}")
-    return {'current_user': user, 'ai_enabled': AI_ENABLED}  # THÊM ai_enabled
+    return {'current_user': get_current_user(), 'ai_enabled': ai_client.enabled,  # THÊM ai_enabled
+            'ai_streaming': AI_STREAMING}
 
 # ==================== ĐĂNG KÝ TEMPLATE FILTERS ====================
 @app.template_filter('format_currency')
@@ -165,16 +228,39 @@ def add_amount(goal_id):
 @app.route('/ai/analyze')
 def ai_analyze():
     """Trang phân tích tài chính bằng AI"""
-    if not AI_ENABLED:
+    if not ai_client.enabled:
         flash('Tính năng AI chưa được kích hoạt. Vui lòng cấu hình GEMINI_API_KEY trong .env', 'error')
         return redirect(url_for('index'))
     
     return render_template('ai_analyze.html')
 
+@app.route('/ai/health')
+def ai_health():
+    """Trạng thái AI: unknown | up | down | disabled (từ probe nền)"""
+    return jsonify(ai_client.health())
+
+@app.route('/metrics')
+def metrics_endpoint():
+    """Metrics dạng Prometheus text (METRICS_TOKEN hoặc chỉ localhost)"""
+    if METRICS_TOKEN:
+        supplied = request.headers.get('Authorization', '')
+        if not hmac.compare_digest(supplied.encode(), f'Bearer {METRICS_TOKEN}'.encode()):
+            abort(403)
+    elif request.remote_addr not in METRICS_LOCAL_ADDRS:
+        abort(403)
+    return Response(metrics.registry.render(), mimetype='text/plain; version=0.0.4')
+
+def _wants_refresh():
+    """?refresh=1 (hoặc {"refresh": true} trong JSON) - bỏ qua câu trả lời AI đã cache"""
+    if request.args.get('refresh') in ('1', 'true'):
+        return True
+    body = request.get_json(silent=True)
+    return isinstance(body, dict) and bool(body.get('refresh'))
+
 @app.route('/ai/analyze/run', methods=['POST'])
 def ai_analyze_run():
     """Chạy phân tích AI"""
-    if not AI_ENABLED:
+    if not ai_client.enabled:
         return jsonify({'success': False, 'error': 'AI không khả dụng'}), 503
     
     try:
@@ -183,27 +269,33 @@ def ai_analyze_run():
         # Lấy dữ liệu tài chính
         financial_data = SavingsService.get_financial_data_for_ai(user_id)
         
-        # Gọi AI
-        result = ai_advisor.analyze_financial_health(financial_data)
-        
-        return jsonify(result)
+        # Gọi AI ở worker nền, trả job_id ngay
+        job = ai_jobs.submit(
+            user_id, 'analysis', ai_client.get().analyze_financial_health,
+            financial_data, refresh=_wants_refresh()
+        )
+        return _job_accepted(job)
+    except QueueFull as e:
+        return jsonify({'success': False, 'error': str(e)}), 429
+    except AIUnavailable as e:
+        return jsonify({'success': False, 'error': f'AI không khả dụng: {e}'}), 503
     except Exception as e:
         return jsonify({'success': False, 'error': str(e)}), 500
 
 @app.route('/ai/plan/<goal_id>')
 def ai_plan_goal(goal_id):
     """Trang kế hoạch tiết kiệm cho mục tiêu cụ thể"""
-    if not AI_ENABLED:
+    if not ai_client.enabled:
         flash('Tính năng AI chưa được kích hoạt', 'error')
         return redirect(url_for('index'))
     
     try:
-        goal = SavingsService.get_goal_by_id(goal_id)
+        goal = _find_own_goal(goal_id)
         if not goal:
             flash('Không tìm thấy mục tiêu', 'error')
             return redirect(url_for('index'))
         
-        return render_template('ai_plan.html', goal=goal)
+        return render_template('ai_plan.html', goal=goal, saved_plan=SavingsPlan.find_by_goal(goal['id']))
     except Exception as e:
         flash(f'Lỗi: {str(e)}', 'error')
         return redirect(url_for('index'))
@@ -211,12 +303,12 @@ def ai_plan_goal(goal_id):
 @app.route('/ai/plan/<goal_id>/generate', methods=['POST'])
 def ai_plan_generate(goal_id):
     """Tạo kế hoạch tiết kiệm bằng AI"""
-    if not AI_ENABLED:
+    if not ai_client.enabled:
         return jsonify({'success': False, 'error': 'AI không khả dụng'}), 503
     
     try:
         user_id = session.get('user_id')
-        goal = SavingsService.get_goal_by_id(goal_id)
+        goal = _find_own_goal(goal_id)
         
         if not goal:
             return jsonify({'success': False, 'error': 'Không tìm thấy mục tiêu'}), 404
@@ -224,17 +316,54 @@ def ai_plan_generate(goal_id):
         # Lấy dữ liệu tài chính
         financial_data = SavingsService.get_financial_data_for_ai(user_id)
         
-        # Gọi AI
-        result = ai_advisor.suggest_savings_plan(goal, financial_data)
+        # Gọi AI ở worker nền, trả job_id ngay
+        job = ai_jobs.submit(
+            user_id, 'plan', ai_client.get().suggest_savings_plan,
+            goal, financial_data, refresh=_wants_refresh()
+        )
+        return _job_accepted(job)
+    except QueueFull as e:
+        return jsonify({'success': False, 'error': str(e)}), 429
+    except AIUnavailable as e:
+        return jsonify({'success': False, 'error': f'AI không khả dụng: {e}'}), 503
+    except Exception as e:
+        return jsonify({'success': False, 'error': str(e)}), 500
+
+@app.route('/ai/plans/generate', methods=['POST'])
+def ai_plans_generate():
+    """Tạo kế hoạch cho mọi mục tiêu chưa hoàn thành bằng một lời gọi AI (chạy nền)"""
+    if not ai_client.enabled:
+        return jsonify({'success': False, 'error': 'AI không khả dụng'}), 503
+    
+    try:
+        user_id = session.get('user_id')
+        # Chỉ mục tiêu của chính user (không dùng danh sách "mọi mục tiêu" mà trang chủ
+        # hiển thị khi user chưa có mục tiêu - kế hoạch được lưu theo goalId)
+        summary = SavingsService.get_summary(user_id)
+        goals = [g for g in summary['goals'] if not g['isComplete'] and g['userId'] == user_id]
+        if not goals:
+            return jsonify({'success': False, 'error': 'Không có mục tiêu nào đang thực hiện'}), 400
         
-        return jsonify(result)
+        financial_data = SavingsService.get_financial_data_for_ai(user_id)
+        job = ai_jobs.submit(user_id, 'plans', _generate_plans, user_id, goals, financial_data, _wants_refresh())
+        return _job_accepted(job)
+    except QueueFull as e:
+        return jsonify({'success': False, 'error': str(e)}), 429
+    except AIUnavailable as e:
+        return jsonify({'success': False, 'error': f'AI không khả dụng: {e}'}), 503
     except Exception as e:
         return jsonify({'success': False, 'error': str(e)}), 500
 
+def _generate_plans(user_id, goals, financial_data, refresh):
+    result = ai_client.get().suggest_savings_plans(goals, financial_data, refresh=refresh)
+    if result['success']:
+        SavingsPlan.save_many(user_id, result['plans'])
+    return result
+
 @app.route('/ai/ask', methods=['POST'])
 def ai_ask():
     """API hỏi đáp nhanh với AI"""
-    if not AI_ENABLED:
+    if not ai_client.enabled:
         return jsonify({'success': False, 'error': 'AI không khả dụng'}), 503
     
     try:
@@ -246,11 +375,111 @@ def ai_ask():
         user_id = session.get('user_id')
         context = SavingsService.get_financial_data_for_ai(user_id)
         
-        answer = ai_advisor.quick_advice(question, context)
-        
-        return jsonify({'success': True, 'answer': answer})
+        job = ai_jobs.submit(user_id, 'advice', _answer_question, question, context, _wants_refresh())
+        return _job_accepted(job)
+    except QueueFull as e:
+        return jsonify({'success': False, 'error': str(e)}), 429
+    except AIUnavailable as e:
+        return jsonify({'success': False, 'error': f'AI không khả dụng: {e}'}), 503
     except Exception as e:
         return jsonify({'success': False, 'error': str(e)}), 500
+
+def _answer_question(question, context, refresh):
+    return ai_client.get().ask(question, context, refresh=refresh)
+
+def _job_accepted(job):
+    """202 + job_id; client poll /ai/jobs/<job_id> rồi lấy /ai/jobs/<job_id>/result"""
+    return jsonify({
+        'success': True,
+        'job_id': job['id'],
+        'status': job['status'],
+        'status_url': url_for('ai_job_status', job_id=job['id']),
+        'result_url': url_for('ai_job_result', job_id=job['id'])
+    }), 202
+
+def _find_own_goal(goal_id):
+    """Mục tiêu của user đang đăng nhập; None nếu không có hoặc thuộc user khác"""
+    goal = SavingsService.get_goal_by_id(goal_id)
+    if not goal or goal['userId'] != session.get('user_id'):
+        return None
+    return goal
+
+def _find_own_job(job_id):
+    job = AIJob.find_by_id(job_id)
+    if not job or job['userId'] != session.get('user_id'):
+        abort(404)
+    return job
+
+@app.route('/ai/jobs/<job_id>')
+def ai_job_status(job_id):
+    """Trạng thái job AI: queued | running | done | error"""
+    return jsonify(job_status(_find_own_job(job_id)))
+
+@app.route('/ai/jobs/<job_id>/result')
+def ai_job_result(job_id):
+    """Kết quả job AI; 202 kèm trạng thái nếu job chưa xong"""
+    job = _find_own_job(job_id)
+    if job['status'] in ('queued', 'running'):
+        return jsonify(job_status(job)), 202
+    if job['status'] == 'error':
+        return jsonify({'success': False, 'error': job['error']}), 500
+    return jsonify(job_result(job))
+
+# ---------- Streaming (Server-Sent Events) ----------
+
+def _sse(data, event=None):
+    prefix = f'event: {event}\n' if event else ''
+    return prefix + f'data: {json.dumps(data, ensure_ascii=False)}\n\n'
+
+def _stream_response(chunks):
+    """
+    Chuyển generator (text, cached) của AIAdvisor thành text/event-stream:
+    mỗi đoạn là một event ``data: {"text": ...}``, kết thúc bằng ``event: done``
+    (hoặc ``event: error``). Generator chạy sau khi request context đã đóng nên
+    kết nối DB đã trả về pool; mọi dữ liệu cần thiết phải được đọc trước.
+    """
+    def generate():
+        cached = False
+        try:
+            for text, cached in chunks:
+                yield _sse({'text': text})
+        except Exception as e:
+            yield _sse({'error': str(e)}, 'error')
+            return
+        yield _sse({'cached': cached}, 'done')
+
+    return Response(generate(), mimetype='text/event-stream', headers={
+        'Cache-Control': 'no-cache',
+        'X-Accel-Buffering': 'no'   # nginx: không buffer, đẩy từng event ngay
+    })
+
+@app.route('/ai/analyze/stream')
+def ai_analyze_stream():
+    """Phân tích AI dạng stream (EventSource); chỉ khi AI_STREAMING=1"""
+    if not AI_STREAMING:
+        abort(404)
+    if not ai_client.enabled:
+        return jsonify({'success': False, 'error': 'AI không khả dụng'}), 503
+
+    financial_data = SavingsService.get_financial_data_for_ai(session.get('user_id'))
+    return _stream_response(ai_client.get().stream_analysis(financial_data, refresh=_wants_refresh()))
+
+@app.route('/ai/plan/<goal_id>/stream')
+def ai_plan_stream(goal_id):
+    """Kế hoạch tiết kiệm dạng stream (EventSource); chỉ khi AI_STREAMING=1"""
+    if not AI_STREAMING:
+        abort(404)
+    if not ai_client.enabled:
+        return jsonify({'success': False, 'error': 'AI không khả dụng'}), 503
+
+    goal = _find_own_goal(goal_id)
+    if not goal:
+        return jsonify({'success': False, 'error': 'Không tìm thấy mục tiêu'}), 404
+
+    financial_data = SavingsService.get_financial_data_for_ai(session.get('user_id'))
+    return _stream_response(
+        ai_client.get().stream_savings_plan(goal, financial_data, refresh=_wants_refresh())
+    )
     
 # ==================== API (JSON) ====================
 
@@ -287,30 +516,17 @@ def register():
             flash('Email đã được sử dụng', 'error')
             return redirect(url_for('register'))
 
-        user = User.create(username, name, email, password, phone)
+        # Tạo user + danh mục mặc định trong một transaction (commit một lần)
+        with db.transaction():
+            user = User.create(username, name, email, password, phone)
+            for name, icon in DEFAULT_EXPENSE_CATEGORIES:
+                Category.create(name, 'expense', user['id'], icon)
+
+            for name, icon in DEFAULT_INCOME_CATEGORIES:
+                Category.create(name, 'income', user['id'], icon)
+
         session['user_id'] = user['id']
         flash('Đăng ký thành công', 'success')
-        default_expense = [
-            ('Ăn uống', 'fa-utensils'),
-            ('Đi lại', 'fa-car'),
-            ('Học tập', 'fa-book'),
-            ('Giải trí', 'fa-gamepad'),
-            ('Nhà ở', 'fa-house')
-        ]
-
-        default_income = [
-            ('Việc chính', 'fa-briefcase'),
-            ('Làm thêm', 'fa-laptop'),
-            ('Gia đình', 'fa-people-group'),
-            ('Đầu tư', 'fa-chart-line')
-        ]
-
-        for name, icon in default_expense:
-            Category.create(name, 'expense', user['id'], icon)
-
-        for name, icon in default_income:
-            Category.create(name, 'income', user['id'], icon)
-
         return redirect(url_for('index'))
     except Exception as e:
         flash(f'Lỗi: {str(e)}', 'error')
@@ -330,7 +546,7 @@ def login():
         # ensure session persists
         session.permanent = True
         session['user_id'] = user['id']
-        print(f"[DEBUG] login: set session user_id = {session.get('user_id')}, user.id type={type(user['id'])}")
+        log.debug('login: set session user_id = %s', user['id'])
         flash('Đăng nhập thành công', 'success')
         return redirect(url_for('index'))
     except Exception as e:
@@ -349,8 +565,7 @@ def profile():
     user_id = session.get('user_id')
     if not user_id:
         return redirect(url_for('login'))
-    user = User.find_by_id(user_id)
-    return render_template('profile.html', user=user)
+    return render_template('profile.html', user=get_current_user())
 
 @app.route('/profile/update', methods=['POST'])
 def profile_update():
@@ -390,48 +605,79 @@ def create_transaction():
 def expenses():
     user_id = session['user_id']
     month = request.args.get('month') or datetime.now().strftime('%Y-%m')
+    # period: month (mặc định) | week | quarter | year | fiscal_year, neo theo ?date= hoặc ?month=
+    period = request.args.get('period', 'month')
+    try:
+        start, end = period_range(period, request.args.get('date') or month, FISCAL_YEAR_START_MONTH)
+    except ValueError:
+        abort(400)
 
-    data = TransactionService.summary_by_month(
-        user_id, month, 'expense'
+    data = TransactionService.summary_by_period(
+        user_id, start, end, 'expense'
     )
-    return render_template('expenses.html', data=data, month=month)
+    return render_template('expenses.html', data=data, month=month, period=period, start=start, end=end)
 
 @app.route('/income')
 def income():
     user_id = session['user_id']
     month = request.args.get('month') or datetime.now().strftime('%Y-%m')
+    # period: month (mặc định) | week | quarter | year | fiscal_year, neo theo ?date= hoặc ?month=
+    period = request.args.get('period', 'month')
+    try:
+        start, end = period_range(period, request.args.get('date') or month, FISCAL_YEAR_START_MONTH)
+    except ValueError:
+        abort(400)
 
-    data = TransactionService.summary_by_month(
-        user_id, month, 'income'
+    data = TransactionService.summary_by_period(
+        user_id, start, end, 'income'
     )
-    return render_template('income.html', data=data, month=month)
+    return render_template('income.html', data=data, month=month, period=period, start=start, end=end)
 
 @app.route('/analysis')
 def analysis():
     user_id = session['user_id']
     
-    # Charts (giữ nguyên)
-    balance_data = AnalysisService.balance_timeline(user_id)
-    expense_data = AnalysisService.category_summary(user_id, 'expense')
-    income_data = AnalysisService.category_summary(user_id, 'income')
-    totals = AnalysisService.get_totals(user_id)
-
-    # ✅ THÊM: LẤY TOÀN BỘ GIAO DỊCH
-    transactions = (
-        Transaction.find_all_by_user(user_id)
-    )
+    # Cửa sổ biểu đồ số dư: ?days=30|90|365 (hoặc ?start=&end=), ?granularity=day|week|month
+    days = min(max(request.args.get('days', 90, type=int), 1), 3660)
+    granularity = request.args.get('granularity', 'day')
+    if granularity not in ('day', 'week', 'month'):
+        granularity = 'day'
+
+    # Charts: số dư, danh mục thu/chi và tổng cộng - một câu lệnh SQL (UNION ALL)
+    try:
+        snapshot = AnalysisService.snapshot(
+            user_id, days=days, start=request.args.get('start'),
+            end=request.args.get('end'), granularity=granularity
+        )
+    except ValueError:
+        abort(400)
+
+    # Chỉ trang đầu danh sách giao dịch; các trang sau tải qua /api/transactions khi cuộn
+    transactions, next_cursor = Transaction.page_by_user(user_id, TRANSACTION_PAGE_SIZE)
 
     return render_template(
         'analysis.html',
-        balance_data=balance_data,
-        expense_data=expense_data,
-        income_data=income_data,
-        total_income=totals['total_income'],
-        total_expense=totals['total_expense'],
-        transactions=transactions   # ✅ QUAN TRỌNG
+        balance_data=snapshot['balance_data'],
+        expense_data=snapshot['expense_data'],
+        income_data=snapshot['income_data'],
+        total_income=snapshot['total_income'],
+        total_expense=snapshot['total_expense'],
+        transactions=transactions,   # ✅ QUAN TRỌNG
+        next_cursor=next_cursor
     )
 
 
+@app.route('/api/transactions')
+def api_transactions():
+    """API danh sách giao dịch theo trang (?cursor= lấy từ next_cursor của trang trước)"""
+    user_id = session['user_id']
+    limit = min(max(request.args.get('limit', TRANSACTION_PAGE_SIZE, type=int), 1), 200)
+    try:
+        items, next_cursor = Transaction.page_by_user(user_id, limit, request.args.get('cursor'))
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+    return jsonify({'items': items, 'next_cursor': next_cursor})
+
 @app.route('/api/categories')
 def api_categories():
     user_id = session['user_id']
@@ -478,7 +724,7 @@ def api_create_category():
         cat = Category.create(name, type_, user_id)
         return jsonify(cat)
     except Exception as e:
-        print("❌ Create category error:", e)
+        log.exception('Create category error: %s', e)
         return jsonify({'error': 'Server error'}), 500
 
 
@@ -493,6 +739,10 @@ def not_found(error):
 def internal_error(error):
     return "Lỗi server", 500
 
+@app.errorhandler(AIUnavailable)
+def ai_unavailable(error):
+    return jsonify({'success': False, 'error': f'AI không khả dụng: {error}'}), 503
+
 # ==================== MAIN ====================
 
 if __name__ == '__main__':
@@ -0,0 +1 @@
+"""Benchmark scripts - chạy bằng ``python -m benchmarks.<tên>`` từ thư mục gốc dự án"""
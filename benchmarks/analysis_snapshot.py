@@ -0,0 +1,78 @@
+"""
+Benchmark: dữ liệu biểu đồ trang /analysis.
+
+So sánh đường cũ (balance_timeline + category_summary x2 + get_totals: bốn
+truy vấn) với AnalysisService.snapshot (một câu lệnh UNION ALL) khi lịch sử giao dịch
+của user tăng dần. Cache kết quả bị tắt (temp_database), nên số đo là SQL thật.
+
+Với rollup, bốn truy vấn cũ vốn đã rẻ: snapshot chỉ nhanh hơn khoảng 1.0-1.3x
+(vd. 0.77 vs 0.74 ms ở 1k giao dịch, 2.1 vs 1.8 ms ở 20k), dao động giữa các lần
+chạy cùng cỡ với chênh lệch. Lợi ích chính là một lần đọc nhất quán, không phải tốc độ.
+
+    python -m benchmarks.analysis_snapshot
+    python -m benchmarks.analysis_snapshot --sizes 1000,100000 --repeat 50
+"""
+import argparse
+import random
+import time
+from datetime import date, timedelta
+
+from benchmarks.common import temp_database, insert_transactions, median_ms
+
+
+def _rows(user_id, category_ids, start_index, target, rng):
+    """Giao dịch rải đều ~2 năm gần nhất, ~1/5 là thu nhập"""
+    today = date.today()
+    now = time.strftime('%Y-%m-%dT%H:%M:%S')
+    for _ in range(start_index, target):
+        trans_type = 'income' if rng.random() < 0.2 else 'expense'
+        day = today - timedelta(days=rng.randrange(730))
+        yield (user_id, rng.choice(category_ids[trans_type]), rng.randrange(10, 2000) * 1000,
+               None, day.isoformat(), trans_type, now, now)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--sizes', default='1000,10000,100000,500000',
+                        help='số giao dịch của user, phân cách bằng dấu phẩy')
+    parser.add_argument('--repeat', type=int, default=20)
+    args = parser.parse_args()
+    sizes = sorted(int(s) for s in args.sizes.split(','))
+
+    temp_database('bench_analysis_')
+    from models import db, User, Category
+    from services import AnalysisService
+
+    rng = random.Random(42)
+    with db.transaction():
+        user = User.create('bench', 'Bench', None, 'bench')
+        category_ids = {
+            trans_type: [Category.create(f'{trans_type} {i}', trans_type, user['id'])['id'] for i in range(8)]
+            for trans_type in ('expense', 'income')
+        }
+    user_id = user['id']
+
+    def old_path():
+        AnalysisService.balance_timeline(user_id)
+        AnalysisService.category_summary(user_id, 'expense')
+        AnalysisService.category_summary(user_id, 'income')
+        AnalysisService.get_totals(user_id)
+
+    def new_path():
+        AnalysisService.snapshot(user_id)
+
+    print(f"\n{'transactions':>14} {'4 queries (ms)':>15} {'snapshot (ms)':>14} {'speedup':>8}")
+    current = 0
+    for size in sizes:
+        insert_transactions(db, list(_rows(user_id, category_ids, current, size, rng)))
+        current = size
+        with db.connection():
+            old_ms = median_ms(old_path, args.repeat)
+            new_ms = median_ms(new_path, args.repeat)
+        print(f"{size:>14,} {old_ms:>15.3f} {new_ms:>14.3f} {old_ms / new_ms:>7.1f}x")
+
+    db.close_all()
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,86 @@
+"""Tiện ích dùng chung cho các benchmark: DB tạm, chèn dữ liệu hàng loạt, đo thời gian"""
+import os
+import sqlite3
+import statistics
+import tempfile
+import time
+from typing import Callable, List, Sequence, Tuple
+
+TRANSACTION_INSERT = (
+    'INSERT INTO "Transaction" (userId, categoryId, amount, note, date, type, createdAt, updatedAt) '
+    'VALUES (?, ?, ?, ?, ?, ?, ?, ?)'
+)
+
+
+def temp_database(prefix: str) -> str:
+    """Trỏ DATABASE_PATH tới một file DB tạm và tạo schema; tắt cache kết quả để đo SQL thật.
+
+    Phải gọi trước khi import models/services (Database đọc DATABASE_PATH, services đọc
+    CACHE_BACKEND lúc import).
+    """
+    path = os.path.join(tempfile.mkdtemp(prefix=prefix), 'bench.db')
+    os.environ['DATABASE_PATH'] = path
+    os.environ['CACHE_BACKEND'] = 'none'
+    from init_db import init_database
+    init_database(path)
+    return path
+
+
+def cached_database(path: str, build: Callable[[str], None]) -> str:
+    """Database dùng lại giữa các lần chạy: nếu chưa có thì ``build(file tạm)`` rồi đổi tên.
+
+    Lần build bị ngắt giữa chừng không để lại file dở; file đã có thì chỉ áp dụng migration mới.
+    """
+    from init_db import init_database
+
+    if os.path.exists(path):
+        init_database(path)
+        return path
+    os.makedirs(os.path.dirname(path) or '.', exist_ok=True)
+    building = path + '.building'
+    for suffix in ('', '-wal', '-shm'):
+        if os.path.exists(building + suffix):
+            os.remove(building + suffix)
+    build(building)
+    # Gộp WAL vào file chính trước khi đổi tên
+    conn = sqlite3.connect(building)
+    conn.execute('PRAGMA wal_checkpoint(TRUNCATE)')
+    conn.close()
+    os.replace(building, path)
+    for suffix in ('-wal', '-shm'):
+        if os.path.exists(building + suffix):
+            os.remove(building + suffix)
+    return path
+
+
+def insert_transactions(db, rows: Sequence[Tuple]):
+    """Chèn nhiều giao dịch (tuple theo thứ tự TRANSACTION_INSERT) trong một transaction.
+
+    Như các model, báo ``db.notify_write`` cho từng user để cache (nếu bật) không trả dữ liệu cũ.
+    """
+    with db.transaction() as conn:
+        conn.executemany(TRANSACTION_INSERT, rows)
+        for user_id in {row[0] for row in rows}:
+            db.notify_write(user_id)
+
+
+def sample_ms(fn: Callable, repeat: int) -> List[float]:
+    samples = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        fn()
+        samples.append((time.perf_counter() - started) * 1000)
+    return samples
+
+
+def median_ms(fn: Callable, repeat: int) -> float:
+    return statistics.median(sample_ms(fn, repeat))
+
+
+def percentile(samples, q: float) -> float:
+    """Percentile nội suy tuyến tính (q trong [0, 1])"""
+    ordered = sorted(samples)
+    position = (len(ordered) - 1) * q
+    low = int(position)
+    high = min(low + 1, len(ordered) - 1)
+    return ordered[low] + (ordered[high] - ordered[low]) * (position - low)
@@ -0,0 +1,59 @@
+"""
+Benchmark: thời gian ``import app`` trong một process mới (khởi động worker, reload, test).
+
+Mỗi lần đo chạy một interpreter riêng để không dính cache module của lần trước.
+In thêm các module nặng đã được nạp sẵn (google.generativeai, ai_advisor) để thấy
+phần nào còn bị import lúc khởi động.
+
+    python -m benchmarks.import_time
+    python -m benchmarks.import_time --repeat 10
+"""
+import argparse
+import json
+import os
+import subprocess
+import sys
+
+from benchmarks.common import temp_database
+
+PROBE = '''
+import json, sys, time
+t = time.perf_counter()
+import app
+elapsed = time.perf_counter() - t
+print(json.dumps({
+    'ms': elapsed * 1000,
+    'loaded': [m for m in ('ai_advisor', 'google.generativeai') if m in sys.modules],
+}))
+'''
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--repeat', type=int, default=5)
+    args = parser.parse_args()
+
+    temp_database('bench_import_')
+    root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+    env = dict(os.environ)
+    env.setdefault('GEMINI_API_KEY', 'benchmark-key')
+
+    timings = []
+    loaded = []
+    for _ in range(args.repeat):
+        out = subprocess.run(
+            [sys.executable, '-c', PROBE], cwd=root, env=env,
+            capture_output=True, text=True, check=True
+        ).stdout
+        result = json.loads(out.strip().splitlines()[-1])
+        timings.append(result['ms'])
+        loaded = result['loaded']
+
+    timings.sort()
+    print(f"import app: median {timings[len(timings) // 2]:.1f} ms, "
+          f"min {timings[0]:.1f} ms, max {timings[-1]:.1f} ms ({args.repeat} lần)")
+    print(f"Module AI đã nạp lúc import: {', '.join(loaded) or '(không có)'}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,418 @@
+"""
+Load test HTTP: nhiều user đăng nhập đồng thời, gọi một tổ hợp route có trọng số.
+
+Đo các hiệu ứng tranh chấp mà benchmark từng hàm không thấy: khóa ghi SQLite, pool
+kết nối, hàng đợi job AI. Mặc định chạy app trong một process con (werkzeug đa luồng
+như ``app.run``) trên bản sao của một database seed bằng seed_db (giữ trong
+``--data-dir`` để lần sau dùng lại); ``--url`` thì bắn vào server đang chạy sẵn
+(database của nó phải được seed bằng seed_db - user ``user0000001``..., mật khẩu ``password``).
+
+Mỗi user ảo là một thread với cookie riêng, lặp lại: chọn route theo trọng số, gửi
+request, ghi latency. ``/ai/ask`` dùng model giả lập (AI_FAKE_MODEL=1, hoặc ``--ai local``
+cho bộ quy tắc offline) và poll job tới khi xong. Báo cáo throughput, p50/p95/p99 theo
+route, tỷ lệ lỗi, số phản hồi chứa ``database is locked`` và chênh lệch các metric
+của server (chờ pool, lời gọi AI) trong lúc đo.
+
+    python -m benchmarks.load_test                                  # 16 user, 30 giây
+    python -m benchmarks.load_test --concurrency 64 --duration 60
+    python -m benchmarks.load_test --mix transaction_create=50,index=50
+    python -m benchmarks.load_test --url http://127.0.0.1:5000 --users 100
+"""
+import argparse
+import json
+import logging
+import os
+import random
+import shutil
+import socket
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+import urllib.error
+import urllib.parse
+import urllib.request
+from collections import defaultdict
+from datetime import date
+from http.cookiejar import CookieJar
+
+from benchmarks.common import cached_database, percentile
+
+# route -> trọng số mặc định (% request). /expenses và /income chưa có template
+# (luôn 500) nên không nằm trong tổ hợp - thêm lại khi có trang
+DEFAULT_MIX = {
+    'index': 25,
+    'analysis': 20,
+    'api_categories': 25,
+    'transaction_create': 25,
+    'ai_ask': 5,
+}
+
+QUESTIONS = [
+    'Làm sao để tiết kiệm nhiều hơn mỗi tháng?',
+    'Tôi có nên giảm chi tiêu ăn uống không?',
+    'Bao lâu nữa tôi đạt được mục tiêu tiết kiệm?',
+    'Quỹ dự phòng của tôi đã đủ chưa?',
+]
+
+LOCKED = b'database is locked'
+# Metric của server so sánh trước/sau khi đo (tiền tố tên dòng trong /metrics)
+SERVER_METRICS = ('db_pool_waits_total', 'db_query_errors_total', 'ai_model_calls_total', 'ai_fallback_total')
+
+
+class _NoRedirect(urllib.request.HTTPRedirectHandler):
+    """Không theo redirect: 302 là kết quả của chính request (cookie vẫn được lưu)"""
+
+    def redirect_request(self, req, fp, code, msg, headers, newurl):
+        return None
+
+
+class Recorder:
+    """Gom latency/lỗi theo route (bỏ qua request bắt đầu trước khi hết warmup)"""
+
+    def __init__(self, measure_from: float):
+        self.measure_from = measure_from
+        self.latencies = defaultdict(list)
+        self.errors = defaultdict(lambda: defaultdict(int))
+        self.locked = defaultdict(int)
+        self._lock = threading.Lock()
+
+    def record(self, route: str, started: float, seconds: float, error: str = None, locked: bool = False):
+        if started < self.measure_from:
+            return
+        with self._lock:
+            self.latencies[route].append(seconds * 1000)
+            if error:
+                self.errors[route][error] += 1
+            if locked:
+                self.locked[route] += 1
+
+
+class VirtualUser:
+    def __init__(self, base_url: str, username: str, password: str, recorder: Recorder, rng: random.Random):
+        self.base_url = base_url.rstrip('/')
+        self.username = username
+        self.password = password
+        self.recorder = recorder
+        self.rng = rng
+        self.opener = urllib.request.build_opener(urllib.request.HTTPCookieProcessor(CookieJar()), _NoRedirect())
+        self.expense_categories = []
+
+    def request(self, method: str, path: str, form=None, json_body=None):
+        """(status, body, location) - lỗi HTTP cũng là một phản hồi"""
+        data, headers = None, {}
+        if form is not None:
+            data = urllib.parse.urlencode(form).encode()
+            headers['Content-Type'] = 'application/x-www-form-urlencoded'
+        elif json_body is not None:
+            data = json.dumps(json_body).encode()
+            headers['Content-Type'] = 'application/json'
+        req = urllib.request.Request(self.base_url + path, data=data, headers=headers, method=method)
+        try:
+            with self.opener.open(req, timeout=60) as response:
+                return response.status, response.read(), response.headers.get('Location')
+        except urllib.error.HTTPError as e:
+            body = e.read()
+            e.close()
+            return e.code, body, e.headers.get('Location')
+
+    def login(self):
+        status, _, location = self.request('POST', '/login', form={'username': self.username,
+                                                                   'password': self.password})
+        if status != 302 or (location and '/login' in location):
+            raise RuntimeError(f'Đăng nhập {self.username} thất bại (status {status}) - database đã seed bằng seed_db?')
+        status, body, _ = self.request('GET', '/api/categories?type=expense')
+        self.expense_categories = [c['id'] for c in json.loads(body)] if status == 200 else []
+
+    def timed(self, route: str, method: str, path: str, expect=(200,), **kwargs):
+        started = time.perf_counter()
+        try:
+            status, body, location = self.request(method, path, **kwargs)
+        except Exception as e:
+            self.recorder.record(route, started, time.perf_counter() - started, type(e).__name__)
+            return None, None
+        seconds = time.perf_counter() - started
+        error = None
+        if status not in expect:
+            error = str(status)
+        elif location and '/login' in location:
+            error = 'session'   # mất phiên đăng nhập
+        self.recorder.record(route, started, seconds, error, LOCKED in body)
+        return status, body
+
+    # ---------- route ----------
+
+    def index(self):
+        self.timed('index', 'GET', '/')
+
+    def analysis(self):
+        self.timed('analysis', 'GET', '/analysis')
+
+    def api_categories(self):
+        self.timed('api_categories', 'GET', '/api/categories?type=expense')
+
+    def transaction_create(self):
+        # Lỗi ghi (kể cả database is locked) được flash rồi redirect - hiện ở trang render kế tiếp
+        self.timed('transaction_create', 'POST', '/transaction/create', expect=(302,), form={
+            'category_id': self.rng.choice(self.expense_categories or [1]),
+            'amount': self.rng.randrange(10, 500) * 1000,
+            'date': date.today().isoformat(),
+            'type': 'expense',
+            'note': 'load test',
+        })
+
+    def ai_ask(self):
+        started = time.perf_counter()
+        status, body = self.timed('ai_ask', 'POST', '/ai/ask', expect=(202,),
+                                  json_body={'question': self.rng.choice(QUESTIONS)})
+        if status != 202:
+            return
+        job = json.loads(body)
+        deadline = time.monotonic() + 60
+        error = 'timeout'
+        while time.monotonic() < deadline:
+            time.sleep(0.05)
+            status, body = self.timed('ai_job_status', 'GET', job['status_url'])
+            if status != 200:
+                error = f'status {status}'
+                break
+            state = json.loads(body)['status']
+            if state in ('done', 'error'):
+                error = None if state == 'done' else 'job error'
+                break
+        # Thời gian từ lúc gửi câu hỏi tới khi job xong
+        self.recorder.record('ai_ask (job)', started, time.perf_counter() - started, error)
+
+    def run(self, mix, stop_at: float):
+        routes = list(mix)
+        weights = [mix[r] for r in routes]
+        while time.perf_counter() < stop_at:
+            getattr(self, self.rng.choices(routes, weights)[0])()
+
+
+def parse_mix(text: str):
+    mix = {}
+    for part in text.split(','):
+        name, _, weight = part.partition('=')
+        name = name.strip()
+        if name not in DEFAULT_MIX:
+            raise ValueError(f"route không tồn tại: {name} (có: {', '.join(DEFAULT_MIX)})")
+        mix[name] = float(weight or 1)
+    return mix
+
+
+def scrape_metrics(base_url: str):
+    """{dòng metric: giá trị} của các SERVER_METRICS; {} nếu server không bật /metrics hoặc từ chối
+
+    Server ở máy khác (--url) cần METRICS_TOKEN giống server.
+    """
+    try:
+        req = urllib.request.Request(base_url.rstrip('/') + '/metrics')
+        if os.getenv('METRICS_TOKEN'):
+            req.add_header('Authorization', f"Bearer {os.environ['METRICS_TOKEN']}")
+        with urllib.request.urlopen(req, timeout=10) as response:
+            text = response.read().decode()
+    except Exception:
+        return {}
+    values = {}
+    for line in text.splitlines():
+        if line.startswith(SERVER_METRICS):
+            name, _, value = line.rpartition(' ')
+            values[name] = float(value)
+    return values
+
+
+# ---------- server ----------
+
+def ensure_database(data_dir: str, users: int, transactions: int, seed_value: int) -> str:
+    """Database seed sẵn ``users`` × ``transactions`` (tạo ở lần chạy đầu, sau đó dùng lại)"""
+    import seed_db
+
+    def build(path):
+        print(f"🌱 Seed database {users:,} user × {transactions:,} giao dịch")
+        seed_db.seed(path, users=users, transactions=transactions, goals=5, seed_value=seed_value)
+
+    return cached_database(os.path.join(data_dir, f'load_{users}_{transactions}_{seed_value}.db'), build)
+
+
+def serve(port: int):
+    """Chạy app bằng werkzeug đa luồng (như app.run, không reloader/debugger)"""
+    from werkzeug.serving import make_server
+    from app import app
+
+    # Không log từng request (werkzeug tự đặt mức INFO cho logger của nó)
+    logging.getLogger('werkzeug').setLevel(logging.WARNING)
+    make_server('127.0.0.1', port, app, threaded=True).serve_forever()
+
+
+def start_server(db_path: str, ai: str, log_path: str):
+    with socket.socket() as sock:
+        sock.bind(('127.0.0.1', 0))
+        port = sock.getsockname()[1]
+    env = dict(os.environ, DATABASE_PATH=db_path)
+    if ai == 'local':
+        env['AI_BACKEND'] = 'local'
+    else:
+        env['AI_FAKE_MODEL'] = '1'
+    # Model giả lập không cần probe; cache AI tắt để mỗi câu hỏi thật sự chạy model
+    for name, value in (('AI_HEALTH_PROBE', '0'), ('AI_CACHE_TTL', '0'),
+                        ('LOG_LEVEL', 'WARNING'), ('SLOW_QUERY_MS', '0')):
+        env.setdefault(name, value)
+    # Output của server (log WARNING trở lên, traceback lỗi 500) ghi vào log_path
+    with open(log_path, 'w', encoding='utf-8') as log_file:
+        process = subprocess.Popen([sys.executable, '-m', 'benchmarks.load_test', '--serve', str(port)],
+                                   env=env, stdout=log_file, stderr=subprocess.STDOUT)
+    base_url = f'http://127.0.0.1:{port}'
+    deadline = time.monotonic() + 30
+    while time.monotonic() < deadline:
+        if process.poll() is not None:
+            raise RuntimeError(f'Server thoát với mã {process.returncode} (xem {log_path})')
+        try:
+            urllib.request.urlopen(base_url + '/login', timeout=1).close()
+            return process, base_url
+        except OSError:
+            time.sleep(0.2)
+    process.terminate()
+    raise RuntimeError('Server không khởi động trong 30 giây')
+
+
+# ---------- báo cáo ----------
+
+def summarize(recorder: Recorder, seconds: float):
+    routes = {}
+    for route, samples in sorted(recorder.latencies.items()):
+        errors = sum(recorder.errors[route].values())
+        routes[route] = {
+            'requests': len(samples),
+            'rps': round(len(samples) / seconds, 2),
+            'errors': errors,
+            'error_rate': round(errors / len(samples), 4),
+            'errors_by_kind': dict(recorder.errors[route]),
+            'locked': recorder.locked[route],
+            'p50_ms': round(percentile(samples, 0.5), 2),
+            'p95_ms': round(percentile(samples, 0.95), 2),
+            'p99_ms': round(percentile(samples, 0.99), 2),
+            'max_ms': round(max(samples), 2),
+        }
+    # 'ai_ask (job)' là thời gian tổng hợp của một chuỗi request, không tính vào tổng
+    http = [r for name, r in routes.items() if name != 'ai_ask (job)']
+    all_samples = [s for name, samples in recorder.latencies.items() if name != 'ai_ask (job)' for s in samples]
+    total = sum(r['requests'] for r in http)
+    errors = sum(r['errors'] for r in http)
+    return {
+        'seconds': round(seconds, 1),
+        'requests': total,
+        'rps': round(total / seconds, 2),
+        'errors': errors,
+        'error_rate': round(errors / total, 4) if total else 0,
+        'locked': sum(r['locked'] for r in http),
+        'p50_ms': round(percentile(all_samples, 0.5), 2) if all_samples else None,
+        'p95_ms': round(percentile(all_samples, 0.95), 2) if all_samples else None,
+        'p99_ms': round(percentile(all_samples, 0.99), 2) if all_samples else None,
+        'routes': routes,
+    }
+
+
+def print_report(report, server_delta):
+    print(f"\n{'route':<20} {'n':>7} {'req/s':>8} {'lỗi':>6} {'locked':>7} "
+          f"{'p50 (ms)':>9} {'p95 (ms)':>9} {'p99 (ms)':>9} {'max (ms)':>9}")
+    for name, r in report['routes'].items():
+        print(f"{name:<20} {r['requests']:>7,} {r['rps']:>8.1f} {r['errors']:>6,} {r['locked']:>7,} "
+              f"{r['p50_ms']:>9.1f} {r['p95_ms']:>9.1f} {r['p99_ms']:>9.1f} {r['max_ms']:>9.1f}")
+    print(f"\n📈 {report['requests']:,} request trong {report['seconds']} giây: {report['rps']:.1f} req/s, "
+          f"p50 {report['p50_ms']} ms, p95 {report['p95_ms']} ms, p99 {report['p99_ms']} ms")
+    print(f"   Lỗi: {report['errors']:,} ({report['error_rate']:.1%}), 'database is locked': {report['locked']:,}")
+    for name, r in report['routes'].items():
+        if r['errors_by_kind']:
+            kinds = ', '.join(f'{kind} × {count}' for kind, count in sorted(r['errors_by_kind'].items()))
+            print(f"   ⚠️  {name}: {kinds}")
+    if server_delta:
+        print("\n🖥️  Metric server trong lúc đo:")
+        for name, value in sorted(server_delta.items()):
+            print(f"   {name} +{value:g}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--concurrency', '-c', type=int, default=16, help='số user ảo chạy đồng thời')
+    parser.add_argument('--duration', type=float, default=30, help='thời gian đo (giây)')
+    parser.add_argument('--warmup', type=float, default=5, help='thời gian chạy trước khi bắt đầu ghi (giây)')
+    parser.add_argument('--mix', default=None,
+                        help='trọng số route, vd "index=20,transaction_create=10" (mặc định: DEFAULT_MIX)')
+    parser.add_argument('--url', default=None, help='server đang chạy sẵn (bỏ qua việc tạo database/server)')
+    parser.add_argument('--users', type=int, default=50, help='số user seed (user ảo dùng lần lượt)')
+    parser.add_argument('--transactions', type=int, default=2000, help='số giao dịch seed mỗi user')
+    parser.add_argument('--seed', type=int, default=42)
+    parser.add_argument('--data-dir', default=os.path.join(tempfile.gettempdir(), 'savings_bench'),
+                        help='thư mục giữ các database đã seed')
+    parser.add_argument('--ai', choices=('fake', 'local'), default='fake',
+                        help='/ai/ask dùng model giả lập hay bộ quy tắc offline')
+    parser.add_argument('--password', default='password', help='mật khẩu của các user seed')
+    parser.add_argument('--json', default=None, help='ghi báo cáo ra file JSON')
+    parser.add_argument('--serve', type=int, default=None, help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.serve is not None:
+        serve(args.serve)
+        return
+
+    try:
+        mix = parse_mix(args.mix) if args.mix else dict(DEFAULT_MIX)
+    except ValueError as e:
+        parser.error(str(e))
+
+    process = workdir = None
+    base_url = args.url
+    if base_url is None:
+        seeded = ensure_database(args.data_dir, args.users, args.transactions, args.seed)
+        # Chạy trên bản sao để các lần đo bắt đầu từ cùng dữ liệu
+        workdir = tempfile.mkdtemp(prefix='load_test_')
+        db_path = os.path.join(workdir, 'load.db')
+        shutil.copyfile(seeded, db_path)
+        server_log = os.path.join(args.data_dir, 'load_test_server.log')
+        process, base_url = start_server(db_path, args.ai, server_log)
+        print(f"🖥️  Server {base_url} (log: {server_log})")
+
+    try:
+        recorder = Recorder(float('inf'))
+        rng = random.Random(args.seed)
+        clients = [VirtualUser(base_url, f'user{i % args.users + 1:07d}', args.password, recorder,
+                               random.Random(rng.random())) for i in range(args.concurrency)]
+        print(f"🔑 Đăng nhập {len(clients)} user ảo...")
+        for client in clients:
+            client.login()
+
+        before = scrape_metrics(base_url)
+        print(f"🚀 {args.concurrency} user đồng thời, warmup {args.warmup:g} giây + đo {args.duration:g} giây -> {base_url}")
+        recorder.measure_from = time.perf_counter() + args.warmup
+        stop_at = recorder.measure_from + args.duration
+        threads = [threading.Thread(target=client.run, args=(mix, stop_at), daemon=True) for client in clients]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        # Request cuối cùng có thể kết thúc sau stop_at
+        elapsed = max(time.perf_counter(), stop_at) - recorder.measure_from
+        after = scrape_metrics(base_url)
+    finally:
+        if process is not None:
+            process.terminate()
+            process.wait()
+        if workdir is not None:
+            shutil.rmtree(workdir, ignore_errors=True)
+
+    report = summarize(recorder, elapsed)
+    # Metric server tính cả warmup (chỉ scrape được trước khi bắt đầu)
+    server_delta = {name: value - before.get(name, 0) for name, value in after.items()
+                    if value - before.get(name, 0)}
+    print_report(report, server_delta)
+    if args.json:
+        report.update({'concurrency': args.concurrency, 'mix': mix, 'server_metrics': server_delta})
+        with open(args.json, 'w', encoding='utf-8') as f:
+            json.dump(report, f, indent=2, ensure_ascii=False)
+        print(f"\n💾 Đã ghi báo cáo: {args.json}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,81 @@
+"""
+Benchmark: trang /expenses khi lịch sử giao dịch của user tăng dần.
+
+So sánh bộ lọc tháng cũ ``strftime('%Y-%m', t.date) = ?`` (quét toàn bộ lịch
+sử) với TransactionService.summary_by_month hiện nay (khoảng nửa mở
+``>= ? AND < ?``, đọc từ rollup TransactionMonthly). Tháng hiện tại luôn có cùng
+số giao dịch; chỉ phần lịch sử cũ hơn tăng lên, nên đường mới phải giữ thời gian
+gần như không đổi. Cache kết quả bị tắt (temp_database), nên mỗi lần đo là SQL thật.
+
+    python -m benchmarks.month_filter
+    python -m benchmarks.month_filter --sizes 1000,100000,1000000 --repeat 50
+"""
+import argparse
+import random
+import time
+from datetime import date, timedelta
+
+from benchmarks.common import temp_database, insert_transactions, median_ms
+
+ROWS_PER_MONTH = 300
+
+LEGACY_QUERY = '''
+    SELECT c.name as category,
+           SUM(t.amount) as total
+    FROM "Transaction" t
+    JOIN Category c ON t.categoryId = c.id
+    WHERE t.userId = ?
+      AND t.type = ?
+      AND strftime('%Y-%m', t.date) = ?
+    GROUP BY c.id
+    ORDER BY total DESC
+'''
+
+
+def _grow_history(db, user_id, category_ids, start_index, target, rng):
+    """Thêm giao dịch lùi dần về quá khứ cho tới khi đủ ``target`` dòng"""
+    today = date.today().replace(day=1)
+    now = time.strftime('%Y-%m-%dT%H:%M:%S')
+    rows = []
+    for i in range(start_index, target):
+        month_offset = i // ROWS_PER_MONTH
+        index = today.year * 12 + today.month - 1 - month_offset
+        day = date(index // 12, index % 12 + 1, 1) + timedelta(days=rng.randrange(28))
+        rows.append((user_id, rng.choice(category_ids), rng.randrange(10, 2000) * 1000,
+                     None, day.isoformat(), 'expense', now, now))
+    insert_transactions(db, rows)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--sizes', default='1000,10000,100000,500000',
+                        help='số giao dịch lịch sử của user, phân cách bằng dấu phẩy')
+    parser.add_argument('--repeat', type=int, default=20)
+    args = parser.parse_args()
+    sizes = sorted(int(s) for s in args.sizes.split(','))
+
+    temp_database('bench_month_')
+    # Import sau khi đặt DATABASE_PATH để models dùng DB tạm
+    from models import db, User, Category
+    from services import TransactionService
+
+    rng = random.Random(42)
+    with db.transaction():
+        user = User.create('bench', 'Bench', None, 'bench')
+        category_ids = [Category.create(f'Cat {i}', 'expense', user['id'])['id'] for i in range(8)]
+
+    month = date.today().strftime('%Y-%m')
+    print(f"\n{'history rows':>14} {'range (ms)':>12} {'strftime (ms)':>14}")
+    current = 0
+    for size in sizes:
+        _grow_history(db, user['id'], category_ids, current, size, rng)
+        current = size
+        new_ms = median_ms(lambda: TransactionService.summary_by_month(user['id'], month, 'expense'), args.repeat)
+        old_ms = median_ms(lambda: db.execute(LEGACY_QUERY, (user['id'], 'expense', month)), args.repeat)
+        print(f"{size:>14,} {new_ms:>12.3f} {old_ms:>14.3f}")
+
+    db.close_all()
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,62 @@
+"""
+Benchmark: kích thước prompt của quick_advice theo số mục tiêu tiết kiệm.
+
+So sánh bối cảnh cũ (``f"Bối cảnh: {context}"`` - repr của cả dict, danh sách mục
+tiêu lặp hai lần kèm mọi cột) với ai_advisor.compact_context. Không gọi model.
+
+    python -m benchmarks.prompt_size
+    python -m benchmarks.prompt_size --goals 1,10,50,200 --budget 800
+"""
+import argparse
+import random
+from datetime import date, timedelta
+
+from ai_advisor import compact_context
+
+QUESTION = 'Tôi nên tiết kiệm bao nhiêu mỗi tháng để mua xe?'
+HEADER = f"Bạn là chuyên gia tài chính cá nhân. Trả lời ngắn gọn bằng tiếng Việt:\n\n{QUESTION}"
+CATEGORIES = ['Ăn uống', 'Nhà ở', 'Đi lại', 'Giải trí', 'Mua sắm', 'Sức khỏe', 'Giáo dục', 'Hóa đơn']
+
+
+def sample_context(goal_count: int, rng: random.Random):
+    """Dict cùng dạng SavingsService.get_financial_data_for_ai với ``goal_count`` mục tiêu"""
+    now = '2026-01-01T08:00:00.000000'
+    goals = []
+    for i in range(goal_count):
+        target = rng.randrange(10, 500) * 1_000_000
+        goals.append({
+            'id': i + 1, 'name': f'Mục tiêu {i + 1}', 'targetAmount': float(target),
+            'currentAmount': float(rng.randrange(0, target)),
+            'deadline': (date(2026, 1, 1) + timedelta(days=rng.randrange(30, 1500))).isoformat(),
+            'userId': 1, 'createdAt': now, 'updatedAt': now,
+        })
+    expense = {name: float(rng.randrange(1, 20) * 1_000_000) for name in CATEGORIES}
+    income = {'Lương': 150_000_000.0, 'Thưởng': 20_000_000.0}
+    total_income, total_expense = sum(income.values()), sum(expense.values())
+    return {
+        'total_income': total_income, 'total_expense': total_expense,
+        'monthly_avg_income': total_income / 6, 'monthly_avg_expense': total_expense / 6,
+        'current_savings': sum(g['currentAmount'] for g in goals),
+        'savings_goals': goals, 'expense_by_category': expense, 'income_by_category': income,
+        'period_months': 6, 'monthly_income': total_income / 6, 'monthly_expense': total_expense / 6,
+        'other_goals': goals,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--goals', default='0,3,10,50,200', help='số mục tiêu, phân cách bằng dấu phẩy')
+    parser.add_argument('--budget', type=int, default=None, help='ngân sách ký tự (mặc định AI_CONTEXT_BUDGET)')
+    args = parser.parse_args()
+
+    rng = random.Random(42)
+    print(f"{'mục tiêu':>9} {'cũ (ký tự)':>12} {'mới (ký tự)':>12} {'giảm':>7}")
+    for count in (int(n) for n in args.goals.split(',')):
+        context = sample_context(count, rng)
+        old = len(HEADER + f"\n\nBối cảnh: {context}")
+        new = len(HEADER + "\n\nBối cảnh tài chính:\n" + compact_context(context, QUESTION, args.budget))
+        print(f"{count:>9} {old:>12,} {new:>12,} {(1 - new / old) * 100:>6.1f}%")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,181 @@
+"""
+Benchmark suite: các đường truy vấn nóng của models/services ở nhiều kích thước dữ liệu.
+
+Mỗi kích thước (số giao dịch của user được đo) là một database seed bằng seed_db
+(giữ lại trong ``--data-dir`` để lần sau dùng lại), cộng thêm vài user khác làm nhiễu.
+Mỗi case ghi p50/p95 (ms) và bộ nhớ Python cấp phát đỉnh (tracemalloc, không gồm page
+cache của SQLite). ResultCache bị tắt để đo truy vấn thật.
+
+    python -m benchmarks.suite                              # so với baseline nếu đã có
+    python -m benchmarks.suite --save                       # ghi baseline mới
+    python -m benchmarks.suite --sizes 1000,100000,1000000 --tolerance 0.2
+    python -m benchmarks.suite --cases get_summary,get_totals
+
+Thoát với mã 1 khi p50 của một case chậm hơn baseline quá ``--tolerance`` (p95 quá
+``--p95-tolerance``) - tương đối, và quá ``--min-delta-ms`` tuyệt đối để bỏ qua nhiễu
+ở các case dưới 1 ms - hoặc bộ nhớ đỉnh tăng quá ``--memory-tolerance``.
+"""
+import argparse
+import json
+import os
+import platform
+import sqlite3
+import sys
+import tempfile
+import time
+import tracemalloc
+from datetime import date, datetime
+
+from benchmarks.common import cached_database, percentile, sample_ms
+
+DEFAULT_BASELINE = os.path.join(os.path.dirname(__file__), 'baseline.json')
+BENCH_USER = 1
+
+
+def build_cases(user_id):
+    from models import Transaction
+    from services import SavingsService, TransactionService, AnalysisService
+
+    month = date.today().strftime('%Y-%m')
+    return {
+        'get_summary': lambda: SavingsService.get_summary(user_id),
+        'summary_by_month': lambda: TransactionService.summary_by_month(user_id, month, 'expense'),
+        'balance_timeline': lambda: AnalysisService.balance_timeline(user_id),
+        'balance_timeline_365': lambda: AnalysisService.balance_timeline(user_id, days=365),
+        'category_summary': lambda: AnalysisService.category_summary(user_id, 'expense'),
+        'get_totals': lambda: AnalysisService.get_totals(user_id),
+        'find_all_by_user': lambda: Transaction.find_all_by_user(user_id),
+    }
+
+
+def ensure_database(data_dir: str, size: int, other_users: int, seed_value: int) -> str:
+    """Database đã seed cho ``size`` giao dịch (tạo ở lần chạy đầu, sau đó dùng lại)"""
+    import seed_db
+
+    def build(path):
+        print(f"🌱 Seed database {size:,} giao dịch")
+        seed_db.seed(path, users=1, transactions=size, goals=8, seed_value=seed_value)
+        if other_users:
+            seed_db.seed(path, users=other_users, transactions=1000, goals=3, seed_value=seed_value + 1)
+
+    return cached_database(os.path.join(data_dir, f'suite_{size}_{other_users}_{seed_value}.db'), build)
+
+
+def measure(fn, repeat: int, max_seconds: float, warmup: int = 2):
+    for _ in range(warmup):
+        fn()
+    samples = []
+    deadline = time.perf_counter() + max_seconds
+    while len(samples) < repeat and (len(samples) < 3 or time.perf_counter() < deadline):
+        samples.extend(sample_ms(fn, 1))
+
+    tracemalloc.start()
+    fn()
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return {
+        'p50_ms': round(percentile(samples, 0.5), 4),
+        'p95_ms': round(percentile(samples, 0.95), 4),
+        'peak_kib': round(peak / 1024, 1),
+        'samples': len(samples),
+    }
+
+
+def compare(results, baseline, tolerance: float, p95_tolerance: float, memory_tolerance: float,
+            min_delta_ms: float):
+    """Danh sách (khóa, mô tả) các case bị chậm/tốn bộ nhớ hơn baseline"""
+    regressions = []
+    for key, current in results.items():
+        base = baseline.get(key)
+        if not base:
+            continue
+        for metric, allowed in (('p50_ms', tolerance), ('p95_ms', p95_tolerance)):
+            limit = base[metric] * (1 + allowed)
+            if current[metric] > limit and current[metric] - base[metric] > min_delta_ms:
+                regressions.append((key, f"{metric} {base[metric]:.3f} -> {current[metric]:.3f} ms "
+                                         f"(+{(current[metric] / base[metric] - 1) * 100:.0f}%)"))
+        limit = base['peak_kib'] * (1 + memory_tolerance)
+        if current['peak_kib'] > limit and current['peak_kib'] - base['peak_kib'] > 64:
+            regressions.append((key, f"peak {base['peak_kib']:.0f} -> {current['peak_kib']:.0f} KiB"))
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--sizes', default='1000,100000,1000000', help='số giao dịch của user được đo')
+    parser.add_argument('--cases', default=None, help='chỉ chạy các case này (phân cách bằng dấu phẩy)')
+    parser.add_argument('--repeat', type=int, default=30, help='số lần đo tối đa mỗi case')
+    parser.add_argument('--max-seconds', type=float, default=10, help='thời gian đo tối đa mỗi case')
+    parser.add_argument('--other-users', type=int, default=20, help='số user nhiễu (1000 giao dịch mỗi user)')
+    parser.add_argument('--seed', type=int, default=42)
+    parser.add_argument('--data-dir', default=os.path.join(tempfile.gettempdir(), 'savings_bench'),
+                        help='thư mục giữ các database đã seed')
+    parser.add_argument('--baseline', default=DEFAULT_BASELINE, help='file JSON baseline')
+    parser.add_argument('--save', action='store_true', help='ghi kết quả làm baseline mới')
+    parser.add_argument('--tolerance', type=float, default=0.25, help='mức chậm hơn cho phép (0.25 = 25%%)')
+    parser.add_argument('--p95-tolerance', type=float, default=0.5, help='như --tolerance cho p95 (nhiễu hơn)')
+    parser.add_argument('--memory-tolerance', type=float, default=0.25)
+    parser.add_argument('--min-delta-ms', type=float, default=0.5,
+                        help='bỏ qua chênh lệch tuyệt đối nhỏ hơn mức này')
+    args = parser.parse_args()
+
+    # Đo truy vấn thật: tắt cache kết quả và slow log trước khi import models/services
+    os.environ['CACHE_BACKEND'] = 'none'
+    os.environ['SLOW_QUERY_MS'] = '0'
+    from models import db
+
+    sizes = [int(s) for s in args.sizes.split(',')]
+    cases = build_cases(BENCH_USER)
+    if args.cases:
+        wanted = args.cases.split(',')
+        unknown = set(wanted) - set(cases)
+        if unknown:
+            parser.error(f"case không tồn tại: {', '.join(sorted(unknown))} (có: {', '.join(cases)})")
+        cases = {name: cases[name] for name in wanted}
+
+    results = {}
+    for size in sizes:
+        path = ensure_database(args.data_dir, size, args.other_users, args.seed)
+        db.close_all()
+        db.db_path = path
+        print(f"\n📊 {size:,} giao dịch")
+        print(f"{'case':<22} {'p50 (ms)':>10} {'p95 (ms)':>10} {'peak (KiB)':>11} {'n':>4}")
+        with db.connection():
+            for name, fn in cases.items():
+                result = measure(fn, args.repeat, args.max_seconds)
+                results[f'{name}@{size}'] = result
+                print(f"{name:<22} {result['p50_ms']:>10.3f} {result['p95_ms']:>10.3f} "
+                      f"{result['peak_kib']:>11,.1f} {result['samples']:>4}")
+    db.close_all()
+
+    if args.save:
+        with open(args.baseline, 'w', encoding='utf-8') as f:
+            json.dump({
+                'meta': {
+                    'created': datetime.now().isoformat(timespec='seconds'),
+                    'python': platform.python_version(),
+                    'sqlite': sqlite3.sqlite_version,
+                    'machine': platform.platform(),
+                },
+                'results': results,
+            }, f, indent=2, sort_keys=True)
+        print(f"\n💾 Đã ghi baseline: {args.baseline}")
+        return
+
+    if not os.path.exists(args.baseline):
+        print(f"\nℹ️  Chưa có baseline ({args.baseline}) - chạy với --save để tạo")
+        return
+    with open(args.baseline, encoding='utf-8') as f:
+        baseline = json.load(f)['results']
+    regressions = compare(results, baseline, args.tolerance, args.p95_tolerance,
+                          args.memory_tolerance, args.min_delta_ms)
+    if regressions:
+        print(f"\n❌ {len(regressions)} regression so với baseline (tolerance {args.tolerance:.0%}):")
+        for key, detail in regressions:
+            print(f"   {key}: {detail}")
+        sys.exit(1)
+    print(f"\n✅ Không có regression so với baseline (tolerance {args.tolerance:.0%})")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,181 @@
+"""
+Hàng đợi job AI chạy nền.
+
+Các route AI không gọi Gemini trong thread của request nữa: chúng submit job vào
+``ai_jobs`` và trả về job_id ngay. Một nhóm worker thread cố định (AI_JOB_WORKERS)
+lấy job từ hàng đợi có giới hạn (AI_JOB_QUEUE_SIZE); hàng đợi đầy thì submit ném
+QueueFull (route trả 429). Trạng thái và kết quả job lưu trong bảng AIJob nên
+worker process nào cũng trả lời được /ai/jobs/<job_id>.
+
+Hàng đợi nằm trong bộ nhớ process: job còn queued/running khi process dừng sẽ không
+bao giờ chạy tiếp. ``recover_stale`` (gọi khi app khởi động và khi worker khởi động)
+đánh dấu ``error`` các job của process đã dừng trên cùng máy, và mọi job dở dang
+quá AI_JOB_STALE_MINUTES phút.
+"""
+import json
+import logging
+import os
+import queue
+import socket
+import threading
+import uuid
+from datetime import datetime, timedelta
+from typing import Any, Callable, Dict, Optional
+
+from models import AIJob
+
+log = logging.getLogger(__name__)
+
+# Job đã xong quá thời gian này (giờ) bị xóa khỏi bảng AIJob
+JOB_RETENTION_HOURS = 24
+# Job queued/running lâu hơn (phút) chắc chắn đã mất (process giữ nó đã dừng)
+JOB_STALE_MINUTES = float(os.getenv('AI_JOB_STALE_MINUTES', '10'))
+
+
+def _pid_alive(pid: int) -> bool:
+    if os.name == 'nt':
+        return True   # os.kill(pid, 0) trên Windows sẽ kết thúc process - dựa vào tuổi job
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        return True
+    return True
+
+
+class QueueFull(Exception):
+    """Hàng đợi job đã đầy"""
+
+
+class JobQueue:
+    """Thread pool cố định + hàng đợi có giới hạn; worker khởi động khi có job đầu tiên"""
+
+    def __init__(self, workers: int = 2, max_queue: int = 20):
+        self.workers = workers
+        self.max_queue = max_queue
+        self._queue: "queue.Queue" = queue.Queue(maxsize=max_queue)
+        self._threads = []
+        self._started = False
+        self._lock = threading.Lock()
+        self._running = 0
+        self._submitted = 0
+        # host:pid lưu cùng job để process khác biết job thuộc process nào
+        self.worker_id = f'{socket.gethostname()}:{os.getpid()}'
+
+    def _start(self):
+        with self._lock:
+            if self._started:
+                return
+            self.recover_stale()
+            self._started = True
+            for i in range(self.workers):
+                t = threading.Thread(target=self._worker, name=f'ai-job-{i}', daemon=True)
+                t.start()
+                self._threads.append(t)
+
+    def submit(self, user_id, kind: str, fn: Callable[..., Any], *args, **kwargs) -> Dict[str, Any]:
+        """
+        Đưa ``fn(*args, **kwargs)`` vào hàng đợi. ``fn`` chạy ở worker thread (không có
+        request context) nên mọi dữ liệu cần từ request/session phải truyền qua args.
+        Kết quả phải serialize được sang JSON.
+        """
+        self._start()
+        with self._lock:
+            self._submitted += 1
+            run_cleanup = self._submitted % 100 == 1
+        if run_cleanup:
+            self.cleanup()
+        if self._queue.full():
+            raise QueueFull(f'Hàng đợi AI đã đầy ({self.max_queue} job)')
+        # Tạo dòng AIJob trước khi put để worker luôn tìm thấy job; put thất bại
+        # (hàng đợi vừa đầy do request khác) thì đánh dấu lỗi ngay
+        job = AIJob.create(uuid.uuid4().hex, user_id, kind, self.worker_id)
+        try:
+            self._queue.put_nowait((job['id'], fn, args, kwargs))
+        except queue.Full:
+            AIJob.finish(job['id'], 'error', error='queue full')
+            raise QueueFull(f'Hàng đợi AI đã đầy ({self.max_queue} job)')
+        return job
+
+    def recover_stale(self) -> int:
+        """Đánh dấu ``error`` các job queued/running không còn process nào chạy; trả về số job"""
+        hostname, _, own_pid = self.worker_id.rpartition(':')
+        cutoff = (datetime.now() - timedelta(minutes=JOB_STALE_MINUTES)).isoformat()
+        stale = []
+        for job in AIJob.find_unfinished():
+            host, _, pid = (job['worker'] or '').rpartition(':')
+            if job['createdAt'] < cutoff:
+                stale.append(job['id'])
+            elif host == hostname and pid.isdigit():
+                if pid == own_pid:
+                    # Job mang pid của process này từ trước khi hàng đợi khởi động: process cũ trùng pid
+                    if not self._started:
+                        stale.append(job['id'])
+                elif not _pid_alive(int(pid)):
+                    stale.append(job['id'])
+        for job_id in stale:
+            AIJob.finish(job_id, 'error', error='worker stopped before the job finished')
+        return len(stale)
+
+    def _worker(self):
+        while True:
+            job_id, fn, args, kwargs = self._queue.get()
+            with self._lock:
+                self._running += 1
+            try:
+                AIJob.mark_running(job_id)
+                result = fn(*args, **kwargs)
+                AIJob.finish(job_id, 'done', result=json.dumps(result, default=str))
+            except Exception as e:
+                log.exception('Job AI %s lỗi', job_id)
+                AIJob.finish(job_id, 'error', error=f'{type(e).__name__}: {e}')
+            finally:
+                with self._lock:
+                    self._running -= 1
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            running = self._running
+        return {
+            'workers': self.workers,
+            'max_queue': self.max_queue,
+            'running': running,
+            'queued': self._queue.qsize(),
+        }
+
+    @staticmethod
+    def cleanup():
+        """Xóa job đã xong cũ hơn JOB_RETENTION_HOURS"""
+        cutoff = (datetime.now() - timedelta(hours=JOB_RETENTION_HOURS)).isoformat()
+        return AIJob.delete_finished_before(cutoff)
+
+
+def job_status(job: Dict[str, Any]) -> Dict[str, Any]:
+    """Thông tin trạng thái trả về cho client (không kèm kết quả)"""
+    started = job.get('startedAt')
+    finished = job.get('finishedAt')
+    elapsed = None
+    if started:
+        end = datetime.fromisoformat(finished) if finished else datetime.now()
+        elapsed = round((end - datetime.fromisoformat(started)).total_seconds(), 2)
+    return {
+        'job_id': job['id'],
+        'kind': job['kind'],
+        'status': job['status'],
+        'createdAt': job['createdAt'],
+        'startedAt': started,
+        'finishedAt': finished,
+        'elapsedSeconds': elapsed,
+        'error': job.get('error'),
+    }
+
+
+def job_result(job: Dict[str, Any]) -> Optional[Any]:
+    return json.loads(job['result']) if job.get('result') else None
+
+
+ai_jobs = JobQueue(
+    workers=int(os.getenv('AI_JOB_WORKERS', '2')),
+    max_queue=int(os.getenv('AI_JOB_QUEUE_SIZE', '20'))
+)
@@ -0,0 +1,213 @@
+"""
+Bộ tư vấn offline dựa trên quy tắc.
+
+Tính tỷ lệ tiết kiệm, số tiền cần để dành mỗi tháng cho từng mục tiêu (từ
+targetAmount, currentAmount, deadline) và các cảnh báo rủi ro từ cùng dữ liệu
+SavingsService.get_financial_data_for_ai. Không gọi mạng, kết quả tất định nên
+dùng được làm phương án dự phòng khi Gemini lỗi/bị giới hạn (ai_client.FallbackAdvisor),
+làm backend chính (AI_BACKEND=local) và làm backend cho test/benchmark.
+"""
+import math
+from datetime import date, datetime
+from typing import Any, Dict, List, Optional
+
+from advisor_backend import AdvisorBackend
+
+# Tỷ lệ tiết kiệm khuyến nghị (%)
+TARGET_SAVINGS_RATE = 20
+# Quỹ dự phòng tối thiểu (số tháng chi tiêu)
+EMERGENCY_FUND_MONTHS = 3
+# Một danh mục chiếm quá tỷ lệ này của tổng chi tiêu thì cảnh báo
+CATEGORY_SHARE_LIMIT = 0.4
+# Phần tiền dư hằng tháng dành cho mục tiêu không có thời hạn
+NO_DEADLINE_SHARE = 0.2
+
+NOTE = "ℹ️ Gợi ý tự động từ bộ quy tắc offline."
+
+
+def _parse_date(value) -> Optional[date]:
+    if not value:
+        return None
+    try:
+        return datetime.fromisoformat(str(value).replace('Z', '+00:00')).date()
+    except ValueError:
+        return None
+
+
+def savings_rate(data: Dict[str, Any]) -> float:
+    income = data.get('total_income') or 0
+    expense = data.get('total_expense') or 0
+    return (income - expense) / income * 100 if income > 0 else 0.0
+
+
+def monthly_surplus(data: Dict[str, Any]) -> float:
+    return (data.get('monthly_avg_income') or 0) - (data.get('monthly_avg_expense') or 0)
+
+
+def goal_contribution(goal: Dict[str, Any], surplus: float, today: Optional[date] = None) -> Dict[str, Any]:
+    """
+    Số tiền cần để dành mỗi tháng cho một mục tiêu.
+    Có deadline: chia đều phần còn thiếu cho số tháng còn lại (tối thiểu 1).
+    Không có deadline: NO_DEADLINE_SHARE tiền dư mỗi tháng, ước tính số tháng cần.
+    """
+    today = today or date.today()
+    remaining = max((goal.get('targetAmount') or 0) - (goal.get('currentAmount') or 0), 0)
+    deadline = _parse_date(goal.get('deadline'))
+    result = {'goal_id': goal.get('id'), 'remaining': remaining, 'deadline': deadline,
+              'months_left': None, 'monthly_amount': 0.0, 'overdue': False}
+    if remaining <= 0:
+        return result
+
+    if deadline:
+        days = (deadline - today).days
+        result['overdue'] = days < 0
+        result['months_left'] = max(1, math.ceil(days / 30))
+        result['monthly_amount'] = remaining / result['months_left']
+    elif surplus > 0:
+        result['monthly_amount'] = min(remaining, surplus * NO_DEADLINE_SHARE)
+        result['months_left'] = math.ceil(remaining / result['monthly_amount'])
+    return result
+
+
+def risk_flags(data: Dict[str, Any], contributions: List[Dict[str, Any]]) -> List[str]:
+    """Danh sách cảnh báo, quan trọng nhất trước"""
+    flags = []
+    income = data.get('total_income') or 0
+    expense = data.get('total_expense') or 0
+    surplus = monthly_surplus(data)
+    monthly_expense = data.get('monthly_avg_expense') or 0
+
+    if income <= 0:
+        flags.append('Chưa ghi nhận thu nhập trong kỳ')
+    elif expense > income:
+        flags.append(f'Chi tiêu vượt thu nhập {expense - income:,.0f} VNĐ')
+    elif savings_rate(data) < TARGET_SAVINGS_RATE:
+        flags.append(f'Tỷ lệ tiết kiệm {savings_rate(data):.1f}% thấp hơn mức khuyến nghị {TARGET_SAVINGS_RATE}%')
+
+    needed = sum(c['monthly_amount'] for c in contributions if c['deadline'])
+    if needed > max(surplus, 0):
+        flags.append(f'Cần {needed:,.0f} VNĐ/tháng cho các mục tiêu có hạn, '
+                     f'nhưng chỉ dư {max(surplus, 0):,.0f} VNĐ/tháng')
+
+    overdue = sum(1 for c in contributions if c['overdue'])
+    if overdue:
+        flags.append(f'{overdue} mục tiêu đã quá hạn nhưng chưa hoàn thành')
+
+    if monthly_expense > 0 and (data.get('current_savings') or 0) < monthly_expense * EMERGENCY_FUND_MONTHS:
+        flags.append(f'Tiền tiết kiệm chưa đủ quỹ dự phòng {EMERGENCY_FUND_MONTHS} tháng chi tiêu '
+                     f'({monthly_expense * EMERGENCY_FUND_MONTHS:,.0f} VNĐ)')
+
+    by_category = data.get('expense_by_category') or {}
+    if expense > 0 and by_category:
+        name, total = max(by_category.items(), key=lambda item: item[1])
+        if total / expense > CATEGORY_SHARE_LIMIT:
+            flags.append(f'Danh mục "{name}" chiếm {total / expense * 100:.0f}% tổng chi tiêu')
+    return flags
+
+
+def _goals(data: Dict[str, Any]) -> List[Dict[str, Any]]:
+    """savings_goals và other_goals là cùng một danh sách - bỏ trùng theo id"""
+    seen = set()
+    goals = []
+    for goal in (data.get('savings_goals') or []) + (data.get('other_goals') or []):
+        key = goal.get('id', id(goal))
+        if key not in seen:
+            seen.add(key)
+            goals.append(goal)
+    return goals
+
+
+class LocalAdvisor(AdvisorBackend):
+    """Backend tư vấn offline (xem docstring module)"""
+
+    source = 'local'
+
+    def __init__(self, today: Optional[date] = None):
+        # Cố định ngày cho test; mặc định ngày hiện tại ở mỗi lần gọi
+        self.today = today
+
+    def _plan_text(self, goal: Dict[str, Any], contribution: Dict[str, Any], surplus: float) -> str:
+        name = goal.get('name', 'Mục tiêu')
+        remaining = contribution['remaining']
+        if remaining <= 0:
+            return f"🎉 {name}: đã đạt mục tiêu."
+
+        lines = [f"🎯 {name}: còn thiếu {remaining:,.0f} VNĐ"]
+        monthly = contribution['monthly_amount']
+        if monthly > 0:
+            lines.append(f"💰 Tiết kiệm {monthly:,.0f} VNĐ/tháng trong {contribution['months_left']} tháng")
+            for share in (25, 50, 75):
+                month = math.ceil(contribution['months_left'] * share / 100)
+                lines.append(f"   • Mốc {share}%: sau khoảng {month} tháng")
+        else:
+            lines.append("💰 Chưa có tiền dư hằng tháng - cần tăng thu hoặc giảm chi trước")
+        if contribution['overdue']:
+            lines.append("⚠️ Đã quá hạn - cân nhắc đặt lại thời hạn thực tế hơn")
+        elif monthly > max(surplus, 0):
+            lines.append(f"⚠️ Vượt số tiền dư mỗi tháng ({max(surplus, 0):,.0f} VNĐ) - nên lùi thời hạn")
+        lines.append("💡 Đặt lệnh chuyển tiền tự động ngay sau ngày nhận lương")
+        return '\n'.join(lines)
+
+    def analyze_financial_health(self, data: Dict[str, Any], refresh: bool = False) -> Dict[str, Any]:
+        surplus = monthly_surplus(data)
+        goals = _goals(data)
+        contributions = [goal_contribution(g, surplus, self.today) for g in goals]
+        flags = risk_flags(data, contributions)
+        rate = savings_rate(data)
+
+        lines = [
+            f"📊 TÌNH HÌNH TÀI CHÍNH ({data.get('period_months', 1)} tháng gần đây)",
+            f"- Thu nhập: {data.get('total_income') or 0:,.0f} VNĐ, chi tiêu: {data.get('total_expense') or 0:,.0f} VNĐ",
+            f"- Tỷ lệ tiết kiệm: {rate:.1f}% (khuyến nghị ≥ {TARGET_SAVINGS_RATE}%)",
+            f"- Dư trung bình mỗi tháng: {surplus:,.0f} VNĐ",
+            "",
+            "🎯 MỤC TIÊU:",
+        ]
+        if goals:
+            for goal, c in zip(goals, contributions):
+                if c['remaining'] <= 0:
+                    lines.append(f"- {goal.get('name')}: đã hoàn thành 🎉")
+                elif c['monthly_amount'] > 0:
+                    lines.append(f"- {goal.get('name')}: cần {c['monthly_amount']:,.0f} VNĐ/tháng "
+                                 f"({c['months_left']} tháng)")
+                else:
+                    lines.append(f"- {goal.get('name')}: còn thiếu {c['remaining']:,.0f} VNĐ")
+        else:
+            lines.append("- (Chưa có mục tiêu nào)")
+        lines += ["", "⚠️ CẢNH BÁO:"] + ([f"- {f}" for f in flags] or ["- Không có rủi ro đáng chú ý"])
+        lines += ["", NOTE]
+        return {'success': True, 'analysis': '\n'.join(lines), 'raw_data': data, 'cached': False,
+                'risk_flags': flags}
+
+    def suggest_savings_plan(self, goal: Dict[str, Any], financial_data: Dict[str, Any],
+                             refresh: bool = False) -> Dict[str, Any]:
+        surplus = monthly_surplus(financial_data)
+        contribution = goal_contribution(goal, surplus, self.today)
+        plan = self._plan_text(goal, contribution, surplus) + '\n\n' + NOTE
+        return {'success': True, 'plan': plan, 'goal': goal, 'cached': False,
+                'monthly_amount': contribution['monthly_amount']}
+
+    def suggest_savings_plans(self, goals: List[Dict[str, Any]], financial_data: Dict[str, Any],
+                              refresh: bool = False) -> Dict[str, Any]:
+        surplus = monthly_surplus(financial_data)
+        plans = []
+        for goal in goals:
+            contribution = goal_contribution(goal, surplus, self.today)
+            plans.append({'goal_id': goal['id'], 'monthly_amount': contribution['monthly_amount'],
+                          'plan': self._plan_text(goal, contribution, surplus)})
+        return {'success': True, 'plans': plans, 'missing': [], 'cached': False}
+
+    def ask(self, question: str, context: Optional[Dict] = None, refresh: bool = False) -> Dict[str, Any]:
+        # Không hiểu câu hỏi tự do: trả lời bằng các chỉ số và cảnh báo quan trọng nhất
+        if not context:
+            return {'success': True, 'answer': f"Chưa có dữ liệu tài chính để trả lời.\n{NOTE}", 'cached': False}
+        surplus = monthly_surplus(context)
+        contributions = [goal_contribution(g, surplus, self.today) for g in _goals(context)]
+        flags = risk_flags(context, contributions)
+        lines = [
+            f"Tỷ lệ tiết kiệm hiện tại {savings_rate(context):.1f}%, dư khoảng {surplus:,.0f} VNĐ/tháng.",
+        ]
+        if flags:
+            lines.append("Điều cần chú ý: " + '; '.join(flags[:3]) + '.')
+        lines.append(NOTE)
+        return {'success': True, 'answer': '\n'.join(lines), 'cached': False}
@@ -0,0 +1,214 @@
+"""
+Metrics dạng Prometheus text (``/metrics``) - không phụ thuộc prometheus_client.
+
+- http_request_duration_seconds: latency theo endpoint (middleware trong app.py)
+- db_query_duration_seconds + db_queries_per_request: mỗi câu SQL qua Database._run
+  (hook ``db.add_query_listener``), đếm/cộng dồn theo request hiện tại
+- ai_model_*: latency, kích thước prompt và kết quả của lời gọi model (ai_advisor.py)
+
+Mỗi lần ghi chỉ là bisect + cộng số dưới một lock nên đủ rẻ để bật thường trực;
+METRICS_ENABLED=0 tắt middleware request và hook SQL.
+"""
+import os
+import threading
+import time
+from bisect import bisect_left
+from typing import Callable, Dict, List, Sequence, Tuple
+
+ENABLED = os.getenv('METRICS_ENABLED', '1') != '0'
+
+LATENCY_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10)
+QUERY_BUCKETS = (0.0001, 0.00025, 0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.5, 1)
+COUNT_BUCKETS = (0, 1, 2, 3, 5, 10, 20, 50, 100)
+MODEL_BUCKETS = (0.1, 0.25, 0.5, 1, 2, 4, 8, 15, 30, 60)
+PROMPT_BUCKETS = (250, 500, 1000, 2000, 4000, 8000, 16000, 32000)
+
+
+def _escape(value) -> str:
+    return str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+
+def _labels(names: Sequence[str], values: Sequence, extra: str = '') -> str:
+    parts = [f'{n}="{_escape(v)}"' for n, v in zip(names, values)]
+    if extra:
+        parts.append(extra)
+    return '{' + ','.join(parts) + '}' if parts else ''
+
+
+def _number(value: float) -> str:
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+
+class Counter:
+    def __init__(self, name: str, help_: str, labelnames: Sequence[str] = ()):
+        self.name = name
+        self.help = help_
+        self.labelnames = tuple(labelnames)
+        self._values: Dict[Tuple, float] = {}
+        self._lock = threading.Lock()
+
+    def inc(self, *labels, amount: float = 1):
+        with self._lock:
+            self._values[labels] = self._values.get(labels, 0) + amount
+
+    def value(self, *labels) -> float:
+        return self._values.get(labels, 0)
+
+    def render(self) -> List[str]:
+        lines = [f'# HELP {self.name} {self.help}', f'# TYPE {self.name} counter']
+        with self._lock:
+            items = sorted(self._values.items())
+        for labels, value in items:
+            lines.append(f'{self.name}{_labels(self.labelnames, labels)} {_number(value)}')
+        return lines
+
+
+class Histogram:
+    def __init__(self, name: str, help_: str, labelnames: Sequence[str] = (),
+                 buckets: Sequence[float] = LATENCY_BUCKETS):
+        self.name = name
+        self.help = help_
+        self.labelnames = tuple(labelnames)
+        self.buckets = tuple(sorted(buckets))
+        # labels -> [số đếm từng bucket (không cộng dồn) + bucket +Inf, sum, count]
+        self._series: Dict[Tuple, list] = {}
+        self._lock = threading.Lock()
+
+    def observe(self, value: float, *labels):
+        index = bisect_left(self.buckets, value)
+        with self._lock:
+            series = self._series.get(labels)
+            if series is None:
+                series = self._series[labels] = [[0] * (len(self.buckets) + 1), 0.0, 0]
+            series[0][index] += 1
+            series[1] += value
+            series[2] += 1
+
+    def snapshot(self, *labels) -> Dict[str, float]:
+        """{'count', 'sum'} của một nhãn (benchmark/debug)"""
+        with self._lock:
+            series = self._series.get(labels)
+            return {'count': series[2], 'sum': series[1]} if series else {'count': 0, 'sum': 0.0}
+
+    def render(self) -> List[str]:
+        lines = [f'# HELP {self.name} {self.help}', f'# TYPE {self.name} histogram']
+        with self._lock:
+            items = sorted((labels, [list(s[0]), s[1], s[2]]) for labels, s in self._series.items())
+        for labels, (counts, total, count) in items:
+            cumulative = 0
+            for bound, bucket in zip(self.buckets + (float('inf'),), counts):
+                cumulative += bucket
+                le = 'le="+Inf"' if bound == float('inf') else f'le="{_number(bound)}"'
+                lines.append(f'{self.name}_bucket{_labels(self.labelnames, labels, le)} {cumulative}')
+            lines.append(f'{self.name}_sum{_labels(self.labelnames, labels)} {_number(total)}')
+            lines.append(f'{self.name}_count{_labels(self.labelnames, labels)} {count}')
+        return lines
+
+
+class Gauge:
+    """Giá trị đọc tại thời điểm scrape qua callback"""
+
+    def __init__(self, name: str, help_: str, fn: Callable[[], float]):
+        self.name = name
+        self.help = help_
+        self.fn = fn
+
+    def render(self) -> List[str]:
+        try:
+            value = self.fn()
+        except Exception:
+            return []
+        return [f'# HELP {self.name} {self.help}', f'# TYPE {self.name} gauge', f'{self.name} {_number(value)}']
+
+
+class Registry:
+    def __init__(self):
+        self._metrics = []
+
+    def register(self, metric):
+        self._metrics.append(metric)
+        return metric
+
+    def counter(self, *args, **kwargs) -> Counter:
+        return self.register(Counter(*args, **kwargs))
+
+    def histogram(self, *args, **kwargs) -> Histogram:
+        return self.register(Histogram(*args, **kwargs))
+
+    def gauge(self, *args, **kwargs) -> Gauge:
+        return self.register(Gauge(*args, **kwargs))
+
+    def render(self) -> str:
+        lines = []
+        for metric in self._metrics:
+            lines.extend(metric.render())
+        return '\n'.join(lines) + '\n'
+
+
+registry = Registry()
+
+HTTP_REQUESTS = registry.counter(
+    'http_requests_total', 'HTTP requests theo endpoint, method và status', ('endpoint', 'method', 'status'))
+HTTP_LATENCY = registry.histogram(
+    'http_request_duration_seconds', 'Thời gian xử lý request (tới khi trả header)', ('endpoint', 'method'))
+DB_QUERY_LATENCY = registry.histogram(
+    'db_query_duration_seconds', 'Thời gian mỗi câu SQL theo loại lệnh', ('statement',), QUERY_BUCKETS)
+DB_QUERY_ERRORS = registry.counter(
+    'db_query_errors_total', 'Câu SQL lỗi theo loại lệnh', ('statement',))
+DB_QUERIES_PER_REQUEST = registry.histogram(
+    'db_queries_per_request', 'Số câu SQL trong một request', ('endpoint',), COUNT_BUCKETS)
+DB_TIME_PER_REQUEST = registry.histogram(
+    'db_time_per_request_seconds', 'Tổng thời gian SQL trong một request', ('endpoint',))
+AI_CALLS = registry.counter(
+    'ai_model_calls_total', 'Lời gọi model theo loại và kết quả (ok|empty|error|quota|throttled|cancelled|cached)',
+    ('kind', 'outcome'))
+AI_LATENCY = registry.histogram(
+    'ai_model_duration_seconds', 'Latency lời gọi model thật (không tính cache)', ('kind',), MODEL_BUCKETS)
+AI_PROMPT_CHARS = registry.histogram(
+    'ai_model_prompt_chars', 'Kích thước prompt gửi model (ký tự)', ('kind',), PROMPT_BUCKETS)
+AI_FALLBACKS = registry.counter(
+    'ai_fallback_total', 'Câu trả lời dùng bộ quy tắc offline thay cho model', ('method',))
+
+_request = threading.local()
+
+
+def _statement(query: str) -> str:
+    head = query.lstrip().split(None, 1)
+    verb = head[0].upper() if head else ''
+    return verb if verb in ('SELECT', 'INSERT', 'UPDATE', 'DELETE', 'WITH') else 'OTHER'
+
+
+def on_query(query: str, params, seconds: float, rows: int, error):
+    """Listener cho Database.add_query_listener"""
+    statement = _statement(query)
+    DB_QUERY_LATENCY.observe(seconds, statement)
+    if error is not None:
+        DB_QUERY_ERRORS.inc(statement)
+    if getattr(_request, 'active', False):
+        _request.queries += 1
+        _request.db_time += seconds
+
+
+def start_request():
+    _request.active = True
+    _request.started = time.perf_counter()
+    _request.queries = 0
+    _request.db_time = 0.0
+
+
+def finish_request(endpoint: str, method: str, status: int):
+    if not getattr(_request, 'active', False):
+        return
+    _request.active = False
+    HTTP_LATENCY.observe(time.perf_counter() - _request.started, endpoint, method)
+    HTTP_REQUESTS.inc(endpoint, method, str(status))
+    DB_QUERIES_PER_REQUEST.observe(_request.queries, endpoint)
+    DB_TIME_PER_REQUEST.observe(_request.db_time, endpoint)
+
+
+def record_model_call(kind: str, outcome: str, seconds: float = None, prompt_chars: int = None):
+    AI_CALLS.inc(kind, outcome)
+    if seconds is not None:
+        AI_LATENCY.observe(seconds, kind)
+    if prompt_chars is not None:
+        AI_PROMPT_CHARS.observe(prompt_chars, kind)
@@ -0,0 +1,369 @@
+"""
+Versioned schema migrations.
+
+Each migration is ``(version, name, step)`` where ``step`` is either a SQL
+script or a function taking the connection.  Applied versions are recorded
+in the ``SchemaMigration`` table, so ``run_migrations`` only runs what is
+missing and can be re-run safely against a live, populated database: every
+migration runs in its own ``BEGIN IMMEDIATE`` transaction (readers keep
+working under WAL, concurrent writers wait on busy_timeout), and a failure
+rolls back only that migration.
+
+    python migrations.py            # áp dụng các migration còn thiếu
+    python migrations.py status     # xem trạng thái
+    python migrations.py rebuild-rollups [user_id]   # tính lại bảng rollup
+"""
+import sqlite3
+import os
+import sys
+import time
+from datetime import datetime
+from typing import Dict, List, Tuple, Union, Callable
+from dotenv import load_dotenv
+
+load_dotenv()
+DB_PATH = os.getenv('DATABASE_PATH', 'prisma/dev.db')
+
+Step = Union[str, Callable[[sqlite3.Connection], None]]
+
+
+BASE_TABLES = {
+    'SavingsGoal': '''
+        CREATE TABLE IF NOT EXISTS SavingsGoal (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            name TEXT NOT NULL,
+            targetAmount REAL NOT NULL,
+            currentAmount REAL DEFAULT 0,
+            deadline TEXT,
+            userId INTEGER,
+            createdAt TEXT NOT NULL,
+            updatedAt TEXT NOT NULL
+        )
+    ''',
+    'Account': '''
+        CREATE TABLE IF NOT EXISTS Account (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            name TEXT NOT NULL,
+            bank TEXT,
+            accountNumber TEXT,
+            currentBalance REAL DEFAULT 0,
+            createdAt TEXT NOT NULL,
+            updatedAt TEXT NOT NULL
+        )
+    ''',
+    'Transaction': '''
+        CREATE TABLE IF NOT EXISTS `Transaction` (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            userId INTEGER NOT NULL,
+            categoryId INTEGER NOT NULL,
+            amount REAL NOT NULL,
+            note TEXT,
+            date TEXT NOT NULL,
+            type TEXT NOT NULL,     -- 'expense' | 'income'
+            createdAt TEXT NOT NULL,
+            updatedAt TEXT NOT NULL,
+            FOREIGN KEY (categoryId) REFERENCES Category(id),
+            FOREIGN KEY (userId) REFERENCES User(id)
+        )
+    ''',
+    'User': '''
+        CREATE TABLE IF NOT EXISTS "User" (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            username TEXT UNIQUE,
+            name TEXT,
+            email TEXT UNIQUE,
+            passwordHash TEXT NOT NULL,
+            phone TEXT,
+            createdAt TEXT NOT NULL,
+            updatedAt TEXT NOT NULL
+        )
+    ''',
+    'Category': '''
+        CREATE TABLE IF NOT EXISTS Category (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            name TEXT NOT NULL,
+            type TEXT NOT NULL,      -- 'expense' | 'income'
+            userId INTEGER,
+            createdAt TEXT NOT NULL
+        )
+    ''',
+}
+
+
+class LegacySchemaError(RuntimeError):
+    """Database dùng schema cũ (id TEXT/cuid của Prisma) - không tự chuyển đổi"""
+
+
+def create_base_schema(conn: sqlite3.Connection):
+    """
+    Version 1 (baseline): tạo các bảng gốc nếu chưa có - không đụng tới bảng đã tồn tại.
+
+    Database schema cũ (``User.id`` không phải INTEGER, vd. cuid của Prisma) bị từ chối
+    thay vì chuyển đổi tự động: các migration sau giả định id INTEGER và cột
+    userId/categoryId/note của "Transaction".
+    """
+    columns = conn.execute('PRAGMA table_info("User")').fetchall()
+    id_type = next((col[2] for col in columns if col[1] == 'id'), None)
+    if id_type is not None and id_type.upper() != 'INTEGER':
+        raise LegacySchemaError(
+            f'"User".id có kiểu {id_type or "không khai báo"} (schema cũ) - '
+            'cần chuyển dữ liệu sang schema id INTEGER thủ công trước khi chạy migration'
+        )
+    for sql in BASE_TABLES.values():
+        conn.execute(sql)
+
+
+# ==================== ROLLUP TABLES ====================
+# TransactionDaily / TransactionMonthly giữ SUM(amount) và COUNT(*) theo
+# (userId, kỳ, categoryId, type). Trigger trên "Transaction" cập nhật chúng ở
+# mọi INSERT/UPDATE/DELETE, nên các trang phân tích đọc số dòng tỉ lệ với
+# số kỳ x số danh mục thay vì số giao dịch.
+
+ROLLUPS = (
+    # (bảng, cột kỳ, biểu thức kỳ trên cột date)
+    ('TransactionDaily', 'day', 'substr({row}.date, 1, 10)'),
+    ('TransactionMonthly', 'month', 'substr({row}.date, 1, 7)'),
+)
+
+
+def _rollup_add(row: str, sign: str) -> str:
+    """Câu lệnh cộng (sign='+') hoặc trừ (sign='-') một dòng giao dịch vào các rollup"""
+    statements = []
+    for table, period, expr in ROLLUPS:
+        key = expr.format(row=row)
+        if sign == '+':
+            statements.append(f'''
+            INSERT INTO {table} (userId, {period}, categoryId, type, total, count)
+            VALUES ({row}.userId, {key}, {row}.categoryId, {row}.type, {row}.amount, 1)
+            ON CONFLICT (userId, {period}, categoryId, type)
+            DO UPDATE SET total = total + excluded.total, count = count + 1;''')
+        else:
+            where = (f"userId = {row}.userId AND {period} = {key} "
+                     f"AND categoryId = {row}.categoryId AND type = {row}.type")
+            statements.append(f'''
+            UPDATE {table} SET total = total - {row}.amount, count = count - 1 WHERE {where};
+            DELETE FROM {table} WHERE {where} AND count <= 0;''')
+    return ''.join(statements)
+
+
+def create_rollups(conn: sqlite3.Connection):
+    for table, period, _ in ROLLUPS:
+        conn.execute(f'''
+            CREATE TABLE IF NOT EXISTS {table} (
+                userId INTEGER NOT NULL,
+                {period} TEXT NOT NULL,
+                categoryId INTEGER NOT NULL,
+                type TEXT NOT NULL,
+                total REAL NOT NULL DEFAULT 0,
+                count INTEGER NOT NULL DEFAULT 0,
+                PRIMARY KEY (userId, {period}, categoryId, type)
+            ) WITHOUT ROWID
+        ''')
+
+    conn.execute(f'''
+        CREATE TRIGGER IF NOT EXISTS trg_transaction_rollup_insert
+        AFTER INSERT ON "Transaction"
+        BEGIN{_rollup_add('NEW', '+')}
+        END
+    ''')
+    conn.execute(f'''
+        CREATE TRIGGER IF NOT EXISTS trg_transaction_rollup_delete
+        AFTER DELETE ON "Transaction"
+        BEGIN{_rollup_add('OLD', '-')}
+        END
+    ''')
+    conn.execute(f'''
+        CREATE TRIGGER IF NOT EXISTS trg_transaction_rollup_update
+        AFTER UPDATE OF userId, categoryId, amount, date, type ON "Transaction"
+        BEGIN{_rollup_add('OLD', '-')}{_rollup_add('NEW', '+')}
+        END
+    ''')
+
+    rebuild_rollups(conn)
+
+
+def rebuild_rollups(conn: sqlite3.Connection, user_id: int = None):
+    """Tính lại rollup từ bảng "Transaction" (backfill / sửa sai lệch), cho một user hoặc tất cả"""
+    where = 'WHERE userId = ?' if user_id is not None else ''
+    params = (user_id,) if user_id is not None else ()
+    for table, period, expr in ROLLUPS:
+        key = expr.format(row='t')
+        conn.execute(f'DELETE FROM {table} {where}', params)
+        conn.execute(f'''
+            INSERT INTO {table} (userId, {period}, categoryId, type, total, count)
+            SELECT t.userId, {key}, t.categoryId, t.type, SUM(t.amount), COUNT(*)
+            FROM "Transaction" t
+            {where.replace('userId', 't.userId')}
+            GROUP BY t.userId, {key}, t.categoryId, t.type
+        ''', params)
+
+
+def create_savings_plans(conn: sqlite3.Connection):
+    """Kế hoạch tiết kiệm AI mới nhất của mỗi mục tiêu; xóa theo mục tiêu"""
+    conn.execute('''
+        CREATE TABLE IF NOT EXISTS SavingsPlan (
+            goalId INTEGER PRIMARY KEY,
+            userId INTEGER,
+            plan TEXT NOT NULL,
+            monthlyAmount REAL,
+            createdAt TEXT NOT NULL
+        )
+    ''')
+    conn.execute('CREATE INDEX IF NOT EXISTS idx_savingsplan_user ON SavingsPlan (userId)')
+    # Trigger có ';' trong thân nên không viết dạng chuỗi SQL (bị tách theo ';')
+    conn.execute('''
+        CREATE TRIGGER IF NOT EXISTS trg_savingsgoal_delete_plan
+        AFTER DELETE ON SavingsGoal
+        BEGIN
+            DELETE FROM SavingsPlan WHERE goalId = OLD.id;
+        END
+    ''')
+
+
+MIGRATIONS: List[Tuple[int, str, Step]] = [
+    (1, 'base_schema', create_base_schema),
+    # Index cho các truy vấn nóng: Transaction.find_by_month / find_all_by_user,
+    # TransactionService.summary_by_month, AnalysisService.*
+    (2, 'transaction_user_date_indexes', '''
+        CREATE INDEX IF NOT EXISTS idx_transaction_user_date
+            ON "Transaction" (userId, date);
+        CREATE INDEX IF NOT EXISTS idx_transaction_user_type_date
+            ON "Transaction" (userId, type, date);
+    '''),
+    # Category.find_all(user_id, type_)
+    (3, 'category_user_type_index', '''
+        CREATE INDEX IF NOT EXISTS idx_category_user_type
+            ON Category (userId, type);
+    '''),
+    # SavingsGoal.find_all(user_id) ORDER BY createdAt DESC
+    (4, 'savingsgoal_user_created_index', '''
+        CREATE INDEX IF NOT EXISTS idx_savingsgoal_user_created
+            ON SavingsGoal (userId, createdAt);
+    '''),
+    # Bảng tổng hợp theo ngày/tháng + trigger, backfill từ dữ liệu hiện có
+    (5, 'transaction_rollups', create_rollups),
+    # Keyset pagination Transaction.page_by_user: ORDER BY date, createdAt, id (rowid)
+    # không cần sort; index cũ (userId, date) là tiền tố nên bỏ
+    (6, 'transaction_user_date_created_index', '''
+        CREATE INDEX IF NOT EXISTS idx_transaction_user_date_created
+            ON "Transaction" (userId, date, createdAt);
+        DROP INDEX IF EXISTS idx_transaction_user_date;
+    '''),
+    # Trạng thái job AI chạy nền (jobs.py) - dùng chung giữa các worker process
+    (7, 'ai_jobs', '''
+        CREATE TABLE IF NOT EXISTS AIJob (
+            id TEXT PRIMARY KEY,
+            userId INTEGER,
+            kind TEXT NOT NULL,
+            status TEXT NOT NULL,
+            result TEXT,
+            error TEXT,
+            createdAt TEXT NOT NULL,
+            startedAt TEXT,
+            finishedAt TEXT
+        );
+        CREATE INDEX IF NOT EXISTS idx_aijob_created
+            ON AIJob (createdAt);
+    '''),
+    # Kế hoạch tiết kiệm AI mới nhất của mỗi mục tiêu (tạo hàng loạt qua /ai/plans/generate)
+    (8, 'savings_plans', create_savings_plans),
+    # SavingsGoal.find_all() không lọc user (trang chủ khi user chưa có mục tiêu):
+    # đọc theo thứ tự index thay vì sort toàn bảng (xem query_audit.py)
+    (9, 'savingsgoal_created_index', '''
+        CREATE INDEX IF NOT EXISTS idx_savingsgoal_created
+            ON SavingsGoal (createdAt);
+    '''),
+    # Process (host:pid) giữ job AI - job dở dang của process đã dừng được đánh dấu lỗi
+    (10, 'ai_job_worker', '''
+        ALTER TABLE AIJob ADD COLUMN worker TEXT;
+        CREATE INDEX IF NOT EXISTS idx_aijob_status
+            ON AIJob (status);
+    '''),
+]
+
+
+def ensure_migration_table(conn: sqlite3.Connection):
+    conn.execute('''
+        CREATE TABLE IF NOT EXISTS SchemaMigration (
+            version INTEGER PRIMARY KEY,
+            name TEXT NOT NULL,
+            appliedAt TEXT NOT NULL,
+            durationMs REAL
+        )
+    ''')
+    conn.commit()
+
+
+def applied_versions(conn: sqlite3.Connection) -> Dict[int, str]:
+    ensure_migration_table(conn)
+    rows = conn.execute('SELECT version, appliedAt FROM SchemaMigration').fetchall()
+    return {row[0]: row[1] for row in rows}
+
+
+def _apply(conn: sqlite3.Connection, step: Step):
+    if callable(step):
+        step(conn)
+        return
+    # executescript() tự COMMIT trước khi chạy nên tách từng câu lệnh
+    for statement in step.split(';'):
+        if statement.strip():
+            conn.execute(statement)
+
+
+def run_migrations(conn: sqlite3.Connection, target: int = None) -> List[int]:
+    """Áp dụng các migration chưa chạy (tới version ``target`` nếu có)"""
+    conn.execute('PRAGMA busy_timeout = 30000')
+    done = applied_versions(conn)
+    applied = []
+    for version, name, step in sorted(MIGRATIONS, key=lambda m: m[0]):
+        if version in done or (target is not None and version > target):
+            continue
+        started = time.perf_counter()
+        conn.execute('BEGIN IMMEDIATE')
+        try:
+            _apply(conn, step)
+            duration = (time.perf_counter() - started) * 1000
+            conn.execute(
+                'INSERT INTO SchemaMigration (version, name, appliedAt, durationMs) VALUES (?, ?, ?, ?)',
+                (version, name, datetime.now().isoformat(), duration)
+            )
+            conn.commit()
+        except Exception as e:
+            conn.rollback()
+            print(f"❌ Migration {version} ({name}) thất bại: {e}")
+            raise
+        print(f"✅ Migration {version} ({name}) xong trong {duration:.1f} ms")
+        applied.append(version)
+
+    if applied:
+        # Cập nhật thống kê cho query planner sau khi thêm index
+        conn.execute('PRAGMA optimize')
+    return applied
+
+
+def print_status(conn: sqlite3.Connection):
+    done = applied_versions(conn)
+    for version, name, _ in sorted(MIGRATIONS, key=lambda m: m[0]):
+        state = f"applied {done[version]}" if version in done else 'pending'
+        print(f"{version:>4}  {name:<36} {state}")
+
+
+if __name__ == '__main__':
+    conn = sqlite3.connect(DB_PATH)
+    try:
+        if len(sys.argv) > 1 and sys.argv[1] == 'status':
+            print_status(conn)
+        elif len(sys.argv) > 1 and sys.argv[1] == 'rebuild-rollups':
+            user_id = int(sys.argv[2]) if len(sys.argv) > 2 else None
+            started = time.perf_counter()
+            conn.execute('PRAGMA busy_timeout = 30000')
+            conn.execute('BEGIN IMMEDIATE')
+            rebuild_rollups(conn, user_id)
+            conn.commit()
+            print(f"✅ Đã tính lại rollup trong {(time.perf_counter() - started) * 1000:.1f} ms")
+        else:
+            applied = run_migrations(conn)
+            if not applied:
+                print("ℹ️  Không có migration nào cần chạy")
+    finally:
+        conn.close()
@@ -1,56 +1,328 @@
 import sqlite3
+import base64
+import json
+import logging
+import queue
+import threading
+import time
+from collections import deque
+from contextlib import contextmanager
 from datetime import datetime
 from typing import Optional, List, Dict, Any
 from werkzeug.security import generate_password_hash, check_password_hash
 import os
 from dotenv import load_dotenv
+from utils import month_range
 
 # Load .env from project root so DATABASE_PATH can override default
 load_dotenv()
 
+log = logging.getLogger(__name__)
+
 class Database:
-    """Database connection handler - giữ nguyên"""
+    """Database connection handler - pool kết nối SQLite dùng lại giữa các request
+
+    Connections are opened lazily up to ``pool_size`` and handed out per
+    thread.  ``connection()`` pins one connection to the calling thread so
+    that every statement issued inside it (e.g. during one Flask request)
+    reuses the same handle; outside of it each statement borrows a pooled
+    connection and returns it immediately.
+    """
     
-    def __init__(self, db_path=os.getenv('DATABASE_PATH','prisma/dev.db')):
+    def __init__(self, db_path=os.getenv('DATABASE_PATH','prisma/dev.db'),
+                 pool_size: int = int(os.getenv('DB_POOL_SIZE', '8')),
+                 pool_timeout: float = float(os.getenv('DB_POOL_TIMEOUT', '10'))):
         self.db_path = db_path
+        self.pool_size = pool_size
+        self.pool_timeout = pool_timeout
+        # PRAGMAs applied once when a connection is opened
+        self.pragmas = {
+            'journal_mode': os.getenv('DB_JOURNAL_MODE', 'WAL'),
+            'synchronous': os.getenv('DB_SYNCHRONOUS', 'NORMAL'),
+            'cache_size': int(os.getenv('DB_CACHE_SIZE', '-16000')),     # KiB khi âm
+            'mmap_size': int(os.getenv('DB_MMAP_SIZE', str(128 * 1024 * 1024))),
+            'busy_timeout': int(os.getenv('DB_BUSY_TIMEOUT', '5000')),   # ms
+        }
+        self._idle: "queue.LifoQueue[sqlite3.Connection]" = queue.LifoQueue()
+        self._lock = threading.Lock()
+        self._local = threading.local()
+        self._opened = 0
+        self._stats = {'acquired': 0, 'waits': 0, 'wait_time': 0.0, 'max_wait': 0.0}
+        self._write_listeners = []
+        self._query_listeners = []
     
     def get_connection(self):
-        conn = sqlite3.connect(self.db_path)
+        """Open a new, configured connection owned by the caller (not pooled)"""
+        conn = sqlite3.connect(self.db_path, timeout=self.pragmas['busy_timeout'] / 1000,
+                               check_same_thread=False)
         conn.row_factory = sqlite3.Row
+        for name, value in self.pragmas.items():
+            conn.execute(f'PRAGMA {name} = {value}')
+        return conn
+
+    # ---------- pool ----------
+
+    def acquire(self) -> sqlite3.Connection:
+        """Lấy một kết nối từ pool (mở mới nếu pool chưa đầy, nếu đầy thì chờ)"""
+        try:
+            conn = self._idle.get_nowait()
+        except queue.Empty:
+            conn = None
+        if conn is None:
+            with self._lock:
+                opening = self._opened < self.pool_size
+                if opening:
+                    self._opened += 1
+            if opening:
+                try:
+                    conn = self.get_connection()
+                except Exception:
+                    with self._lock:
+                        self._opened -= 1
+                    raise
+            else:
+                conn = self._wait_for_idle()
+        with self._lock:
+            self._stats['acquired'] += 1
+        return conn
+
+    def _wait_for_idle(self) -> sqlite3.Connection:
+        started = time.perf_counter()
+        try:
+            return self._idle.get(timeout=self.pool_timeout)
+        except queue.Empty:
+            raise sqlite3.OperationalError(
+                f'connection pool exhausted (size={self.pool_size}, waited {self.pool_timeout}s)'
+            ) from None
+        finally:
+            waited = time.perf_counter() - started
+            with self._lock:
+                self._stats['waits'] += 1
+                self._stats['wait_time'] += waited
+                self._stats['max_wait'] = max(self._stats['max_wait'], waited)
+
+    def release(self, conn: sqlite3.Connection):
+        """Trả kết nối về pool; giao dịch còn dở sẽ bị rollback"""
+        if conn.in_transaction:
+            conn.rollback()
+        self._idle.put(conn)
+
+    def pin(self) -> sqlite3.Connection:
+        """Gắn một kết nối với thread hiện tại (lồng nhau được); trả về kết nối đó"""
+        conn = getattr(self._local, 'conn', None)
+        if conn is None:
+            conn = self.acquire()
+            self._local.conn = conn
+            self._local.depth = 0
+            self._local.tx_depth = 0
+        self._local.depth += 1
         return conn
+
+    def unpin(self):
+        """Bỏ gắn kết nối; lần unpin ngoài cùng trả kết nối về pool"""
+        conn = getattr(self._local, 'conn', None)
+        if conn is None:
+            return
+        self._local.depth -= 1
+        if self._local.depth <= 0:
+            self._local.conn = None
+            self._local.depth = 0
+            self.release(conn)
+
+    @contextmanager
+    def connection(self):
+        """Pin one pooled connection to the current thread for the duration of the block.
+
+        Nested uses (and every execute* call inside) share the same connection.
+        """
+        conn = self.pin()
+        try:
+            yield conn
+        finally:
+            self.unpin()
+
+    def in_transaction(self) -> bool:
+        """True khi thread hiện tại đang ở trong một db.transaction()"""
+        return getattr(self._local, 'tx_depth', 0) > 0
+
+    @contextmanager
+    def transaction(self):
+        """Unit of work: every statement inside shares one connection and commits once.
+
+        Model methods called inside the block pick the scope up implicitly.
+        The outermost scope takes the write lock up front (BEGIN IMMEDIATE) and
+        commits on success / rolls back on error; nested scopes become
+        SAVEPOINTs so an inner failure only undoes its own statements.
+        """
+        conn = self.pin()
+        depth = self._local.tx_depth
+        savepoint = f'sp_{depth}'
+        try:
+            conn.execute('BEGIN IMMEDIATE' if depth == 0 else f'SAVEPOINT {savepoint}')
+        except Exception:
+            self.unpin()
+            raise
+        if depth == 0:
+            self._local.pending_writes = set()
+        self._local.tx_depth = depth + 1
+        try:
+            yield conn
+        except BaseException:
+            self._local.tx_depth = depth
+            if depth == 0:
+                self._local.pending_writes = set()
+                conn.rollback()
+            else:
+                conn.execute(f'ROLLBACK TO {savepoint}')
+                conn.execute(f'RELEASE {savepoint}')
+            raise
+        else:
+            self._local.tx_depth = depth
+            if depth == 0:
+                pending, self._local.pending_writes = self._local.pending_writes, set()
+                conn.commit()
+                for user_id in pending:
+                    self._fire_write(user_id)
+            else:
+                conn.execute(f'RELEASE {savepoint}')
+        finally:
+            self.unpin()
+
+    # ---------- write notifications ----------
+
+    def add_write_listener(self, listener):
+        """Đăng ký callback(user_id) được gọi sau mỗi lần dữ liệu của user được commit"""
+        self._write_listeners.append(listener)
+
+    def notify_write(self, user_id):
+        """Model gọi sau khi ghi dữ liệu của user; trong transaction thì hoãn tới khi commit"""
+        if self.in_transaction():
+            self._local.pending_writes.add(user_id)
+        else:
+            self._fire_write(user_id)
+
+    def _fire_write(self, user_id):
+        for listener in self._write_listeners:
+            listener(user_id)
+
+    # ---------- query instrumentation ----------
+
+    def add_query_listener(self, listener):
+        """Đăng ký callback(query, params, seconds, rows, error) sau mỗi câu SQL (metrics, slow log)"""
+        self._query_listeners.append(listener)
+
+    def close_all(self):
+        """Đóng toàn bộ kết nối đang rảnh trong pool"""
+        while True:
+            try:
+                conn = self._idle.get_nowait()
+            except queue.Empty:
+                break
+            conn.close()
+            with self._lock:
+                self._opened -= 1
+
+    def pool_stats(self) -> Dict[str, Any]:
+        """Pool size and wait-time counters"""
+        with self._lock:
+            stats = dict(self._stats)
+            opened = self._opened
+        idle = self._idle.qsize()
+        return {
+            'max_size': self.pool_size,
+            'size': opened,
+            'idle': idle,
+            'in_use': opened - idle,
+            'acquired': stats['acquired'],
+            'waits': stats['waits'],
+            'total_wait_ms': round(stats['wait_time'] * 1000, 3),
+            'max_wait_ms': round(stats['max_wait'] * 1000, 3),
+        }
+
+    # ---------- statements ----------
+
+    def _run(self, query: str, params: tuple, fetch):
+        if not self._query_listeners:
+            return self._run_statement(query, params, fetch)
+        started = time.perf_counter()
+        result = error = None
+        try:
+            result = self._run_statement(query, params, fetch)
+            return result
+        except Exception as e:
+            error = e
+            raise
+        finally:
+            elapsed = time.perf_counter() - started
+            rows = len(result) if isinstance(result, list) else int(result is not None)
+            for listener in self._query_listeners:
+                listener(query, params, elapsed, rows, error)
+
+    def _run_statement(self, query: str, params: tuple, fetch):
+        with self.connection() as conn:
+            cursor = conn.execute(query, params)
+            try:
+                result = fetch(cursor)
+            finally:
+                cursor.close()
+            # SELECT không mở transaction nên chỉ commit khi có ghi dữ liệu;
+            # trong db.transaction() thì để scope ngoài cùng commit
+            if conn.in_transaction and not self.in_transaction():
+                conn.commit()
+            return result
     
     def execute(self, query: str, params: tuple = ()):
         """Execute query and return results"""
-        conn = self.get_connection()
-        cursor = conn.cursor()
-        cursor.execute(query, params)
-        conn.commit()
-        result = cursor.fetchall()
-        conn.close()
-        return result
+        return self._run(query, params, lambda cur: cur.fetchall())
     
     def execute_one(self, query: str, params: tuple = ()):
         """Execute query and return one result"""
-        conn = self.get_connection()
-        cursor = conn.cursor()
-        cursor.execute(query, params)
-        conn.commit()
-        result = cursor.fetchone()
-        conn.close()
-        return result
+        return self._run(query, params, lambda cur: cur.fetchone())
 
     def execute_insert(self, query, params=()):
-        conn = self.get_connection()
-        cur = conn.cursor()
-        cur.execute(query, params)
-        conn.commit()
-        last = cur.lastrowid
-        conn.close()
-        return last
+        """Execute INSERT and return lastrowid"""
+        return self._run(query, params, lambda cur: cur.lastrowid)
+
+class SlowQueryLog:
+    """
+    Query listener ghi log (WARNING, logger ``models.slow_query``) các câu SQL chạy lâu
+    hơn ``threshold_ms``: thời gian, số dòng trả về, dạng tham số (kiểu, không ghi giá trị)
+    và SQL đã gộp khoảng trắng. ``recent`` giữ các câu chậm gần nhất.
+    """
+
+    def __init__(self, threshold_ms: float, keep: int = 100):
+        self.threshold = threshold_ms / 1000
+        self.recent = deque(maxlen=keep)
+        self.logger = logging.getLogger(f'{__name__}.slow_query')
+
+    @staticmethod
+    def normalize(query: str) -> str:
+        return ' '.join(query.split())
+
+    @staticmethod
+    def params_shape(params) -> str:
+        return '(' + ', '.join(type(p).__name__ for p in params) + ')'
+
+    def __call__(self, query, params, seconds, rows, error):
+        if seconds < self.threshold:
+            return
+        entry = {
+            'sql': self.normalize(query), 'params': self.params_shape(params),
+            'rows': rows, 'ms': round(seconds * 1000, 2), 'error': repr(error) if error else None,
+        }
+        self.recent.append(entry)
+        self.logger.warning('slow query %.1f ms rows=%d params=%s%s: %s', entry['ms'], rows,
+                            entry['params'], f" error={entry['error']}" if error else '', entry['sql'])
 
 # Global database instance
 db = Database()
-print(f"[DEBUG] Using SQLite DB: {db.db_path}")
+log.debug('Using SQLite DB: %s', db.db_path)
+
+# Log câu SQL chậm hơn SLOW_QUERY_MS (mặc định 100 ms, 0 = tắt)
+SLOW_QUERY_MS = float(os.getenv('SLOW_QUERY_MS', '100'))
+slow_query_log = SlowQueryLog(SLOW_QUERY_MS) if SLOW_QUERY_MS > 0 else None
+if slow_query_log is not None:
+    db.add_query_listener(slow_query_log)
 
 class SavingsGoal:
     """Savings Goal model - giữ nguyên"""
@@ -62,9 +334,11 @@ class SavingsGoal:
         query = '''
             INSERT INTO SavingsGoal (name, targetAmount, currentAmount, deadline, userId, createdAt, updatedAt)
             VALUES (?, ?, 0, ?, ?, ?, ?)
+            RETURNING *
         '''
-        new_id = db.execute_insert(query, (name, target_amount, deadline, user_id, now, now))
-        return SavingsGoal.find_by_id(new_id)
+        row = db.execute_one(query, (name, target_amount, deadline, user_id, now, now))
+        db.notify_write(user_id)
+        return dict(row)
     
     @staticmethod
     def find_all(user_id: Optional[str] = None) -> List[Dict[str, Any]]:
@@ -109,16 +383,21 @@ class SavingsGoal:
         params.append(datetime.now().isoformat())
         params.append(goal_id)
         
-        query = f"UPDATE SavingsGoal SET {', '.join(updates)} WHERE id = ?"
-        db.execute(query, tuple(params))
-        
-        return SavingsGoal.find_by_id(goal_id)
+        query = f"UPDATE SavingsGoal SET {', '.join(updates)} WHERE id = ? RETURNING *"
+        row = db.execute_one(query, tuple(params))
+        if not row:
+            return None
+        db.notify_write(row['userId'])
+        return dict(row)
     
     @staticmethod
     def delete(goal_id: str) -> bool:
-        """Xóa mục tiêu"""
-        query = 'DELETE FROM SavingsGoal WHERE id = ?'
-        db.execute(query, (goal_id,))
+        """Xóa mục tiêu (False nếu không tồn tại)"""
+        query = 'DELETE FROM SavingsGoal WHERE id = ? RETURNING userId'
+        row = db.execute_one(query, (goal_id,))
+        if row is None:
+            return False
+        db.notify_write(row['userId'])
         return True
     
     @staticmethod
@@ -128,9 +407,13 @@ class SavingsGoal:
             UPDATE SavingsGoal 
             SET currentAmount = currentAmount + ?, updatedAt = ?
             WHERE id = ?
+            RETURNING *
         '''
-        db.execute(query, (amount, datetime.now().isoformat(), goal_id))
-        return SavingsGoal.find_by_id(goal_id)
+        row = db.execute_one(query, (amount, datetime.now().isoformat(), goal_id))
+        if not row:
+            return None
+        db.notify_write(row['userId'])
+        return dict(row)
 
 class Account:
     """Account model - Tài khoản ngân hàng"""
@@ -142,9 +425,10 @@ class Account:
         query = '''
             INSERT INTO Account (name, bank, accountNumber, currentBalance, createdAt, updatedAt)
             VALUES (?, ?, ?, ?, ?, ?)
+            RETURNING *
         '''
-        new_id = db.execute_insert(query, (name, bank, account_number, starting_balance, now, now))
-        return Account.find_by_id(new_id)
+        row = db.execute_one(query, (name, bank, account_number, starting_balance, now, now))
+        return dict(row)
     
     @staticmethod
     def find_all() -> List[Dict[str, Any]]:
@@ -178,12 +462,14 @@ class Transaction:
             INSERT INTO "Transaction"
             (userId, categoryId, amount, note, date, type, createdAt, updatedAt)
             VALUES (?, ?, ?, ?, ?, ?, ?, ?)
+            RETURNING *
         '''
-        new_id = db.execute_insert(query, (
+        row = db.execute_one(query, (
             user_id, category_id, amount, note, date,
             trans_type, now, now
         ))
-        return Transaction.find_by_id(new_id)
+        db.notify_write(user_id)
+        return dict(row)
 
     @staticmethod
     def find_by_id(trans_id: int):
@@ -194,15 +480,18 @@ class Transaction:
     
     @staticmethod
     def find_by_month(user_id: int, month: str):
+        """Giao dịch trong tháng ``month`` (YYYY-MM)"""
+        # So sánh trực tiếp cột date (không bọc strftime) để dùng index (userId, date)
+        start, end = month_range(month)
         query = '''
             SELECT t.*, c.name AS categoryName
             FROM "Transaction" t
             JOIN Category c ON t.categoryId = c.id
             WHERE t.userId = ?
-            AND strftime('%Y-%m', t.date) = ?
+            AND t.date >= ? AND t.date < ?
             ORDER BY t.date DESC, t.createdAt DESC
         '''
-        rows = db.execute(query, (user_id, month))
+        rows = db.execute(query, (user_id, start, end))
         return [dict(r) for r in rows]
     
     @staticmethod
@@ -223,18 +512,79 @@ class Transaction:
         rows = db.execute(query, (user_id,))
         return [dict(r) for r in rows]
 
+    @staticmethod
+    def page_by_user(user_id, limit: int = 50, cursor: Optional[str] = None):
+        """
+        Một trang giao dịch (mới nhất trước) theo keyset (date, createdAt, id).
+        Trả về (items, next_cursor); next_cursor = None khi hết dữ liệu.
+        Chi phí mỗi trang không phụ thuộc tổng số giao dịch (index userId, date, createdAt).
+        """
+        params: List[Any] = [user_id]
+        after = ''
+        if cursor:
+            after = 'AND (t.date, t.createdAt, t.id) < (?, ?, ?)'
+            params.extend(Transaction.decode_cursor(cursor))
+        params.append(limit + 1)
+        query = f'''
+            SELECT 
+                t.id,
+                t.amount,
+                t.date,
+                t.note,
+                t.type,
+                t.createdAt,
+                c.name AS categoryName
+            FROM "Transaction" t
+            JOIN Category c ON t.categoryId = c.id
+            WHERE t.userId = ? {after}
+            ORDER BY t.date DESC, t.createdAt DESC, t.id DESC
+            LIMIT ?
+        '''
+        items = [dict(r) for r in db.execute(query, tuple(params))]
+        next_cursor = None
+        if len(items) > limit:
+            items = items[:limit]
+            next_cursor = Transaction.encode_cursor(items[-1])
+        return items, next_cursor
+
+    @staticmethod
+    def encode_cursor(row: Dict[str, Any]) -> str:
+        raw = json.dumps([row['date'], row['createdAt'], row['id']], separators=(',', ':'))
+        return base64.urlsafe_b64encode(raw.encode()).decode().rstrip('=')
+
+    @staticmethod
+    def decode_cursor(cursor: str) -> List[Any]:
+        """Giải mã cursor; ValueError nếu không hợp lệ"""
+        try:
+            raw = base64.urlsafe_b64decode(cursor + '=' * (-len(cursor) % 4))
+            date, created_at, trans_id = json.loads(raw)
+        except (ValueError, TypeError) as e:
+            raise ValueError(f"Cursor không hợp lệ: {cursor}") from e
+        # Cursor do client gửi lại: chỉ nhận đúng kiểu encode_cursor tạo ra (id vừa INTEGER SQLite)
+        if not (isinstance(date, str) and isinstance(created_at, str)
+                and type(trans_id) is int and 0 <= trans_id < 2 ** 63):
+            raise ValueError(f"Cursor không hợp lệ: {cursor}")
+        return [date, created_at, trans_id]
+
 class User:
     """User model - simple auth"""
     
+    # Cache user theo id giữa các request (mỗi process), hết hạn sau USER_CACHE_TTL giây.
+    # update_name xóa mục tương ứng; process khác thấy tên mới sau tối đa TTL giây.
+    _cache: Dict[str, tuple] = {}
+    _cache_lock = threading.Lock()
+    CACHE_TTL = float(os.getenv('USER_CACHE_TTL', '30'))
+    
     @staticmethod
     def create(username, name, email, password, phone=None):
         now = datetime.now().isoformat()
         phash = generate_password_hash(password)
         # Insert without id -> SQLite assigns INTEGER PK
         query = '''INSERT INTO "User" (username,name,email,passwordHash,phone,createdAt,updatedAt)
-                   VALUES (?, ?, ?, ?, ?, ?, ?)'''
-        new_id = db.execute_insert(query, (username, name, email, phash, phone, now, now))
-        return User.find_by_id(new_id)
+                   VALUES (?, ?, ?, ?, ?, ?, ?)
+                   RETURNING *'''
+        row = db.execute_one(query, (username, name, email, phash, phone, now, now))
+        return dict(row)
     
     @staticmethod
     def find_by_id(user_id: str) -> Optional[Dict[str, Any]]:
@@ -242,6 +592,27 @@ class User:
         result = db.execute_one(query, (user_id,))
         return dict(result) if result else None
     
+    @staticmethod
+    def find_by_id_cached(user_id) -> Optional[Dict[str, Any]]:
+        """find_by_id qua cache TTL; dict trả về dùng chung - không sửa trực tiếp"""
+        if User.CACHE_TTL <= 0:
+            return User.find_by_id(user_id)
+        key = str(user_id)
+        now = time.monotonic()
+        entry = User._cache.get(key)
+        if entry is not None and entry[0] > now:
+            return entry[1]
+        user = User.find_by_id(user_id)
+        if user is not None:
+            with User._cache_lock:
+                User._cache[key] = (now + User.CACHE_TTL, user)
+        return user
+    
+    @staticmethod
+    def invalidate(user_id):
+        with User._cache_lock:
+            User._cache.pop(str(user_id), None)
+    
     @staticmethod
     def find_by_username(username: str) -> Optional[Dict[str, Any]]:
         query = 'SELECT * FROM "User" WHERE username = ?'
@@ -260,9 +631,26 @@ class User:
     
     @staticmethod
     def update_name(user_id: str, new_name: str) -> Dict[str, Any]:
-        query = 'UPDATE "User" SET name = ?, updatedAt = ? WHERE id = ?'
-        db.execute(query, (new_name, datetime.now().isoformat(), user_id))
-        return User.find_by_id(user_id)
+        query = 'UPDATE "User" SET name = ?, updatedAt = ? WHERE id = ? RETURNING *'
+        row = db.execute_one(query, (new_name, datetime.now().isoformat(), user_id))
+        User.invalidate(user_id)
+        return dict(row) if row else None
+
+# Danh mục tạo sẵn cho mỗi user mới (tên, icon)
+DEFAULT_EXPENSE_CATEGORIES = [
+    ('Ăn uống', 'fa-utensils'),
+    ('Đi lại', 'fa-car'),
+    ('Học tập', 'fa-book'),
+    ('Giải trí', 'fa-gamepad'),
+    ('Nhà ở', 'fa-house')
+]
+
+DEFAULT_INCOME_CATEGORIES = [
+    ('Việc chính', 'fa-briefcase'),
+    ('Làm thêm', 'fa-laptop'),
+    ('Gia đình', 'fa-people-group'),
+    ('Đầu tư', 'fa-chart-line')
+]
 
 class Category:
     @staticmethod
@@ -271,11 +659,13 @@ class Category:
         query = '''
             INSERT INTO Category (name, type, userId, createdAt)
             VALUES (?, ?, ?, ?)
+            RETURNING *
         '''
-        new_id = db.execute_insert(
+        row = db.execute_one(
             query, (name, type_, user_id, now)
         )
-        return Category.find_by_id(new_id)
+        db.notify_write(user_id)
+        return dict(row)
 
     @staticmethod
     def find_all(user_id, type_):
@@ -295,3 +685,83 @@ class Category:
             'SELECT * FROM Category WHERE id = ?', (cat_id,)
         )
         return dict(row) if row else None
+
+
+class SavingsPlan:
+    """Kế hoạch tiết kiệm AI mới nhất của mỗi mục tiêu"""
+
+    @staticmethod
+    def save_many(user_id, plans: List[Dict[str, Any]]) -> int:
+        """
+        Lưu (ghi đè) kế hoạch cho nhiều mục tiêu trong một transaction; plans: goal_id, plan,
+        monthly_amount. Chỉ lưu cho mục tiêu thuộc ``user_id`` - goal_id khác (của user khác,
+        không tồn tại) bị bỏ qua. Trả về số kế hoạch đã lưu.
+        """
+        now = datetime.now().isoformat()
+        query = '''
+            INSERT INTO SavingsPlan (goalId, userId, plan, monthlyAmount, createdAt)
+            SELECT g.id, g.userId, ?, ?, ?
+            FROM SavingsGoal g
+            WHERE g.id = ? AND g.userId = ?
+            ON CONFLICT (goalId) DO UPDATE SET
+                userId = excluded.userId, plan = excluded.plan,
+                monthlyAmount = excluded.monthlyAmount, createdAt = excluded.createdAt
+            RETURNING goalId
+        '''
+        saved = 0
+        with db.transaction():
+            for p in plans:
+                saved += len(db.execute(query, (p['plan'], p.get('monthly_amount'), now, p['goal_id'], user_id)))
+        return saved
+
+    @staticmethod
+    def find_by_goal(goal_id) -> Optional[Dict[str, Any]]:
+        row = db.execute_one('SELECT * FROM SavingsPlan WHERE goalId = ?', (goal_id,))
+        return dict(row) if row else None
+
+
+class AIJob:
+    """Job AI chạy nền (xem jobs.py): queued -> running -> done | error"""
+
+    @staticmethod
+    def create(job_id: str, user_id, kind: str, worker: Optional[str] = None) -> Dict[str, Any]:
+        query = '''
+            INSERT INTO AIJob (id, userId, kind, status, createdAt, worker)
+            VALUES (?, ?, ?, 'queued', ?, ?)
+            RETURNING *
+        '''
+        row = db.execute_one(query, (job_id, user_id, kind, datetime.now().isoformat(), worker))
+        return dict(row)
+
+    @staticmethod
+    def find_unfinished() -> List[Dict[str, Any]]:
+        """Job đang queued/running (của mọi process)"""
+        rows = db.execute("SELECT id, worker, createdAt FROM AIJob WHERE status IN ('queued', 'running')")
+        return [dict(r) for r in rows]
+
+    @staticmethod
+    def find_by_id(job_id: str) -> Optional[Dict[str, Any]]:
+        row = db.execute_one('SELECT * FROM AIJob WHERE id = ?', (job_id,))
+        return dict(row) if row else None
+
+    @staticmethod
+    def mark_running(job_id: str):
+        db.execute(
+            "UPDATE AIJob SET status = 'running', startedAt = ? WHERE id = ?",
+            (datetime.now().isoformat(), job_id)
+        )
+
+    @staticmethod
+    def finish(job_id: str, status: str, result: Optional[str] = None, error: Optional[str] = None):
+        db.execute(
+            'UPDATE AIJob SET status = ?, result = ?, error = ?, finishedAt = ? WHERE id = ?',
+            (status, result, error, datetime.now().isoformat(), job_id)
+        )
+
+    @staticmethod
+    def delete_finished_before(cutoff: str) -> int:
+        rows = db.execute(
+            "DELETE FROM AIJob WHERE status IN ('done', 'error') AND createdAt < ? RETURNING id",
+            (cutoff,)
+        )
+        return len(rows)
@@ -0,0 +1,253 @@
+"""
+Kiểm tra kế hoạch thực thi (EXPLAIN QUERY PLAN) của mọi câu SQL trên đường nóng.
+
+Tạo database tạm, seed dữ liệu, chạy các route/service chính qua Flask test client
+và ghi lại mọi câu SQL đi qua ``db`` (hook ``db.add_query_listener``). Mỗi câu khác
+nhau được EXPLAIN QUERY PLAN với chính tham số đã dùng; câu nào ``SCAN`` một bảng
+thật (thay vì ``SEARCH ... USING INDEX``) mà không nằm trong ALLOWED_SCANS thì lỗi.
+
+    python query_audit.py                    # exit 1 nếu có câu quét toàn bảng
+    python query_audit.py --verbose          # in kế hoạch của mọi câu
+    python query_audit.py --transactions 20000
+    python query_audit.py --drop-index idx_category_user_type   # phải exit 1
+"""
+import argparse
+import os
+import random
+import re
+import sys
+import tempfile
+import threading
+import time
+from datetime import date, datetime, timedelta
+
+# Câu quét toàn bảng được chấp nhận: (regex trên SQL đã gộp khoảng trắng, lý do)
+ALLOWED_SCANS = [
+    (r'^SELECT \* FROM SavingsGoal ORDER BY createdAt DESC$',
+     'Trang chủ khi user chưa có mục tiêu: liệt kê mọi mục tiêu (kể cả mục tiêu cũ userId NULL) - '
+     'đọc toàn bảng là chủ ý, index (createdAt) bỏ bước sort'),
+    (r"^SELECT r\.type, COALESCE\(c\.name, 'Khác'\) AS category, SUM\(r\.total\) AS total "
+     r'FROM TransactionDaily r LEFT JOIN Category c ON c\.id = r\.categoryId WHERE r\.day >= \?',
+     'get_financial_data_for_ai(None): dữ liệu AI khi không có user (như trang chủ ở trên) - '
+     'tổng hợp mọi user là chủ ý; route đã đăng nhập luôn lọc theo userId'),
+]
+
+# Plan ghi tên alias (SCAN t), không phải tên bảng, nên mọi bước SCAN đều bị tính -
+# kể cả SCAN ... USING [COVERING] INDEX (duyệt toàn bộ index, không có điều kiện) -
+# trừ subquery/CTE (tên lấy từ bước MATERIALIZE / CO-ROUTINE) và CONSTANT ROW.
+# SEARCH có ANY(cột) là skip-scan: duyệt mọi giá trị của cột đầu index, cũng bị tính
+SCAN_RE = re.compile(r'^SCAN (?:TABLE )?(\S+)(.*)$')
+SKIP_SCAN_RE = re.compile(r'^SEARCH \S+ .*\(ANY\(')
+DERIVED_RE = re.compile(r'^(?:MATERIALIZE|CO-ROUTINE) (\S+)')
+
+
+def normalize(query: str) -> str:
+    return ' '.join(query.split())
+
+
+def seed(conn, user_id: int, transactions: int, goals: int, rng: random.Random):
+    """Dữ liệu cho một user: giao dịch trải đều 2 năm + mục tiêu (một phần không có userId)"""
+    categories = conn.execute('SELECT id, type FROM Category WHERE userId = ?', (user_id,)).fetchall()
+    by_type = {'expense': [c[0] for c in categories if c[1] == 'expense'],
+               'income': [c[0] for c in categories if c[1] == 'income']}
+    now = datetime.now().isoformat()
+    start = date.today() - timedelta(days=730)
+    rows = []
+    for _ in range(transactions):
+        type_ = 'income' if rng.random() < 0.2 else 'expense'
+        day = (start + timedelta(days=rng.randrange(731))).isoformat()
+        rows.append((user_id, rng.choice(by_type[type_]), float(rng.randrange(10, 5000) * 1000),
+                     '', day, type_, now, now))
+    conn.executemany('''
+        INSERT INTO "Transaction" (userId, categoryId, amount, note, date, type, createdAt, updatedAt)
+        VALUES (?, ?, ?, ?, ?, ?, ?, ?)
+    ''', rows)
+    conn.executemany('''
+        INSERT INTO SavingsGoal (name, targetAmount, currentAmount, deadline, userId, createdAt, updatedAt)
+        VALUES (?, ?, ?, ?, ?, ?, ?)
+    ''', [(f'Mục tiêu {i}', 10_000_000.0, float(rng.randrange(0, 10_000_000)),
+           (date.today() + timedelta(days=rng.randrange(30, 900))).isoformat(),
+           user_id if i % 4 else None, now, now) for i in range(goals)])
+    conn.commit()
+
+
+def register(client):
+    """Đăng ký user 1 qua route (câu SELECT kiểm tra trùng + INSERT user/danh mục)"""
+    client.post('/register', data={'username': 'audit', 'password': 'audit',
+                                   'name': 'Audit', 'email': 'audit@example.com'})
+
+
+def exercise(app_module, client):
+    """Các route/service chính của user 1 (đã đăng nhập với client)"""
+    from jobs import ai_jobs
+    from models import Transaction
+    from services import AnalysisService, SavingsService, TransactionService
+    from utils import period_range
+
+    client.get('/logout')
+    client.post('/login', data={'username': 'audit', 'password': 'audit'})
+    # Mục tiêu của chính user (route AI kiểm tra quyền sở hữu)
+    goal_id = next(g['id'] for g in client.get('/api/goals').get_json()['goals'] if g['userId'] == 1)
+    page = client.get('/api/transactions?limit=20').get_json()
+    requests = [
+        ('GET', '/'), ('GET', '/analysis'), ('GET', '/analysis?days=365&granularity=month'),
+        ('GET', f"/api/transactions?cursor={page['next_cursor']}"),
+        ('GET', '/api/categories?type=expense'), ('GET', '/profile'),
+        ('GET', f'/goal/{goal_id}/edit'), ('GET', f'/ai/plan/{goal_id}'),
+        ('POST', f'/goal/{goal_id}/add-amount', {'amount': 1000}),
+        ('POST', f'/goal/{goal_id}/update', {'name': 'Đổi tên', 'targetAmount': 20_000_000, 'currentAmount': 0}),
+        ('POST', '/profile/update', {'name': 'Audit 2'}),
+    ]
+    for method, url, *form in requests:
+        client.open(url, method=method, data=form[0] if form else None)
+
+    categories = client.get('/api/categories?type=expense').get_json()
+    client.post('/transaction/create', data={'category_id': categories[0]['id'], 'amount': 50000,
+                                             'date': date.today().isoformat(), 'type': 'expense'})
+    client.post('/api/category/create', json={'name': 'Audit', 'type': 'expense'})
+    client.post('/goal/create', data={'name': 'Mới', 'targetAmount': 1_000_000})
+
+    # AI (bộ quy tắc offline): dữ liệu tài chính, job nền, kế hoạch hàng loạt
+    for url in ('/ai/analyze/run', f'/ai/plan/{goal_id}/generate', '/ai/plans/generate'):
+        job = client.post(url).get_json()
+        if job and job.get('job_id'):
+            _wait_for_job(client, job)
+    job = client.post('/ai/ask', json={'question': 'Tiết kiệm thế nào?'}).get_json()
+    _wait_for_job(client, job)
+    client.get('/ai/analyze/stream').get_data()
+
+    # /expenses, /income (template chưa có - gọi thẳng service của route) với mọi loại kỳ:
+    # khoảng trọn tháng đọc TransactionMonthly, tuần/ngày đọc TransactionDaily
+    month = date.today().strftime('%Y-%m')
+    for period in ('day', 'week', 'month', 'quarter', 'year', 'fiscal_year'):
+        start, end = period_range(period, month, app_module.FISCAL_YEAR_START_MONTH)
+        for type_ in ('expense', 'income'):
+            TransactionService.summary_by_period(1, start, end, type_)
+
+    # Service/model không có route gọi trực tiếp trong app hiện tại
+    for type_ in ('expense', 'income'):
+        AnalysisService.category_summary(1, type_)
+    AnalysisService.get_totals(1)
+    AnalysisService.balance_timeline(1)
+    AnalysisService.balance_timeline(1, days=365, granularity='month')
+    Transaction.find_by_month(1, month)
+    Transaction.find_all_by_user(1)
+    SavingsService.get_financial_data_for_ai(None)
+    ai_jobs.recover_stale()
+    ai_jobs.cleanup()
+    client.post(f'/goal/{goal_id}/delete')
+
+
+def _wait_for_job(client, job, timeout: float = 10):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        status = client.get(job['status_url']).get_json()
+        if status['status'] in ('done', 'error'):
+            client.get(job['result_url'])
+            return
+        time.sleep(0.02)
+
+
+def explain(conn, query: str, params) -> list:
+    return [row[3] for row in conn.execute(f'EXPLAIN QUERY PLAN {query}', params).fetchall()]
+
+
+def scans(plan: list) -> list:
+    """Các bước quét toàn bảng/toàn index của bảng thật hoặc alias của nó"""
+    derived = {match.group(1) for match in map(DERIVED_RE.match, plan) if match}
+    found = []
+    for step in plan:
+        if SKIP_SCAN_RE.match(step):
+            found.append(step)
+            continue
+        match = SCAN_RE.match(step)
+        if not match:
+            continue
+        name = match.group(1)
+        if name.startswith('(') or name == 'CONSTANT' or name in derived:
+            continue
+        found.append(step)
+    return found
+
+
+def allowed(sql: str):
+    for pattern, reason in ALLOWED_SCANS:
+        if re.search(pattern, sql):
+            return reason
+    return None
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='EXPLAIN QUERY PLAN cho mọi câu SQL trên đường nóng')
+    parser.add_argument('--transactions', type=int, default=5000, help='số giao dịch seed (mặc định 5000)')
+    parser.add_argument('--goals', type=int, default=20, help='số mục tiêu seed (mặc định 20)')
+    parser.add_argument('--verbose', '-v', action='store_true', help='in kế hoạch của mọi câu')
+    parser.add_argument('--drop-index', action='append', default=[], metavar='NAME',
+                        help='xóa index này trước khi chạy (kiểm tra chính bộ audit); lặp lại được')
+    args = parser.parse_args(argv)
+
+    tmp = tempfile.mkdtemp(prefix='query_audit_')
+    # Phải đặt trước khi import models/app (đường dẫn DB và cấu hình đọc lúc import)
+    os.environ.update({
+        'DATABASE_PATH': os.path.join(tmp, 'audit.db'), 'CACHE_BACKEND': 'none',
+        'AI_BACKEND': 'local', 'AI_HEALTH_PROBE': '0', 'AI_CACHE_TTL': '0', 'AI_STREAMING': '1',
+        'USER_CACHE_TTL': '0', 'SLOW_QUERY_MS': '0', 'LOG_LEVEL': 'WARNING',
+    })
+    import init_db
+    init_db.init_database()
+    import app as app_module
+    from models import db
+
+    captured = {}
+    lock = threading.Lock()
+
+    def capture(query, params, seconds, rows, error):
+        sql = normalize(query)
+        with lock:
+            captured.setdefault(sql, (query, tuple(params)))
+
+    # Gắn listener trước khi đăng ký để các câu INSERT user/danh mục cũng được kiểm tra
+    db.add_query_listener(capture)
+    client = app_module.app.test_client()
+    register(client)
+    conn = db.get_connection()
+    seed(conn, 1, args.transactions, args.goals, random.Random(7))
+    indexes = {row[0] for row in conn.execute("SELECT name FROM sqlite_master WHERE type = 'index'")}
+    for name in args.drop_index:
+        if name not in indexes:
+            parser.error(f"index không tồn tại: {name}")
+        conn.execute(f'DROP INDEX "{name}"')
+    conn.execute('ANALYZE')
+    conn.commit()
+
+    exercise(app_module, client)
+
+    failures = 0
+    print(f"🔎 {len(captured)} câu SQL khác nhau ({args.transactions:,} giao dịch seed)\n")
+    for sql, (query, params) in sorted(captured.items()):
+        plan = explain(conn, query, params)
+        found = scans(plan)
+        reason = allowed(sql) if found else None
+        if found and not reason:
+            failures += 1
+            mark = '❌'
+        elif found:
+            mark = '⚠️ '
+        else:
+            mark = '✅'
+        if args.verbose or found:
+            print(f"{mark} {sql[:160]}")
+            for step in plan:
+                print(f"      {step}")
+            if reason:
+                print(f"      (cho phép: {reason})")
+    conn.close()
+
+    if failures:
+        print(f"\n❌ {failures} câu SQL quét toàn bảng - thêm index hoặc ALLOWED_SCANS kèm lý do")
+        sys.exit(1)
+    print(f"\n✅ Không có câu SQL nóng nào quét toàn bảng")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,245 @@
+"""
+Sinh dữ liệu giả lập số lượng lớn cho load test / kiểm tra hiệu năng.
+
+Tạo schema bằng init_db.init_database rồi thêm ``--users`` user, mỗi user có danh
+mục mặc định (+ vài danh mục riêng), ``--goals`` mục tiêu và khoảng ``--transactions``
+giao dịch trải trong ``--months`` tháng gần nhất:
+- thu nhập: lương đầu tháng, thỉnh thoảng làm thêm/thưởng/đầu tư
+- chi tiêu: danh mục theo trọng số (ăn uống nhiều nhất), số tiền phân phối log-normal
+  theo danh mục, cuối tuần nhiều giao dịch hơn
+Cùng ``--seed`` cho ra cùng dữ liệu.
+
+Ghi bằng executemany theo lô ``--batch`` dòng, mỗi lô một transaction; trigger rollup
+được gỡ trong lúc nạp và tạo lại + tính lại rollup một lần ở cuối.
+
+    python seed_db.py --users 1000 --transactions 1000          # mặc định --db prisma/load.db
+    python seed_db.py --db prisma/load.db --users 10000 --transactions 1000 --reset   # ~10M giao dịch
+"""
+import argparse
+import os
+import random
+import sqlite3
+import time
+from bisect import bisect_left
+from datetime import date, datetime, timedelta
+from itertools import accumulate
+from operator import itemgetter
+
+from werkzeug.security import generate_password_hash
+
+from init_db import init_database
+from migrations import create_rollups
+from models import DEFAULT_EXPENSE_CATEGORIES, DEFAULT_INCOME_CATEGORIES
+
+# Trọng số chọn danh mục chi và số tiền trung vị (VNĐ); danh mục riêng dùng EXTRA_WEIGHT
+EXPENSE_PROFILE = {
+    'Ăn uống': (45, 60_000),
+    'Đi lại': (25, 40_000),
+    'Giải trí': (12, 250_000),
+    'Học tập': (5, 600_000),
+    'Nhà ở': (3, 2_500_000),
+}
+EXTRA_EXPENSE_CATEGORIES = ['Mua sắm', 'Sức khỏe', 'Hóa đơn', 'Du lịch', 'Thú cưng', 'Quà tặng']
+EXTRA_WEIGHT = (4, 400_000)
+# Độ lệch log-normal của số tiền (sigma của ln)
+AMOUNT_SIGMA = 0.8
+# Trọng số ngày trong tuần (thứ 2 .. chủ nhật)
+WEEKDAY_WEIGHTS = (1.0, 0.9, 0.9, 1.0, 1.2, 1.6, 1.4)
+
+GOAL_NAMES = ['Quỹ dự phòng', 'Mua xe', 'Du lịch', 'Mua nhà', 'Học thạc sĩ', 'Đám cưới',
+              'Laptop mới', 'Nghỉ hưu', 'Điện thoại', 'Sửa nhà']
+
+TRIGGER = 'trg_transaction_rollup_insert'
+
+
+def _round(amount: float, step: int = 1000) -> float:
+    return float(max(step, round(amount / step) * step))
+
+
+class Seeder:
+    def __init__(self, conn: sqlite3.Connection, rng: random.Random, months: int, batch: int):
+        self.conn = conn
+        self.rng = rng
+        self.batch = batch
+        self.end = date.today()
+        self.start = self.end - timedelta(days=months * 30)
+        self.days = [self.start + timedelta(days=i) for i in range((self.end - self.start).days + 1)]
+        self.day_strings = [d.isoformat() for d in self.days]
+        self.day_weights = list(accumulate(WEEKDAY_WEIGHTS[d.weekday()] for d in self.days))
+        self.month_starts = sorted({d.replace(day=1) for d in self.days if d.replace(day=1) >= self.start})
+        self.rows = {'User': 0, 'Category': 0, 'SavingsGoal': 0, 'Transaction': 0}
+        self._pending = {}
+        self.started = time.perf_counter()
+
+    def next_id(self, table: str) -> int:
+        return (self.conn.execute(f'SELECT COALESCE(MAX(id), 0) FROM "{table}"').fetchone()[0]) + 1
+
+    # ---------- ghi theo lô ----------
+
+    def add(self, table: str, sql: str, row: tuple):
+        pending = self._pending.setdefault(table, (sql, []))[1]
+        pending.append(row)
+        if len(pending) >= self.batch:
+            self.flush()
+
+    def flush(self):
+        """Ghi mọi dòng đang chờ trong một transaction"""
+        if not any(rows for _, rows in self._pending.values()):
+            return
+        with self.conn:
+            for table, (sql, rows) in self._pending.items():
+                if rows:
+                    self.conn.executemany(sql, rows)
+                    self.rows[table] += len(rows)
+                    rows.clear()
+        total = sum(self.rows.values())
+        elapsed = time.perf_counter() - self.started
+        print(f"   {total:>12,} dòng  ({self.rows['Transaction']:,} giao dịch)  "
+              f"{total / elapsed:,.0f} dòng/giây", flush=True)
+
+    # ---------- sinh dữ liệu ----------
+
+    def user(self, user_id: int, password_hash: str, transactions: int, goals: int, category_id: int) -> int:
+        """Sinh một user; trả về category id kế tiếp"""
+        rng = self.rng
+        created = datetime.combine(self.start, datetime.min.time()).isoformat()
+        self.add('User', '''
+            INSERT INTO "User" (id, username, name, email, passwordHash, phone, createdAt, updatedAt)
+            VALUES (?, ?, ?, ?, ?, ?, ?, ?)
+        ''', (user_id, f'user{user_id:07d}', f'User {user_id}', f'user{user_id}@example.com',
+              password_hash, None, created, created))
+
+        # Danh mục: mặc định + 0-3 danh mục chi riêng
+        expense, income = [], []
+        names = [(n, 'expense') for n, _ in DEFAULT_EXPENSE_CATEGORIES]
+        names += [(n, 'expense') for n in rng.sample(EXTRA_EXPENSE_CATEGORIES, rng.randint(0, 3))]
+        names += [(n, 'income') for n, _ in DEFAULT_INCOME_CATEGORIES]
+        for name, type_ in names:
+            self.add('Category', 'INSERT INTO Category (id, name, type, userId, createdAt) VALUES (?, ?, ?, ?, ?)',
+                     (category_id, name, type_, user_id, created))
+            (expense if type_ == 'expense' else income).append((category_id, name))
+            category_id += 1
+
+        salary = _round(rng.lognormvariate(16.4, 0.5), 100_000)   # trung vị ~13 triệu/tháng
+        self._transactions(user_id, expense, income, salary, transactions)
+        self._goals(user_id, salary, goals)
+        return category_id
+
+    def _transactions(self, user_id, expense, income, salary, count):
+        rng = self.rng
+        rows = []
+        # Thu nhập: lương ngày 1-5 mỗi tháng + thu nhập phụ ngẫu nhiên
+        main, side = income[0][0], income[1:]
+        for month in self.month_starts:
+            day = month + timedelta(days=rng.randint(0, 4))
+            if day <= self.end:
+                rows.append((day.isoformat(), main, salary, 'income', 'Lương'))
+            if rng.random() < 0.3:
+                day = min(month + timedelta(days=rng.randint(5, 27)), self.end)
+                rows.append((day.isoformat(), rng.choice(side)[0], _round(salary * rng.uniform(0.05, 0.5)),
+                             'income', None))
+
+        # Chi tiêu: phần còn lại, chọn danh mục theo trọng số, ngày theo trọng số thứ trong tuần
+        profile = [EXPENSE_PROFILE.get(name, EXTRA_WEIGHT) for _, name in expense]
+        cum = list(accumulate(weight for weight, _ in profile))
+        total_weight = cum[-1]
+        n = max(count - len(rows), 0)
+        days = rng.choices(self.day_strings, cum_weights=self.day_weights, k=n)
+        for day in days:
+            index = bisect_left(cum, rng.random() * total_weight)
+            median = profile[index][1]
+            amount = _round(median * rng.lognormvariate(0, AMOUNT_SIGMA))
+            rows.append((day, expense[index][0], amount, 'expense', None))
+
+        rows.sort(key=itemgetter(0))
+        sql = '''
+            INSERT INTO "Transaction" (userId, categoryId, amount, note, date, type, createdAt, updatedAt)
+            VALUES (?, ?, ?, ?, ?, ?, ?, ?)
+        '''
+        for day, category_id, amount, type_, note in rows:
+            stamp = f'{day}T{rng.randint(7, 22):02d}:{rng.randint(0, 59):02d}:00'
+            self.add('Transaction', sql, (user_id, category_id, amount, note, day, type_, stamp, stamp))
+
+    def _goals(self, user_id, salary, count):
+        rng = self.rng
+        for name in rng.sample(GOAL_NAMES, min(count, len(GOAL_NAMES))) + \
+                [f'Mục tiêu {i}' for i in range(max(count - len(GOAL_NAMES), 0))]:
+            target = _round(salary * rng.uniform(2, 60), 1_000_000)
+            current = _round(target * rng.betavariate(1.2, 2.5)) if rng.random() < 0.9 else target
+            deadline = None
+            if rng.random() < 0.8:
+                deadline = (self.end + timedelta(days=rng.randint(-60, 1500))).isoformat()
+            created = f'{rng.choice(self.day_strings)}T09:00:00'
+            self.add('SavingsGoal', '''
+                INSERT INTO SavingsGoal (name, targetAmount, currentAmount, deadline, userId, createdAt, updatedAt)
+                VALUES (?, ?, ?, ?, ?, ?, ?)
+            ''', (name, target, current, deadline, user_id, created, created))
+
+
+def seed(db_path: str, users: int, transactions: int, goals: int, months: int = 24,
+         seed_value: int = 42, batch: int = 50_000, password: str = 'password'):
+    init_database(db_path)
+    conn = sqlite3.connect(db_path)
+    # Nạp hàng loạt: không fsync, cache lớn; WAL giữ nguyên từ init_database/app
+    conn.execute('PRAGMA synchronous = OFF')
+    conn.execute('PRAGMA cache_size = -262144')
+    conn.execute('PRAGMA temp_store = MEMORY')
+
+    seeder = Seeder(conn, random.Random(seed_value), months, batch)
+    # Một hash dùng chung cho mọi user (scrypt chậm ~50 ms/lần)
+    password_hash = generate_password_hash(password)
+    user_id = seeder.next_id('User')
+    category_id = seeder.next_id('Category')
+
+    print(f"🌱 Sinh {users:,} user × ~{transactions:,} giao dịch, {goals} mục tiêu (seed={seed_value})")
+    # Trigger rollup chạy mỗi dòng INSERT - gỡ khi nạp, tính lại rollup một lần ở cuối
+    conn.execute(f'DROP TRIGGER IF EXISTS {TRIGGER}')
+    try:
+        for offset in range(users):
+            category_id = seeder.user(user_id + offset, password_hash, transactions, goals, category_id)
+        seeder.flush()
+    finally:
+        load_time = time.perf_counter() - seeder.started
+        print("⏳ Tạo lại trigger và tính lại bảng rollup...")
+        started = time.perf_counter()
+        with conn:
+            create_rollups(conn)
+        rollup_time = time.perf_counter() - started
+        conn.execute('ANALYZE')
+        conn.close()
+
+    total = sum(seeder.rows.values())
+    print(f"✅ {total:,} dòng trong {load_time:.1f} giây ({total / load_time:,.0f} dòng/giây), "
+          f"rollup {rollup_time:.1f} giây")
+    for table, count in seeder.rows.items():
+        print(f"   {table:<12} {count:>12,}")
+    return seeder.rows
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Sinh dữ liệu giả lập số lượng lớn')
+    parser.add_argument('--db', default='prisma/load.db', help='file SQLite (không dùng database của app)')
+    parser.add_argument('--users', type=int, default=100)
+    parser.add_argument('--transactions', type=int, default=1000, help='số giao dịch mỗi user (xấp xỉ)')
+    parser.add_argument('--goals', type=int, default=5, help='số mục tiêu mỗi user')
+    parser.add_argument('--months', type=int, default=24, help='khoảng thời gian của giao dịch')
+    parser.add_argument('--seed', type=int, default=42)
+    parser.add_argument('--batch', type=int, default=50_000, help='số dòng mỗi lô/transaction')
+    parser.add_argument('--password', default='password', help='mật khẩu của mọi user')
+    parser.add_argument('--reset', action='store_true', help='xóa file database trước khi sinh')
+    args = parser.parse_args(argv)
+
+    # --reset xóa file: không bao giờ làm trên database app đang dùng (DATABASE_PATH)
+    app_db = os.getenv('DATABASE_PATH', 'prisma/dev.db')
+    if args.reset and os.path.realpath(args.db) == os.path.realpath(app_db):
+        parser.error(f'--reset không được dùng với database của app ({app_db})')
+
+    if args.reset:
+        for suffix in ('', '-wal', '-shm'):
+            if os.path.exists(args.db + suffix):
+                os.remove(args.db + suffix)
+    seed(args.db, args.users, args.transactions, args.goals, args.months, args.seed, args.batch, args.password)
+
+
+if __name__ == '__main__':
+    main()
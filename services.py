@@ -1,8 +1,230 @@
-from typing import Dict, Any, List, Optional
+from typing import Dict, Any, List, Optional, Tuple
 from models import SavingsGoal, Account, Transaction, db
-from datetime import datetime, timedelta
+from utils import month_range
+from datetime import datetime, timedelta, date
+from collections import OrderedDict
+from functools import wraps
 import csv
 import io
+import json
+import os
+import sqlite3
+import threading
+import time
+
+# ==================== RESULT CACHE ====================
+# Kết quả đọc của service được cache theo (hàm, tham số, version dữ liệu của user).
+# Version tăng sau mỗi lần ghi Transaction / SavingsGoal / Category của user
+# (models gọi db.notify_write), nên lượt xem lặp lại không chạm tới database.
+#
+# Chỉ ghi đi qua models trong CÙNG phạm vi backend mới làm mất hiệu lực cache:
+# - MemoryCacheBackend: version nằm trong process - với nhiều worker process
+#   (gunicorn -w N), ghi ở process khác KHÔNG làm mất hiệu lực cache của process
+#   này, kết quả có thể cũ tới khi entry bị đẩy ra. Khi WEB_CONCURRENCY > 1 mặc
+#   định dùng SQLiteCacheBackend (version dùng chung giữa các process trên một máy).
+# - Ghi thẳng vào database (sqlite3 CLI, seed_db.py, migrations.py rebuild-rollups)
+#   không qua models: cần khởi động lại app (memory) hoặc xóa CACHE_PATH (sqlite).
+
+class MemoryCacheBackend:
+    """LRU trong process (mặc định). Version chỉ dùng chung giữa các thread của một process."""
+
+    def __init__(self, max_entries: int = 2048):
+        self.max_entries = max_entries
+        self._entries: "OrderedDict[str, Any]" = OrderedDict()
+        self._versions: Dict[str, int] = {}
+        self._lock = threading.Lock()
+
+    def get(self, key: str) -> Tuple[bool, Any]:
+        with self._lock:
+            if key not in self._entries:
+                return False, None
+            self._entries.move_to_end(key)
+            return True, self._entries[key]
+
+    def set(self, key: str, value: Any):
+        with self._lock:
+            self._entries[key] = value
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def version(self, scope: str) -> int:
+        return self._versions.get(scope, 0)
+
+    def bump(self, scope: str):
+        with self._lock:
+            self._versions[scope] = self._versions.get(scope, 0) + 1
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def __len__(self):
+        return len(self._entries)
+
+
+class SQLiteCacheBackend:
+    """
+    Cache trên đĩa (file SQLite riêng, không phải DB chính). Version và kết quả
+    dùng chung giữa các worker process trên cùng máy (vd. gunicorn -w 4).
+    Giá trị lưu dạng JSON.
+    """
+
+    def __init__(self, path: str, max_entries: int = 20000):
+        self.path = path
+        self.max_entries = max_entries
+        self._local = threading.local()
+        conn = self._conn()
+        conn.execute('''
+            CREATE TABLE IF NOT EXISTS CacheEntry (
+                key TEXT PRIMARY KEY,
+                value TEXT NOT NULL,
+                lastUsed REAL NOT NULL
+            )
+        ''')
+        conn.execute('CREATE INDEX IF NOT EXISTS idx_cacheentry_lastused ON CacheEntry (lastUsed)')
+        conn.execute('''
+            CREATE TABLE IF NOT EXISTS CacheVersion (
+                scope TEXT PRIMARY KEY,
+                version INTEGER NOT NULL
+            )
+        ''')
+
+    def _conn(self) -> sqlite3.Connection:
+        conn = getattr(self._local, 'conn', None)
+        if conn is None:
+            cache_dir = os.path.dirname(self.path)
+            if cache_dir:
+                os.makedirs(cache_dir, exist_ok=True)
+            conn = sqlite3.connect(self.path, timeout=5, isolation_level=None)
+            conn.execute('PRAGMA journal_mode = WAL')
+            conn.execute('PRAGMA synchronous = OFF')
+            self._local.conn = conn
+        return conn
+
+    def get(self, key: str) -> Tuple[bool, Any]:
+        conn = self._conn()
+        row = conn.execute('SELECT value FROM CacheEntry WHERE key = ?', (key,)).fetchone()
+        if row is None:
+            return False, None
+        conn.execute('UPDATE CacheEntry SET lastUsed = ? WHERE key = ?', (time.time(), key))
+        return True, json.loads(row[0])
+
+    def set(self, key: str, value: Any):
+        conn = self._conn()
+        conn.execute(
+            'INSERT OR REPLACE INTO CacheEntry (key, value, lastUsed) VALUES (?, ?, ?)',
+            (key, json.dumps(value, default=str), time.time())
+        )
+        # Dọn LRU theo lô để không phải đếm ở mỗi lần ghi
+        if conn.total_changes % 256 == 0:
+            conn.execute('''
+                DELETE FROM CacheEntry WHERE key IN (
+                    SELECT key FROM CacheEntry ORDER BY lastUsed DESC LIMIT -1 OFFSET ?
+                )
+            ''', (self.max_entries,))
+
+    def version(self, scope: str) -> int:
+        row = self._conn().execute('SELECT version FROM CacheVersion WHERE scope = ?', (scope,)).fetchone()
+        return row[0] if row else 0
+
+    def bump(self, scope: str):
+        self._conn().execute('''
+            INSERT INTO CacheVersion (scope, version) VALUES (?, 1)
+            ON CONFLICT (scope) DO UPDATE SET version = version + 1
+        ''', (scope,))
+
+    def clear(self):
+        self._conn().execute('DELETE FROM CacheEntry')
+
+    def __len__(self):
+        return self._conn().execute('SELECT COUNT(*) FROM CacheEntry').fetchone()[0]
+
+
+class ResultCache:
+    """Cache kết quả hàm đọc theo user; ``backend`` là MemoryCacheBackend hoặc SQLiteCacheBackend"""
+
+    ALL_USERS = '*'
+
+    def __init__(self, backend=None):
+        self.backend = backend
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+
+    def cached(self, fn):
+        """
+        Decorator cho hàm có tham số đầu là user_id. Khóa gồm tên hàm, tham số,
+        version dữ liệu của user (user_id None = mọi user) và ngày hiện tại
+        (các hàm dùng cửa sổ "90 ngày gần nhất" đổi kết quả khi qua ngày).
+        Giá trị trả về được dùng chung - caller không được sửa trực tiếp.
+        """
+        name = f'{fn.__module__}.{fn.__qualname__}'
+
+        @wraps(fn)
+        def wrapper(user_id=None, *args, **kwargs):
+            backend = self.backend
+            if backend is None:
+                return fn(user_id, *args, **kwargs)
+            scope = self.ALL_USERS if user_id is None else str(user_id)
+            key = json.dumps(
+                [name, scope, args, sorted(kwargs.items()), backend.version(scope), date.today().isoformat()],
+                default=str, separators=(',', ':')
+            )
+            hit, value = backend.get(key)
+            with self._lock:
+                if hit:
+                    self.hits += 1
+                else:
+                    self.misses += 1
+            if hit:
+                return value
+            value = fn(user_id, *args, **kwargs)
+            backend.set(key, value)
+            return value
+
+        wrapper.uncached = fn
+        return wrapper
+
+    def invalidate_user(self, user_id):
+        """Tăng version của user (và của phạm vi 'mọi user')"""
+        if self.backend is None:
+            return
+        if user_id is not None:
+            self.backend.bump(str(user_id))
+        self.backend.bump(self.ALL_USERS)
+
+    def clear(self):
+        if self.backend is not None:
+            self.backend.clear()
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            hits, misses = self.hits, self.misses
+        total = hits + misses
+        return {
+            'backend': type(self.backend).__name__ if self.backend else None,
+            'entries': len(self.backend) if self.backend is not None else 0,
+            'hits': hits,
+            'misses': misses,
+            'hit_ratio': round(hits / total, 4) if total else 0.0,
+        }
+
+
+def _make_cache_backend():
+    """CACHE_BACKEND=memory | sqlite | none; mặc định memory, hoặc sqlite khi WEB_CONCURRENCY > 1"""
+    multi_process = int(os.getenv('WEB_CONCURRENCY', '1') or '1') > 1
+    kind = os.getenv('CACHE_BACKEND', 'sqlite' if multi_process else 'memory').lower()
+    max_entries = int(os.getenv('CACHE_MAX_ENTRIES', '2048'))
+    if kind == 'none':
+        return None
+    if kind == 'sqlite':
+        return SQLiteCacheBackend(os.getenv('CACHE_PATH', 'prisma/cache.db'), max_entries)
+    return MemoryCacheBackend(max_entries)
+
+cache = ResultCache(_make_cache_backend())
+db.add_write_listener(cache.invalidate_user)
+
 
 class SavingsService:
     """Savings service - Business logic"""
@@ -32,20 +254,20 @@ class SavingsService:
     def update_goal(goal_id: str, name: Optional[str] = None, target_amount: Optional[float] = None,
                    current_amount: Optional[float] = None, deadline: Optional[str] = None) -> Dict[str, Any]:
         """Cập nhật mục tiêu"""
-        goal = SavingsGoal.find_by_id(goal_id)
+        # UPDATE ... RETURNING: không có dòng trả về nghĩa là mục tiêu không tồn tại
+        goal = SavingsGoal.update(goal_id, name, target_amount, current_amount, deadline)
         if not goal:
             raise ValueError("Không tìm thấy mục tiêu")
         
-        return SavingsGoal.update(goal_id, name, target_amount, current_amount, deadline)
+        return goal
     
     @staticmethod
     def delete_goal(goal_id: str) -> bool:
         """Xóa mục tiêu"""
-        goal = SavingsGoal.find_by_id(goal_id)
-        if not goal:
+        if not SavingsGoal.delete(goal_id):
             raise ValueError("Không tìm thấy mục tiêu")
         
-        return SavingsGoal.delete(goal_id)
+        return True
     
     @staticmethod
     def add_amount_to_goal(goal_id: str, amount: float) -> Dict[str, Any]:
@@ -77,6 +299,7 @@ class SavingsService:
         }
     
     @staticmethod
+    @cache.cached
     def get_summary(user_id: Optional[str] = None) -> Dict[str, Any]:
         """Tổng hợp tất cả mục tiêu"""
         goals = SavingsGoal.find_all(user_id)
@@ -101,38 +324,44 @@ class SavingsService:
         }
         
     @staticmethod
+    @cache.cached
     def get_financial_data_for_ai(user_id: Optional[str] = None, months: int = 6) -> Dict[str, Any]:
         """
             Tổng hợp dữ liệu tài chính để gửi cho AI
             Bao gồm: thu nhập, chi tiêu, mục tiêu tiết kiệm
+            (cache theo version dữ liệu của user - các route AI gọi lại nhiều lần)
         """
         # Lấy mục tiêu
         goals = SavingsGoal.find_all(user_id)
         
-        # Lấy giao dịch (giả sử có Transaction model)
-        try:
-            # Lấy giao dịch 6 tháng gần đây
-            cutoff_date = (datetime.now() - timedelta(days=months*30)).isoformat()
-            transactions = Transaction.find_all(limit=1000)
-            
-            # Lọc theo thời gian
-            recent_trans = [t for t in transactions if t.get('date', '') >= cutoff_date]
-            
-            total_income = sum(t['amount'] for t in recent_trans if t['type'] == 'INCOME')
-            total_expense = sum(t['amount'] for t in recent_trans if t['type'] == 'EXPENSE')
-            
-            # Chi tiêu theo danh mục
-            expense_by_category = {}
-            for t in recent_trans:
-                if t['type'] == 'EXPENSE':
-                    cat = t.get('category', 'Khác')
-                    expense_by_category[cat] = expense_by_category.get(cat, 0) + t['amount']
-            
-        except Exception as e:
-            # Nếu chưa có giao dịch hoặc lỗi
-            total_income = 0
-            total_expense = 0
-            expense_by_category = {}
+        # Thu/chi theo danh mục trong ``months`` tháng (30 ngày) gần đây - cộng sẵn trong
+        # SQL từ rollup theo ngày, chỉ trả về một dòng cho mỗi (loại, danh mục)
+        cutoff_date = (date.today() - timedelta(days=months * 30)).isoformat()
+        user_filter = 'r.userId = ? AND ' if user_id else ''
+        params = (user_id, cutoff_date) if user_id else (cutoff_date,)
+        rows = db.execute(f'''
+            SELECT r.type, COALESCE(c.name, 'Khác') AS category, SUM(r.total) AS total
+            FROM TransactionDaily r
+            LEFT JOIN Category c ON c.id = r.categoryId
+            WHERE {user_filter}r.day >= ?
+            GROUP BY r.type, r.categoryId
+            ORDER BY total DESC
+        ''', params)
+        
+        total_income = 0
+        total_expense = 0
+        income_by_category = {}
+        expense_by_category = {}
+        for r in rows:
+            if r['type'] == 'income':
+                total_income += r['total']
+                by_category = income_by_category
+            elif r['type'] == 'expense':
+                total_expense += r['total']
+                by_category = expense_by_category
+            else:
+                continue
+            by_category[r['category']] = by_category.get(r['category'], 0) + r['total']
         
         # Tổng tiết kiệm hiện tại
         current_savings = sum(g.get('currentAmount', 0) for g in goals)
@@ -149,12 +378,38 @@ class SavingsService:
             'current_savings': current_savings,
             'savings_goals': goals,
             'expense_by_category': expense_by_category,
+            'income_by_category': income_by_category,
             'period_months': months,
             'monthly_income': monthly_avg_income,
             'monthly_expense': monthly_avg_expense,
             'other_goals': goals
         }
         
+# Thay đổi ròng của một dòng rollup: thu nhập cộng, chi tiêu trừ
+NET_TOTAL = "CASE WHEN type='income' THEN total WHEN type='expense' THEN -total ELSE 0 END"
+
+# Số dư trước ngày ``start``: các tháng trọn vẹn từ TransactionMonthly + phần đầu
+# tháng chứa ``start`` từ TransactionDaily. Tham số: _opening_balance_params()
+OPENING_BALANCE_SQL = f"""
+            SELECT NULL AS day, SUM(net) AS net FROM (
+                SELECT SUM({NET_TOTAL}) AS net
+                FROM TransactionMonthly
+                WHERE userId = ? AND month < ?
+                UNION ALL
+                SELECT SUM({NET_TOTAL}) AS net
+                FROM TransactionDaily
+                WHERE userId = ? AND day >= ? AND day < ?
+            )"""
+
+def _opening_balance_params(user_id, start: str) -> tuple:
+    return (user_id, start[:7], user_id, start[:7] + '-01', start)
+
+def _rollup_range(start: str, end: str):
+    """Chọn bảng rollup cho khoảng [start, end): (bảng, cột kỳ, cận dưới, cận trên)"""
+    if start.endswith('-01') and end.endswith('-01'):
+        return 'TransactionMonthly', 'month', start[:7], end[:7]
+    return 'TransactionDaily', 'day', start, end
+
 class TransactionService:
     @staticmethod
     def add_transaction(user_id, category_id, amount, date, note, trans_type):
@@ -174,141 +429,186 @@ class TransactionService:
         )
     @staticmethod
     def summary_by_month(user_id, month, trans_type):
-        query = '''
+        start, end = month_range(month)
+        return TransactionService.summary_by_period(user_id, start, end, trans_type)
+
+    @staticmethod
+    @cache.cached
+    def summary_by_period(user_id, start, end, trans_type):
+        """Tổng theo danh mục trong khoảng [start, end) - xem utils.period_range"""
+        # Đọc từ bảng rollup: khoảng trọn tháng dùng TransactionMonthly, còn lại TransactionDaily
+        table, period, lo, hi = _rollup_range(start, end)
+        query = f'''
             SELECT c.name as category,
-                   SUM(t.amount) as total
-            FROM "Transaction" t
-            JOIN Category c ON t.categoryId = c.id
-            WHERE t.userId = ?
-              AND t.type = ?
-              AND strftime('%Y-%m', t.date) = ?
-            GROUP BY c.id
+                   SUM(r.total) as total
+            FROM {table} r
+            JOIN Category c ON r.categoryId = c.id
+            WHERE r.userId = ?
+              AND r.{period} >= ? AND r.{period} < ?
+              AND r.type = ?
+            GROUP BY r.categoryId
             ORDER BY total DESC
         '''
-        rows = db.execute(query, (user_id, trans_type, month))
+        rows = db.execute(query, (user_id, lo, hi, trans_type))
         return [dict(r) for r in rows]
     
 class AnalysisService:
     @staticmethod
+    @cache.cached
     def category_summary(user_id, trans_type):
         """Tổng hợp theo danh mục cho 3 tháng gần nhất"""
         # Lấy ngày 3 tháng trước
         three_months_ago = (datetime.now() - timedelta(days=90)).strftime('%Y-%m-%d')
         
         query = '''
-            SELECT c.name AS category, SUM(t.amount) AS total
-            FROM "Transaction" t
-            JOIN Category c ON t.categoryId = c.id
-            WHERE t.userId = ?
-              AND t.type = ?
-              AND t.date >= ?
-            GROUP BY c.id
+            SELECT c.name AS category, SUM(r.total) AS total
+            FROM TransactionDaily r
+            JOIN Category c ON r.categoryId = c.id
+            WHERE r.userId = ?
+              AND r.day >= ?
+              AND r.type = ?
+            GROUP BY r.categoryId
             ORDER BY total DESC
         '''
-        rows = db.execute(query, (user_id, trans_type, three_months_ago))
+        rows = db.execute(query, (user_id, three_months_ago, trans_type))
         return [dict(r) for r in rows]
     
     @staticmethod
-    def balance_timeline(user_id):
+    def _window(days: int, start: Optional[str], end: Optional[str], granularity: str):
+        """Cửa sổ [start_date, end_date] (cả hai đầu) + chuỗi ISO dùng trong truy vấn"""
+        if granularity not in ('day', 'week', 'month'):
+            raise ValueError(f"granularity không hợp lệ: {granularity}")
+        end_date = datetime.strptime(end, '%Y-%m-%d').date() if end else datetime.now().date()
+        if start:
+            start_date = datetime.strptime(start, '%Y-%m-%d').date()
+        else:
+            start_date = end_date - timedelta(days=days)
+        return start_date, end_date, start_date.isoformat(), (end_date + timedelta(days=1)).isoformat()
+
+    @staticmethod
+    def _accumulate(opening: float, daily_net: Dict[str, float], start_date, end_date, granularity: str):
+        """Cộng dồn một lượt qua các ngày (kể cả ngày không có giao dịch); số dư cuối mỗi kỳ"""
+        running_balance = opening
+        result = []
+        current = start_date
+        one_day = timedelta(days=1)
+        while current <= end_date:
+            running_balance += daily_net.get(current.isoformat(), 0)
+            following = current + one_day
+            if granularity == 'day':
+                result.append({'date': f'{current.day:02d}/{current.month:02d}', 'balance': running_balance})
+            elif granularity == 'week':
+                if following.weekday() == 0 or current == end_date:
+                    week_start = max(start_date, current - timedelta(days=current.weekday()))
+                    result.append({'date': f'{week_start.day:02d}/{week_start.month:02d}', 'balance': running_balance})
+            elif following.day == 1 or current == end_date:
+                result.append({'date': f'{current.month:02d}/{current.year}', 'balance': running_balance})
+            current = following
+        return result
+
+    @staticmethod
+    @cache.cached
+    def balance_timeline(user_id, days: int = 90, start: Optional[str] = None,
+                         end: Optional[str] = None, granularity: str = 'day'):
         """
-        Tính số dư theo ngày cho 90 ngày gần nhất
+        Số dư cuối mỗi kỳ trong cửa sổ [start, end] (mặc định 90 ngày gần nhất)
         Số dư = Tổng thu nhập - Tổng chi tiêu tính đến ngày đó
+        granularity: 'day' | 'week' | 'month'
         """
-        # Lấy 90 ngày gần nhất
-        ninety_days_ago = (datetime.now() - timedelta(days=90)).strftime('%Y-%m-%d')
-        
-        conn = db.get_connection()
-        cur = conn.cursor()
-
-        # Lấy tất cả transactions trong 90 ngày
-        cur.execute("""
-            SELECT date, amount, type
-            FROM "Transaction"
-            WHERE userId = ?
-              AND date >= ?
-            ORDER BY date ASC
-        """, (user_id, ninety_days_ago))
-
-        transactions = cur.fetchall()
-        conn.close()
-
-        # Tạo dict để lưu số dư theo ngày
-        daily_balance = {}
-        running_balance = 0
-        
-        # Tính số dư ban đầu (trước 90 ngày)
-        conn = db.get_connection()
-        cur = conn.cursor()
-        cur.execute("""
-            SELECT 
-                SUM(CASE WHEN type='income' THEN amount ELSE 0 END) as total_income,
-                SUM(CASE WHEN type='expense' THEN amount ELSE 0 END) as total_expense
-            FROM "Transaction"
-            WHERE userId = ? AND date < ?
-        """, (user_id, ninety_days_ago))
-        
-        initial = cur.fetchone()
-        conn.close()
-        
-        if initial:
-            running_balance = (initial['total_income'] or 0) - (initial['total_expense'] or 0)
-        
-        # Tạo danh sách tất cả các ngày trong 90 ngày
-        current_date = datetime.strptime(ninety_days_ago, '%Y-%m-%d')
-        end_date = datetime.now()
-        
-        all_dates = []
-        while current_date <= end_date:
-            date_str = current_date.strftime('%Y-%m-%d')
-            all_dates.append(date_str)
-            daily_balance[date_str] = running_balance
-            current_date += timedelta(days=1)
-        
-        # Cập nhật số dư cho các ngày có giao dịch
-        for trans in transactions:
-            date_str = trans['date']
-            amount = trans['amount']
-            trans_type = trans['type']
-            
-            if trans_type == 'income':
-                running_balance += amount
-            else:  # expense
-                running_balance -= amount
-            
-            # Cập nhật số dư cho ngày này và tất cả các ngày sau
-            for d in all_dates:
-                if d >= date_str:
-                    daily_balance[d] = running_balance
-                    
-        # Chuyển sang format cho Chart.js
-        result = []
-        for date_str in all_dates:
-            result.append({
-                'date': datetime.strptime(date_str, '%Y-%m-%d').strftime('%d/%m'),
-                'balance': daily_balance.get(date_str, 0)
-            })
-        
-        return result
+        start_date, end_date, start_str, stop_str = AnalysisService._window(days, start, end, granularity)
+
+        # Một câu lệnh trên rollup: dòng đầu là số dư trước cửa sổ, sau đó là thay đổi ròng theo ngày
+        rows = db.execute(f"""
+            {OPENING_BALANCE_SQL}
+            UNION ALL
+            SELECT day, SUM({NET_TOTAL}) AS net
+            FROM TransactionDaily
+            WHERE userId = ? AND day >= ? AND day < ?
+            GROUP BY day
+        """, _opening_balance_params(user_id, start_str) + (user_id, start_str, stop_str))
+
+        opening = 0
+        daily_net = {}
+        for row in rows:
+            if row['day'] is None:
+                opening = row['net'] or 0
+            else:
+                daily_net[row['day']] = row['net'] or 0
+
+        return AnalysisService._accumulate(opening, daily_net, start_date, end_date, granularity)
+
+    @staticmethod
+    @cache.cached
+    def snapshot(user_id, days: int = 90, start: Optional[str] = None,
+                 end: Optional[str] = None, granularity: str = 'day') -> Dict[str, Any]:
+        """
+        Toàn bộ dữ liệu biểu đồ trang /analysis trong một câu lệnh (một lượt đi-về DB):
+        số dư theo thời gian, chi tiêu/thu nhập theo danh mục và tổng thu/chi.
+
+        Danh mục và tổng thu/chi tính từ đầu cửa sổ; không truyền ``end`` thì không có
+        cận trên (gồm cả giao dịch ghi ngày tương lai) như category_summary/get_totals.
+        """
+        start_date, end_date, start_str, stop_str = AnalysisService._window(days, start, end, granularity)
+        category_stop = stop_str if end else '9999-12-31'
+
+        # UNION ALL của ba nhóm tổng hợp (mỗi nhóm một lần đọc khoảng index trên rollup),
+        # gom sẵn trong SQL nên chỉ ~(số ngày + số danh mục) dòng về Python:
+        #   kind='open' số dư trước cửa sổ | 'day' thay đổi ròng theo ngày | 'category' tổng theo danh mục
+        rows = db.execute(f"""
+            SELECT 'open' AS kind, NULL AS key, NULL AS type, NULL AS category, net AS total
+            FROM ({OPENING_BALANCE_SQL})
+            UNION ALL
+            SELECT 'day', day, NULL, NULL, SUM({NET_TOTAL})
+            FROM TransactionDaily
+            WHERE userId = ? AND day >= ? AND day < ?
+            GROUP BY day
+            UNION ALL
+            SELECT 'category', r.categoryId, r.type, c.name, SUM(r.total)
+            FROM TransactionDaily r
+            JOIN Category c ON r.categoryId = c.id
+            WHERE r.userId = ? AND r.day >= ? AND r.day < ?
+            GROUP BY r.categoryId, r.type
+        """, _opening_balance_params(user_id, start_str) + (user_id, start_str, stop_str)
+            + (user_id, start_str, category_stop))
+
+        opening = 0
+        daily_net: Dict[str, float] = {}
+        by_category = {'income': [], 'expense': []}
+        for row in rows:
+            kind = row['kind']
+            if kind == 'day':
+                daily_net[row['key']] = row['total'] or 0
+            elif kind == 'category':
+                if row['type'] in by_category:
+                    by_category[row['type']].append({'category': row['category'], 'total': row['total']})
+            else:
+                opening = row['total'] or 0
+        for items in by_category.values():
+            items.sort(key=lambda c: -c['total'])
+        totals = {trans_type: sum(c['total'] for c in items) for trans_type, items in by_category.items()}
+
+        return {
+            'balance_data': AnalysisService._accumulate(opening, daily_net, start_date, end_date, granularity),
+            'expense_data': by_category['expense'],
+            'income_data': by_category['income'],
+            'total_income': totals['income'],
+            'total_expense': totals['expense'],
+        }
     
     @staticmethod
+    @cache.cached
     def get_totals(user_id):
         """Lấy tổng thu nhập và chi tiêu 3 tháng gần nhất"""
         three_months_ago = (datetime.now() - timedelta(days=90)).strftime('%Y-%m-%d')
         
-        conn = db.get_connection()
-        cur = conn.cursor()
-        
-        cur.execute("""
+        result = db.execute_one("""
             SELECT 
-                SUM(CASE WHEN type='income' THEN amount ELSE 0 END) as total_income,
-                SUM(CASE WHEN type='expense' THEN amount ELSE 0 END) as total_expense
-            FROM "Transaction"
-            WHERE userId = ? AND date >= ?
+                SUM(CASE WHEN type='income' THEN total ELSE 0 END) as total_income,
+                SUM(CASE WHEN type='expense' THEN total ELSE 0 END) as total_expense
+            FROM TransactionDaily
+            WHERE userId = ? AND day >= ?
         """, (user_id, three_months_ago))
         
-        result = cur.fetchone()
-        conn.close()
-        
         return {
             'total_income': result['total_income'] or 0,
             'total_expense': result['total_expense'] or 0
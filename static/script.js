@@ -90,3 +90,60 @@ function createCategory() {
       document.getElementById('addCategoryBox').classList.add('hidden');
     });
 }
+
+// ================== AI JOBS ==================
+
+// Gửi request AI (route trả 202 + job_id), poll trạng thái tới khi xong rồi trả về kết quả.
+// onStatus(status) được gọi mỗi lần poll: queued | running
+async function runAIJob(url, options = {}, onStatus = null) {
+  const response = await fetch(url, Object.assign({ method: 'POST' }, options));
+  const job = await response.json();
+  if (response.status !== 202) {
+    return job;
+  }
+
+  while (true) {
+    await new Promise(resolve => setTimeout(resolve, 1000));
+    const status = await (await fetch(job.status_url)).json();
+    if (status.status === 'done' || status.status === 'error') {
+      break;
+    }
+    if (onStatus) onStatus(status.status);
+  }
+  return (await fetch(job.result_url)).json();
+}
+
+// Nhận câu trả lời AI dạng stream (Server-Sent Events), gọi onText(text) với từng đoạn.
+// Resolve {cached} khi server gửi event "done", reject khi lỗi hoặc mất kết nối
+function streamAI(url, onText) {
+  return new Promise((resolve, reject) => {
+    const source = new EventSource(url);
+    source.onmessage = e => onText(JSON.parse(e.data).text);
+    source.addEventListener('done', e => {
+      source.close();
+      resolve(JSON.parse(e.data));
+    });
+    source.addEventListener('error', e => {
+      source.close();
+      reject(new Error(e.data ? JSON.parse(e.data).error : 'Mất kết nối tới server'));
+    });
+  });
+}
+
+// Tạo kế hoạch AI cho mọi mục tiêu bằng một request (kết quả xem ở trang Kế hoạch AI của từng mục tiêu)
+async function generateAllPlans(btn) {
+  const label = btn.textContent;
+  btn.disabled = true;
+  btn.textContent = '⏳ Đang tạo kế hoạch...';
+  try {
+    const data = await runAIJob('/ai/plans/generate');
+    alert(data.success
+      ? `Đã tạo ${data.plans.length} kế hoạch. Mở "Kế hoạch AI" của từng mục tiêu để xem.`
+      : 'Lỗi: ' + (data.error || 'Không thể tạo kế hoạch'));
+  } catch (err) {
+    alert('Lỗi kết nối: ' + err.message);
+  } finally {
+    btn.disabled = false;
+    btn.textContent = label;
+  }
+}
@@ -0,0 +1,41 @@
+"""Cấu hình chung cho test: database tạm + AI offline, đặt trước khi import models/app"""
+import itertools
+import os
+import sys
+import tempfile
+
+import pytest
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+os.environ.update({
+    'DATABASE_PATH': os.path.join(tempfile.mkdtemp(prefix='savings_test_'), 'test.db'),
+    'CACHE_BACKEND': 'none',
+    'AI_BACKEND': 'local',
+    'AI_HEALTH_PROBE': '0',
+    'AI_CACHE_TTL': '0',
+    'USER_CACHE_TTL': '0',
+    'SLOW_QUERY_MS': '0',
+    'LOG_LEVEL': 'WARNING',
+})
+
+_usernames = itertools.count(1)
+
+
+@pytest.fixture(scope='session')
+def database():
+    """Database test (DATABASE_PATH) đã tạo schema"""
+    import init_db
+    init_db.init_database()
+    return os.environ['DATABASE_PATH']
+
+
+@pytest.fixture
+def make_user(database):
+    """Tạo user mới (tên đăng nhập không trùng, mật khẩu 'secret'); trả về dict user"""
+    from models import User
+
+    def make():
+        return User.create(f'user{next(_usernames)}', 'Test', None, 'secret')
+    return make
@@ -0,0 +1,23 @@
+import pytest
+
+from advisor_backend import AdvisorBackend
+from ai_client import FallbackAdvisor
+from local_advisor import LocalAdvisor
+
+
+def test_incomplete_backend_fails_at_instantiation():
+    class OnlyAsk(AdvisorBackend):
+        def ask(self, question, context=None, refresh=False):
+            return {'success': True, 'answer': question}
+
+    with pytest.raises(TypeError, match='analyze_financial_health'):
+        OnlyAsk()
+    with pytest.raises(TypeError):
+        AdvisorBackend()
+
+
+def test_shipped_backends_implement_the_interface():
+    local = LocalAdvisor()
+    assert isinstance(local, AdvisorBackend)
+    assert isinstance(FallbackAdvisor(lambda: None, local), AdvisorBackend)
+    assert local.quick_advice('Tiết kiệm thế nào?')
@@ -0,0 +1,51 @@
+import pytest
+
+from models import SavingsGoal
+
+
+@pytest.fixture
+def client(database):
+    from app import app
+    return app.test_client()
+
+
+def _login(client, user):
+    client.get('/logout')
+    client.post('/login', data={'username': user['username'], 'password': 'secret'})
+
+
+@pytest.fixture
+def streaming(monkeypatch):
+    import app as app_module
+    monkeypatch.setattr(app_module, 'AI_STREAMING', True)
+
+
+def test_stream_routes_are_off_by_default(client, make_user):
+    user = make_user()
+    goal = SavingsGoal.create('Mua xe', 100_000_000, None, user['id'])
+    _login(client, user)
+    assert client.get('/ai/analyze/stream').status_code == 404
+    assert client.get(f"/ai/plan/{goal['id']}/stream").status_code == 404
+    # Giao diện dùng route job khi stream tắt
+    page = client.get(f"/ai/plan/{goal['id']}").get_data(as_text=True)
+    assert 'if (false && window.EventSource)' in page
+
+
+def test_stream_when_enabled(client, make_user, streaming):
+    user = make_user()
+    goal = SavingsGoal.create('Mua xe', 100_000_000, None, user['id'])
+    _login(client, user)
+    page = client.get(f"/ai/plan/{goal['id']}").get_data(as_text=True)
+    assert 'if (true && window.EventSource)' in page
+    response = client.get(f"/ai/plan/{goal['id']}/stream")
+    assert response.status_code == 200
+    assert 'event: done' in response.get_data(as_text=True)
+
+
+def test_plan_routes_refuse_another_users_goal(client, make_user, streaming):
+    owner, other = make_user(), make_user()
+    goal = SavingsGoal.create('Mua nhà', 2_000_000_000, None, owner['id'])
+    _login(client, other)
+    assert client.get(f"/ai/plan/{goal['id']}/stream").status_code == 404
+    assert client.post(f"/ai/plan/{goal['id']}/generate").status_code == 404
+    assert client.get(f"/ai/plan/{goal['id']}").status_code == 302
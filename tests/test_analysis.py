@@ -0,0 +1,45 @@
+from datetime import date, timedelta
+
+import pytest
+
+from models import Category, Transaction
+from services import AnalysisService
+
+
+@pytest.fixture
+def user_id(make_user):
+    return make_user()['id']
+
+
+def _add(user_id, category_id, amount, day, type_):
+    Transaction.create(user_id=user_id, category_id=category_id, amount=amount, note='',
+                       date=day.isoformat(), trans_type=type_)
+
+
+def test_snapshot_totals_match_get_totals_including_future_dated(user_id):
+    food = Category.create('Ăn uống', 'expense', user_id)['id']
+    salary = Category.create('Lương', 'income', user_id)['id']
+    today = date.today()
+    _add(user_id, salary, 1_000_000, today - timedelta(days=10), 'income')
+    _add(user_id, food, 200_000, today - timedelta(days=5), 'expense')
+    _add(user_id, food, 50_000, today + timedelta(days=3), 'expense')      # ghi trước cho ngày tương lai
+    _add(user_id, food, 70_000, today - timedelta(days=200), 'expense')    # ngoài cửa sổ 90 ngày
+
+    snapshot = AnalysisService.snapshot(user_id)
+    totals = AnalysisService.get_totals(user_id)
+    assert snapshot['total_income'] == totals['total_income'] == 1_000_000
+    assert snapshot['total_expense'] == totals['total_expense'] == 250_000
+    assert snapshot['expense_data'] == AnalysisService.category_summary(user_id, 'expense')
+    # Biểu đồ số dư dừng ở hôm nay
+    assert snapshot['balance_data'][-1]['balance'] == 1_000_000 - 200_000 - 70_000
+
+
+def test_snapshot_with_explicit_end_is_bounded(user_id):
+    food = Category.create('Ăn uống', 'expense', user_id)['id']
+    today = date.today()
+    _add(user_id, food, 200_000, today - timedelta(days=5), 'expense')
+    _add(user_id, food, 50_000, today + timedelta(days=3), 'expense')
+
+    snapshot = AnalysisService.snapshot(user_id, start=(today - timedelta(days=30)).isoformat(),
+                                        end=today.isoformat())
+    assert snapshot['total_expense'] == 200_000
@@ -0,0 +1,48 @@
+import os
+import socket
+import subprocess
+import sys
+from datetime import datetime, timedelta
+
+import pytest
+
+from models import AIJob, db
+
+
+@pytest.fixture
+def queue_cls(database):
+    from jobs import JobQueue
+    return JobQueue
+
+
+def _dead_pid() -> int:
+    process = subprocess.Popen([sys.executable, '-c', 'pass'])
+    process.wait()
+    return process.pid
+
+
+def test_queue_full_does_not_leave_queued_rows(queue_cls):
+    from jobs import QueueFull
+
+    jobs = queue_cls(workers=0, max_queue=1)
+    first = jobs.submit(None, 'test', lambda: None)
+    with pytest.raises(QueueFull):
+        jobs.submit(None, 'test', lambda: None)
+    queued = [j for j in AIJob.find_unfinished() if j['worker'] == jobs.worker_id]
+    assert [j['id'] for j in queued] == [first['id']]
+    AIJob.finish(first['id'], 'error', error='test')
+
+
+def test_recover_stale_marks_jobs_of_stopped_processes(queue_cls):
+    host = socket.gethostname()
+    dead = AIJob.create('dead-worker', None, 'test', f'{host}:{_dead_pid()}')
+    alive = AIJob.create('live-worker', None, 'test', f'{host}:{os.getppid()}')
+    old = AIJob.create('old-job', None, 'test', 'other-host:1')
+    db.execute('UPDATE AIJob SET createdAt = ? WHERE id = ?',
+               ((datetime.now() - timedelta(hours=1)).isoformat(), old['id']))
+
+    assert queue_cls(workers=0).recover_stale() >= 2
+    assert AIJob.find_by_id(dead['id'])['status'] == 'error'
+    assert AIJob.find_by_id(old['id'])['status'] == 'error'
+    assert AIJob.find_by_id(alive['id'])['status'] == 'queued'
+    AIJob.finish(alive['id'], 'error', error='test')
@@ -0,0 +1,80 @@
+import pytest
+
+import metrics
+
+
+def test_counter_exposition():
+    registry = metrics.Registry()
+    counter = registry.counter('requests_total', 'Số request', ('endpoint', 'status'))
+    counter.inc('index', '200')
+    counter.inc('index', '200', amount=2)
+    counter.inc('say "hi"\n', '500')
+    assert counter.value('index', '200') == 3
+    assert registry.render().splitlines() == [
+        '# HELP requests_total Số request',
+        '# TYPE requests_total counter',
+        'requests_total{endpoint="index",status="200"} 3',
+        'requests_total{endpoint="say \\"hi\\"\\n",status="500"} 1',
+    ]
+
+
+def test_gauge_exposition_and_failing_callback():
+    registry = metrics.Registry()
+    registry.gauge('pool_in_use', 'Kết nối đang dùng', lambda: 2)
+    registry.gauge('broken', 'Callback lỗi', lambda: 1 / 0)
+    # Gauge lỗi bị bỏ qua thay vì làm hỏng cả lần scrape
+    assert registry.render().splitlines() == [
+        '# HELP pool_in_use Kết nối đang dùng',
+        '# TYPE pool_in_use gauge',
+        'pool_in_use 2',
+    ]
+
+
+def test_histogram_exposition_is_cumulative():
+    registry = metrics.Registry()
+    histogram = registry.histogram('latency_seconds', 'Latency', ('endpoint',), buckets=(0.1, 0.5, 1))
+    for value in (0.05, 0.1, 0.3, 2):
+        histogram.observe(value, 'index')
+    assert histogram.snapshot('index') == {'count': 4, 'sum': pytest.approx(2.45)}
+    lines = registry.render().splitlines()
+    assert lines[:2] == ['# HELP latency_seconds Latency', '# TYPE latency_seconds histogram']
+    assert lines[2:6] == [
+        'latency_seconds_bucket{endpoint="index",le="0.1"} 2',     # le bao gồm cận trên
+        'latency_seconds_bucket{endpoint="index",le="0.5"} 3',
+        'latency_seconds_bucket{endpoint="index",le="1"} 3',
+        'latency_seconds_bucket{endpoint="index",le="+Inf"} 4',
+    ]
+    assert lines[6].startswith('latency_seconds_sum{endpoint="index"} 2.45')
+    assert lines[7] == 'latency_seconds_count{endpoint="index"} 4'
+
+
+def test_unlabelled_histogram_has_no_empty_braces():
+    histogram = metrics.Histogram('size', 'Size', buckets=(1,))
+    histogram.observe(1)
+    assert histogram.render()[2:] == ['size_bucket{le="1"} 1', 'size_bucket{le="+Inf"} 1',
+                                      'size_sum 1.0', 'size_count 1']
+
+
+@pytest.fixture
+def client(database):
+    from app import app
+    return app.test_client()
+
+
+def test_metrics_endpoint_is_local_only_without_token(client, monkeypatch):
+    import app as app_module
+    monkeypatch.setattr(app_module, 'METRICS_TOKEN', '')
+    response = client.get('/metrics')
+    assert response.status_code == 200
+    assert '# TYPE http_requests_total counter' in response.get_data(as_text=True)
+    assert client.get('/metrics', environ_base={'REMOTE_ADDR': '203.0.113.7'}).status_code == 403
+
+
+def test_metrics_endpoint_requires_token_when_set(client, monkeypatch):
+    import app as app_module
+    monkeypatch.setattr(app_module, 'METRICS_TOKEN', 's3cret')
+    assert client.get('/metrics').status_code == 403
+    assert client.get('/metrics', headers={'Authorization': 'Bearer sai'}).status_code == 403
+    response = client.get('/metrics', headers={'Authorization': 'Bearer s3cret'},
+                          environ_base={'REMOTE_ADDR': '203.0.113.7'})
+    assert response.status_code == 200
@@ -0,0 +1,30 @@
+import sqlite3
+
+import pytest
+
+from migrations import MIGRATIONS, LegacySchemaError, applied_versions, run_migrations
+
+
+def test_run_migrations_on_empty_database(tmp_path):
+    conn = sqlite3.connect(tmp_path / 'empty.db')
+    run_migrations(conn)
+    tables = {row[0] for row in conn.execute("SELECT name FROM sqlite_master WHERE type = 'table'")}
+    assert {'User', 'Category', 'Transaction', 'SavingsGoal', 'TransactionDaily', 'AIJob'} <= tables
+    assert set(applied_versions(conn)) == {version for version, _, _ in MIGRATIONS}
+    # Chạy lại không làm gì
+    assert run_migrations(conn) == []
+    conn.close()
+
+
+def test_legacy_text_ids_are_refused_and_left_intact(tmp_path):
+    conn = sqlite3.connect(tmp_path / 'legacy.db')
+    conn.execute('CREATE TABLE "User" (id TEXT PRIMARY KEY, email TEXT)')
+    conn.execute('INSERT INTO "User" VALUES (?, ?)', ('ckx1abc', 'a@example.com'))
+    conn.commit()
+
+    with pytest.raises(LegacySchemaError):
+        run_migrations(conn)
+
+    assert conn.execute('SELECT id, email FROM "User"').fetchall() == [('ckx1abc', 'a@example.com')]
+    assert applied_versions(conn) == {}
+    conn.close()
@@ -0,0 +1,60 @@
+import os
+import subprocess
+import sys
+
+import pytest
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def run_audit(*args):
+    # query_audit tự tạo database tạm, không dùng DATABASE_PATH của conftest
+    env = {k: v for k, v in os.environ.items() if k != 'DATABASE_PATH'}
+    return subprocess.run(
+        [sys.executable, 'query_audit.py', '--transactions', '500', *args],
+        cwd=ROOT, env=env, capture_output=True, text=True,
+    )
+
+
+@pytest.fixture(scope='module')
+def verbose_audit():
+    result = run_audit('--verbose')
+    assert result.returncode == 0, result.stdout + result.stderr
+    return result.stdout
+
+
+def test_audit_passes_with_all_indexes(verbose_audit):
+    assert '✅ Không có câu SQL nóng nào quét toàn bảng' in verbose_audit
+
+
+def test_audit_fails_when_index_dropped():
+    # Câu Category dùng alias (c) trong plan - trước đây bị bỏ sót
+    result = run_audit('--drop-index', 'idx_category_user_type')
+    assert result.returncode == 1, result.stdout + result.stderr
+    assert '❌' in result.stdout
+
+
+@pytest.mark.parametrize('path, fragment', [
+    ('category_summary', 'FROM TransactionDaily r JOIN Category c ON r.categoryId = c.id '
+                         'WHERE r.userId = ? AND r.day >= ? AND r.type = ?'),
+    ('get_totals', "SUM(CASE WHEN type='income' THEN total ELSE 0 END) as total_income"),
+    ('balance_timeline', 'SELECT NULL AS day, SUM(net) AS net FROM ('),
+    ('summary_by_period week', 'FROM TransactionDaily r JOIN Category c ON r.categoryId = c.id '
+                               'WHERE r.userId = ? AND r.day >= ? AND r.day < ?'),
+    ('summary_by_period quarter', 'FROM TransactionMonthly r JOIN Category c ON r.categoryId = c.id'),
+    ('Transaction.find_by_month', 'SELECT t.*, c.name AS categoryName FROM "Transaction" t'),
+    ('Transaction.find_all_by_user', 'SELECT t.id, t.amount, t.date, t.note, t.type, c.name AS categoryName'),
+    ('User.update_name', 'UPDATE "User" SET name = ?'),
+    ('register user', 'INSERT INTO "User"'),
+    ('register categories', 'INSERT INTO Category'),
+    ('register email check', 'SELECT * FROM "User" WHERE email = ?'),
+])
+def test_query_path_is_planned(verbose_audit, path, fragment):
+    assert fragment in verbose_audit, path
+
+
+def test_unfiltered_ai_data_is_flagged(verbose_audit):
+    # get_financial_data_for_ai(None) là skip-scan qua mọi user: phải hiện là câu quét (⚠️ kèm lý do)
+    lines = [line for line in verbose_audit.splitlines()
+             if 'FROM TransactionDaily r LEFT JOIN Category c' in line and 'WHERE r.day >= ?' in line]
+    assert lines and lines[0].startswith('⚠️'), lines
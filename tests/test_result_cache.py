@@ -0,0 +1,32 @@
+from services import MemoryCacheBackend, ResultCache, SQLiteCacheBackend
+
+
+def _counting_cache(backend):
+    cache = ResultCache(backend)
+    calls = []
+
+    @cache.cached
+    def total(user_id):
+        calls.append(user_id)
+        return len(calls)
+    return cache, total, calls
+
+
+def test_memory_backend_is_only_invalidated_in_its_own_process():
+    # Hai "process": mỗi ResultCache một MemoryCacheBackend riêng
+    cache_a, total_a, _ = _counting_cache(MemoryCacheBackend())
+    cache_b, total_b, calls_b = _counting_cache(MemoryCacheBackend())
+    total_a(1), total_b(1)
+    cache_a.invalidate_user(1)           # ghi ở process A
+    total_b(1)
+    assert calls_b == [1]                # B vẫn trả kết quả cũ
+
+
+def test_sqlite_backend_shares_invalidation_between_processes(tmp_path):
+    path = str(tmp_path / 'cache.db')
+    cache_a, total_a, _ = _counting_cache(SQLiteCacheBackend(path))
+    cache_b, total_b, calls_b = _counting_cache(SQLiteCacheBackend(path))
+    total_b(1)
+    cache_a.invalidate_user(1)
+    total_b(1)
+    assert calls_b == [1, 1]
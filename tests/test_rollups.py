@@ -0,0 +1,102 @@
+import pytest
+
+from migrations import rebuild_rollups
+from models import Category, Transaction, db
+
+
+@pytest.fixture
+def user_id(make_user):
+    return make_user()['id']
+
+
+def _add(user_id, category_id, amount, day, type_='expense'):
+    return Transaction.create(user_id=user_id, category_id=category_id, amount=amount, note='',
+                              date=day, trans_type=type_)['id']
+
+
+def _rollups(user_id):
+    """{bảng: {(kỳ, categoryId, type): (total, count)}}"""
+    return {
+        table: {(r[0], r[1], r[2]): (r[3], r[4]) for r in db.execute(
+            f'SELECT {period}, categoryId, type, total, count FROM {table} '
+            f'WHERE userId = ? ORDER BY 1, 2, 3', (user_id,))}
+        for table, period in (('TransactionDaily', 'day'), ('TransactionMonthly', 'month'))
+    }
+
+
+def test_insert_adds_to_daily_and_monthly(user_id):
+    food = Category.create('Ăn uống', 'expense', user_id)['id']
+    _add(user_id, food, 100, '2024-03-05')
+    _add(user_id, food, 50, '2024-03-05')
+    _add(user_id, food, 30, '2024-03-20')
+
+    rollups = _rollups(user_id)
+    assert rollups['TransactionDaily'] == {
+        ('2024-03-05', food, 'expense'): (150, 2),
+        ('2024-03-20', food, 'expense'): (30, 1),
+    }
+    assert rollups['TransactionMonthly'] == {('2024-03', food, 'expense'): (180, 3)}
+
+
+def test_update_moves_amount_between_periods_and_categories(user_id):
+    food = Category.create('Ăn uống', 'expense', user_id)['id']
+    travel = Category.create('Đi lại', 'expense', user_id)['id']
+    kept = _add(user_id, food, 100, '2024-03-05')
+    moved = _add(user_id, food, 40, '2024-03-05')
+
+    db.execute('UPDATE "Transaction" SET amount = ?, date = ?, categoryId = ? WHERE id = ?',
+               (60, '2024-04-01', travel, moved))
+    db.execute('UPDATE "Transaction" SET amount = ? WHERE id = ?', (120, kept))
+
+    rollups = _rollups(user_id)
+    assert rollups['TransactionDaily'] == {
+        ('2024-03-05', food, 'expense'): (120, 1),
+        ('2024-04-01', travel, 'expense'): (60, 1),
+    }
+    assert rollups['TransactionMonthly'] == {
+        ('2024-03', food, 'expense'): (120, 1),
+        ('2024-04', travel, 'expense'): (60, 1),
+    }
+
+
+def test_delete_removes_emptied_rows(user_id):
+    food = Category.create('Ăn uống', 'expense', user_id)['id']
+    first = _add(user_id, food, 100, '2024-03-05')
+    second = _add(user_id, food, 25, '2024-03-06')
+
+    db.execute('DELETE FROM "Transaction" WHERE id = ?', (first,))
+    rollups = _rollups(user_id)
+    assert rollups['TransactionDaily'] == {('2024-03-06', food, 'expense'): (25, 1)}
+    assert rollups['TransactionMonthly'] == {('2024-03', food, 'expense'): (25, 1)}
+
+    db.execute('DELETE FROM "Transaction" WHERE id = ?', (second,))
+    assert _rollups(user_id) == {'TransactionDaily': {}, 'TransactionMonthly': {}}
+
+
+def test_rebuild_reproduces_trigger_totals(user_id, make_user):
+    other = make_user()['id']
+    food = Category.create('Ăn uống', 'expense', user_id)['id']
+    salary = Category.create('Lương', 'income', user_id)['id']
+    other_food = Category.create('Ăn uống', 'expense', other)['id']
+    for day, amount in (('2024-01-31', 10), ('2024-02-01', 20), ('2024-02-01', 5), ('2024-02-29', 7)):
+        _add(user_id, food, amount, day)
+    _add(user_id, salary, 1000, '2024-02-01', 'income')
+    changed = _add(user_id, food, 99, '2024-02-10')
+    db.execute('UPDATE "Transaction" SET amount = 33 WHERE id = ?', (changed,))
+    _add(other, other_food, 500, '2024-02-01')
+
+    from_triggers = _rollups(user_id)
+    other_before = _rollups(other)
+    # Làm lệch rollup rồi tính lại cho riêng user này
+    db.execute('UPDATE TransactionDaily SET total = 0 WHERE userId = ?', (user_id,))
+    db.execute('DELETE FROM TransactionMonthly WHERE userId = ?', (user_id,))
+    with db.transaction() as conn:
+        rebuild_rollups(conn, user_id)
+
+    assert _rollups(user_id) == from_triggers
+    assert _rollups(other) == other_before
+
+    with db.transaction() as conn:
+        rebuild_rollups(conn)
+    assert _rollups(user_id) == from_triggers
+    assert _rollups(other) == other_before
@@ -0,0 +1,54 @@
+import time
+
+import pytest
+
+from models import SavingsGoal, SavingsPlan
+
+
+@pytest.fixture
+def client(database):
+    from app import app
+    return app.test_client()
+
+
+def _login(client, user):
+    client.get('/logout')
+    client.post('/login', data={'username': user['username'], 'password': 'secret'})
+
+
+def _wait(client, job, timeout=10):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        status = client.get(job['status_url']).get_json()
+        if status['status'] in ('done', 'error'):
+            return status
+        time.sleep(0.02)
+    raise AssertionError('job chưa xong')
+
+
+def test_batch_plans_only_touch_the_callers_goals(client, make_user):
+    owner, other = make_user(), make_user()
+    goal = SavingsGoal.create('Mua xe', 100_000_000, None, owner['id'])
+
+    _login(client, owner)
+    response = client.post('/ai/plans/generate')
+    assert response.status_code == 202
+    assert _wait(client, response.get_json())['status'] == 'done'
+    saved = SavingsPlan.find_by_goal(goal['id'])
+    assert saved['userId'] == owner['id']
+
+    # User không có mục tiêu: không dùng mục tiêu của người khác
+    _login(client, other)
+    response = client.post('/ai/plans/generate')
+    assert response.status_code == 400
+    assert SavingsPlan.find_by_goal(goal['id']) == saved
+
+
+def test_save_many_ignores_goals_of_other_users(make_user):
+    owner, other = make_user(), make_user()
+    goal = SavingsGoal.create('Du lịch', 20_000_000, None, owner['id'])
+    assert SavingsPlan.save_many(owner['id'], [{'goal_id': goal['id'], 'plan': 'A', 'monthly_amount': 1}]) == 1
+
+    assert SavingsPlan.save_many(other['id'], [{'goal_id': goal['id'], 'plan': 'B', 'monthly_amount': 2}]) == 0
+    saved = SavingsPlan.find_by_goal(goal['id'])
+    assert (saved['userId'], saved['plan']) == (owner['id'], 'A')
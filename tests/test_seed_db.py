@@ -0,0 +1,15 @@
+import os
+
+import pytest
+
+import seed_db
+
+
+def test_reset_refuses_app_database(database):
+    app_db = os.environ['DATABASE_PATH']
+    size = os.path.getsize(app_db)
+    with pytest.raises(SystemExit) as exc:
+        seed_db.main(['--db', app_db, '--reset', '--users', '1'])
+    assert exc.value.code == 2
+    assert os.path.getsize(app_db) == size
+
@@ -0,0 +1,159 @@
+import threading
+import time
+
+import pytest
+
+from throttle import CallGuard, SingleFlight, Throttled, TokenBucket
+
+
+def test_zero_rate_disables_limiting():
+    bucket = TokenBucket(0, 1)
+    for _ in range(100):
+        assert bucket.acquire(timeout=0) < 0.01
+
+
+def test_zero_rate_still_honours_block():
+    bucket = TokenBucket(0, 1)
+    bucket.block(5)
+    with pytest.raises(Throttled):
+        bucket.acquire(timeout=0.01)
+
+
+def test_rate_limit_throttles_after_burst():
+    bucket = TokenBucket(0.001, 2)
+    bucket.acquire(timeout=0)
+    bucket.acquire(timeout=0)
+    with pytest.raises(Throttled):
+        bucket.acquire(timeout=0.01)
+
+
+@pytest.mark.parametrize('rate, capacity', [(-1, 10), (1, 0)])
+def test_invalid_configuration_is_rejected(rate, capacity):
+    with pytest.raises(ValueError):
+        TokenBucket(rate, capacity)
+
+
+def test_token_bucket_refills_at_rate_up_to_capacity():
+    bucket = TokenBucket(100, 2)          # 1 token mỗi 10 ms
+    bucket.acquire(timeout=0)
+    bucket.acquire(timeout=0)
+    waited = bucket.acquire(timeout=1)    # phải chờ token được nạp lại
+    assert 0.005 < waited < 0.5
+
+    time.sleep(0.1)                       # đủ cho 10 token nhưng chỉ giữ tối đa capacity
+    bucket.acquire(timeout=0)
+    bucket.acquire(timeout=0)
+    with pytest.raises(Throttled):
+        bucket.acquire(timeout=0)
+
+
+def _concurrent(fn, count):
+    """Chạy ``fn`` trên ``count`` thread; trả về list (kết quả | exception) theo thứ tự thread"""
+    results = [None] * count
+
+    def run(i):
+        try:
+            results[i] = fn()
+        except Exception as e:
+            results[i] = e
+
+    threads = [threading.Thread(target=run, args=(i,)) for i in range(count)]
+    for t in threads:
+        t.start()
+    return threads, results
+
+
+def test_single_flight_collapses_concurrent_calls():
+    flight = SingleFlight()
+    started, release = threading.Event(), threading.Event()
+    calls = []
+
+    def slow():
+        calls.append(1)
+        started.set()
+        release.wait(5)
+        return 'kết quả'
+
+    leader, leader_result = _concurrent(lambda: flight.do('k', slow), 1)
+    assert started.wait(5)
+    followers, follower_results = _concurrent(lambda: flight.do('k', slow, timeout=5), 4)
+    time.sleep(0.1)                       # các follower đã vào hàng chờ
+    release.set()
+    for t in leader + followers:
+        t.join(5)
+
+    assert len(calls) == 1
+    assert leader_result == [('kết quả', False)]
+    assert follower_results == [('kết quả', True)] * 4
+    # Lời gọi xong thì khóa được giải phóng: lần sau chạy lại
+    assert flight.do('k', lambda: 'mới') == ('mới', False)
+
+
+def test_single_flight_shares_the_error():
+    flight = SingleFlight()
+    started, release = threading.Event(), threading.Event()
+
+    def failing():
+        started.set()
+        release.wait(5)
+        raise RuntimeError('upstream lỗi')
+
+    leader, leader_result = _concurrent(lambda: flight.do('k', failing), 1)
+    assert started.wait(5)
+    followers, follower_results = _concurrent(lambda: flight.do('k', failing, timeout=5), 2)
+    time.sleep(0.1)
+    release.set()
+    for t in leader + followers:
+        t.join(5)
+    assert all(isinstance(r, RuntimeError) for r in leader_result + follower_results)
+
+
+def test_call_guard_counts_coalesced_calls():
+    guard = CallGuard(rate_per_min=6000, burst=10, max_concurrency=4, max_wait=1)
+    started, release = threading.Event(), threading.Event()
+
+    def slow():
+        started.set()
+        release.wait(5)
+        return 42
+
+    leader, _ = _concurrent(lambda: guard.call('prompt', slow), 1)
+    assert started.wait(5)
+    followers, results = _concurrent(lambda: guard.call('prompt', slow), 3)
+    time.sleep(0.1)
+    release.set()
+    for t in leader + followers:
+        t.join(5)
+    assert results == [42] * 3
+    assert guard.stats()['calls'] == 1
+    assert guard.stats()['coalesced'] == 3
+
+
+def test_call_guard_rejects_when_slots_stay_busy():
+    guard = CallGuard(rate_per_min=6000, burst=10, max_concurrency=1, max_wait=0.05)
+    started, release = threading.Event(), threading.Event()
+
+    def hold():
+        started.set()
+        release.wait(5)
+
+    holder, _ = _concurrent(lambda: guard.call('a', hold), 1)
+    assert started.wait(5)
+    with pytest.raises(Throttled):
+        guard.call('b', lambda: None)
+    release.set()
+    holder[0].join(5)
+    assert guard.stats()['rejected'] == 1
+
+
+def test_quota_error_blocks_the_bucket():
+    guard = CallGuard(rate_per_min=6000, burst=10, max_wait=0.05, quota_cooldown=30)
+
+    def exhausted():
+        raise RuntimeError('429 Resource has been exhausted (quota)')
+
+    with pytest.raises(RuntimeError):
+        guard.call('a', exhausted)
+    with pytest.raises(Throttled):
+        guard.call('b', lambda: None)
+    assert guard.stats()['quota_errors'] == 1
@@ -0,0 +1,92 @@
+import base64
+import json
+
+import pytest
+
+from models import Category, Transaction, db
+
+
+@pytest.fixture
+def client(database):
+    from app import app
+    return app.test_client()
+
+
+@pytest.fixture
+def user(make_user):
+    return make_user()
+
+
+def _insert(user_id, category_id, day, created_at, count):
+    """Giao dịch trùng (date, createdAt) - chỉ id phân biệt thứ tự"""
+    for i in range(count):
+        db.execute(
+            'INSERT INTO "Transaction" (userId, categoryId, amount, note, date, type, createdAt, updatedAt) '
+            'VALUES (?, ?, ?, ?, ?, ?, ?, ?)',
+            (user_id, category_id, 1000 + i, '', day, 'expense', created_at, created_at))
+
+
+def _all_pages(user_id, limit):
+    ids, cursor, pages = [], None, 0
+    while True:
+        items, cursor = Transaction.page_by_user(user_id, limit, cursor)
+        ids.extend(item['id'] for item in items)
+        pages += 1
+        if cursor is None:
+            return ids, pages
+
+
+def _encode(value) -> str:
+    return base64.urlsafe_b64encode(json.dumps(value).encode()).decode().rstrip('=')
+
+
+def test_paging_across_ties_has_no_duplicates_or_gaps(user):
+    food = Category.create('Ăn uống', 'expense', user['id'])['id']
+    _insert(user['id'], food, '2024-05-02', '2024-05-02T08:00:00', 4)
+    _insert(user['id'], food, '2024-05-01', '2024-05-01T08:00:00', 7)   # 7 dòng trùng hẳn (date, createdAt)
+    _insert(user['id'], food, '2024-05-01', '2024-05-01T07:00:00', 2)
+
+    expected = [r['id'] for r in db.execute(
+        'SELECT id FROM "Transaction" WHERE userId = ? ORDER BY date DESC, createdAt DESC, id DESC',
+        (user['id'],))]
+    for limit in (1, 3, 5, 13, 50):
+        ids, pages = _all_pages(user['id'], limit)
+        assert ids == expected, limit
+        assert pages == max(1, -(-len(expected) // limit))
+
+
+def test_cursor_round_trip():
+    row = {'date': '2024-05-01', 'createdAt': '2024-05-01T08:00:00.123456', 'id': 42}
+    cursor = Transaction.encode_cursor(row)
+    assert '=' not in cursor
+    assert Transaction.decode_cursor(cursor) == ['2024-05-01', '2024-05-01T08:00:00.123456', 42]
+
+
+def test_api_cursor_continues_where_page_stopped(client, user):
+    food = Category.create('Ăn uống', 'expense', user['id'])['id']
+    _insert(user['id'], food, '2024-05-01', '2024-05-01T08:00:00', 5)
+    client.post('/login', data={'username': user['username'], 'password': 'secret'})
+
+    first = client.get('/api/transactions?limit=3').get_json()
+    second = client.get(f"/api/transactions?limit=3&cursor={first['next_cursor']}").get_json()
+    ids = [i['id'] for i in first['items'] + second['items']]
+    assert len(ids) == len(set(ids)) == 5
+    assert second['next_cursor'] is None
+
+
+@pytest.mark.parametrize('cursor', [
+    'not-base64!!',
+    base64.urlsafe_b64encode(b'\xff\xfe').decode(),            # không phải UTF-8
+    _encode({'date': '2024-05-01'}),
+    _encode(['2024-05-01', '2024-05-01T08:00:00']),
+    _encode(['2024-05-01', '2024-05-01T08:00:00', 'x']),
+    _encode(None),
+    _encode('abc'),
+    _encode(['2024-05-01', '2024-05-01T08:00:00', 10 ** 30]),    # tràn INTEGER của SQLite
+    base64.urlsafe_b64encode(b'["2024-05-01","t",1e400]').decode(),   # inf
+])
+def test_malformed_cursor_is_400(client, user, cursor):
+    client.post('/login', data={'username': user['username'], 'password': 'secret'})
+    response = client.get('/api/transactions', query_string={'cursor': cursor})
+    assert response.status_code == 400
+    assert 'error' in response.get_json()
@@ -0,0 +1,79 @@
+import pytest
+
+from models import Category, db
+
+
+@pytest.fixture
+def user_id(make_user):
+    return make_user()['id']
+
+
+@pytest.fixture
+def writes():
+    """user_id nhận được qua write listener (theo thứ tự)"""
+    seen = []
+    db.add_write_listener(seen.append)
+    yield seen
+    db._write_listeners.remove(seen.append)
+
+
+def _names(user_id):
+    return {c['name'] for c in Category.find_all(user_id, 'expense')}
+
+
+def test_inner_failure_rolls_back_only_its_savepoint(user_id):
+    with db.transaction():
+        Category.create('Ngoài', 'expense', user_id)
+        with pytest.raises(RuntimeError):
+            with db.transaction():
+                Category.create('Trong', 'expense', user_id)
+                raise RuntimeError('lỗi bên trong')
+        Category.create('Sau', 'expense', user_id)
+    assert _names(user_id) == {'Ngoài', 'Sau'}
+    assert not db.in_transaction()
+
+
+def test_nested_scopes_share_one_connection(user_id):
+    with db.transaction() as outer:
+        with db.transaction() as inner:
+            assert inner is outer
+            Category.create('Trong', 'expense', user_id)
+        # Chưa commit: kết nối khác chưa thấy dòng mới
+        other = db.get_connection()
+        try:
+            count = other.execute('SELECT COUNT(*) FROM Category WHERE userId = ?', (user_id,)).fetchone()[0]
+        finally:
+            other.close()
+        assert count == 0
+    assert _names(user_id) == {'Trong'}
+
+
+def test_notify_write_waits_for_outer_commit(user_id, writes):
+    with db.transaction():
+        Category.create('A', 'expense', user_id)
+        with db.transaction():
+            Category.create('B', 'expense', user_id)
+        assert writes == []
+    # Mỗi user chỉ báo một lần, sau khi commit
+    assert writes == [user_id]
+
+
+def test_failed_transaction_rolls_back_and_does_not_notify(user_id, writes):
+    with pytest.raises(ValueError):
+        with db.transaction():
+            Category.create('A', 'expense', user_id)
+            with db.transaction():
+                Category.create('B', 'expense', user_id)
+            raise ValueError('lỗi')
+    assert _names(user_id) == set()
+    assert writes == []
+    # Transaction tiếp theo trên cùng thread không mang theo pending write cũ
+    with db.transaction():
+        Category.create('C', 'expense', user_id)
+    assert writes == [user_id]
+    assert _names(user_id) == {'C'}
+
+
+def test_write_outside_transaction_notifies_immediately(user_id, writes):
+    Category.create('A', 'expense', user_id)
+    assert writes == [user_id]
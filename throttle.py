@@ -0,0 +1,182 @@
+"""
+Giới hạn lời gọi tới dịch vụ ngoài (Gemini): gộp request trùng, rate limit, giới hạn đồng thời.
+
+- SingleFlight: các lời gọi cùng khóa khi một lời gọi đang chạy sẽ chờ và dùng chung kết quả.
+- TokenBucket: tối đa ``rate`` lời gọi/giây, cho phép dồn tới ``capacity``.
+- CallGuard: ghép cả hai + semaphore giới hạn số lời gọi đồng thời trong process; caller
+  chờ tối đa ``max_wait`` giây rồi nhận Throttled thay vì treo vô hạn.
+"""
+import threading
+import time
+from contextlib import contextmanager
+from typing import Any, Callable, Dict
+
+
+class Throttled(Exception):
+    """Lời gọi bị từ chối vì vượt giới hạn (rate limit, đồng thời hoặc đang bị khóa do hết quota)"""
+
+
+class SingleFlight:
+    """Gộp các lời gọi trùng khóa đang chạy đồng thời thành một"""
+
+    class _Call:
+        def __init__(self):
+            self.done = threading.Event()
+            self.result = None
+            self.error = None
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._calls: Dict[str, 'SingleFlight._Call'] = {}
+
+    def do(self, key: str, fn: Callable[[], Any], timeout: float = None):
+        """
+        Trả về (kết quả, shared). ``shared=True`` khi kết quả lấy từ lời gọi của thread khác.
+        Lỗi của lời gọi gốc được ném lại cho mọi caller đang chờ.
+        """
+        with self._lock:
+            call = self._calls.get(key)
+            leader = call is None
+            if leader:
+                call = self._calls[key] = self._Call()
+
+        if not leader:
+            if not call.done.wait(timeout):
+                raise Throttled('Quá thời gian chờ request trùng đang chạy')
+            if call.error is not None:
+                raise call.error
+            return call.result, True
+
+        try:
+            call.result = fn()
+            return call.result, False
+        except Exception as e:
+            call.error = e
+            raise
+        finally:
+            with self._lock:
+                del self._calls[key]
+            call.done.set()
+
+
+class TokenBucket:
+    """Rate limiter: ``rate`` token/giây, tối đa ``capacity`` token; ``rate`` 0 = không giới hạn"""
+
+    def __init__(self, rate: float, capacity: float):
+        if rate < 0:
+            raise ValueError(f'rate phải >= 0 (0 = không giới hạn), nhận {rate}')
+        if rate > 0 and capacity < 1:
+            raise ValueError(f'capacity (burst) phải >= 1 khi có giới hạn rate, nhận {capacity}')
+        self.rate = rate
+        self.capacity = capacity
+        self._tokens = capacity
+        self._updated = time.monotonic()
+        self._blocked_until = 0.0
+        self._lock = threading.Lock()
+
+    def _refill(self, now: float):
+        self._tokens = min(self.capacity, self._tokens + (now - self._updated) * self.rate)
+        self._updated = now
+
+    def acquire(self, timeout: float) -> float:
+        """
+        Lấy một token, chờ tối đa ``timeout`` giây. Trả về số giây đã chờ;
+        ném Throttled nếu không kịp có token.
+        """
+        start = time.monotonic()
+        deadline = start + timeout
+        while True:
+            with self._lock:
+                now = time.monotonic()
+                self._refill(now)
+                if now >= self._blocked_until and (not self.rate or self._tokens >= 1):
+                    if self.rate:
+                        self._tokens -= 1
+                    return now - start
+                wait = self._blocked_until - now
+                if self.rate:
+                    wait = max(wait, (1 - self._tokens) / self.rate)
+            if now + wait > deadline:
+                raise Throttled('Vượt giới hạn số request AI, vui lòng thử lại sau')
+            time.sleep(wait)
+
+    def block(self, seconds: float):
+        """Ngừng cấp token trong ``seconds`` giây (vd. sau khi upstream báo hết quota)"""
+        with self._lock:
+            self._blocked_until = max(self._blocked_until, time.monotonic() + seconds)
+            self._tokens = 0
+
+
+class CallGuard:
+    """SingleFlight + TokenBucket + giới hạn đồng thời, kèm bộ đếm"""
+
+    def __init__(self, rate_per_min: float = 60, burst: int = 10, max_concurrency: int = 4,
+                 max_wait: float = 10, quota_cooldown: float = 30):
+        self.bucket = TokenBucket(rate_per_min / 60.0, burst)
+        self.flight = SingleFlight()
+        self.max_concurrency = max_concurrency
+        self.max_wait = max_wait
+        self.quota_cooldown = quota_cooldown
+        self._slots = threading.BoundedSemaphore(max_concurrency)
+        self._lock = threading.Lock()
+        self.counters = {
+            'calls': 0,         # lời gọi thực sự gửi lên upstream
+            'coalesced': 0,     # lời gọi dùng chung kết quả của request trùng
+            'throttled': 0,     # phải chờ token/slot nhưng vẫn được chạy
+            'rejected': 0,      # bị từ chối sau max_wait (Throttled)
+            'quota_errors': 0,  # upstream báo hết quota -> tạm khóa quota_cooldown giây
+        }
+
+    def _count(self, name: str):
+        with self._lock:
+            self.counters[name] += 1
+
+    @contextmanager
+    def slot(self):
+        """Giữ một lượt gọi upstream: token + slot đồng thời, chờ tối đa max_wait"""
+        start = time.monotonic()
+        try:
+            waited = self.bucket.acquire(self.max_wait) > 0.001
+            if not self._slots.acquire(blocking=False):
+                waited = True
+                remaining = self.max_wait - (time.monotonic() - start)
+                if not self._slots.acquire(timeout=max(remaining, 0)):
+                    raise Throttled('AI đang xử lý quá nhiều request, vui lòng thử lại sau')
+        except Throttled:
+            self._count('rejected')
+            raise
+        if waited:
+            self._count('throttled')
+        self._count('calls')
+        try:
+            yield
+        except Exception as e:
+            if is_quota_error(e):
+                self._count('quota_errors')
+                self.bucket.block(self.quota_cooldown)
+            raise
+        finally:
+            self._slots.release()
+
+    def call(self, key: str, fn: Callable[[], Any]):
+        """Chạy ``fn`` qua singleflight theo ``key`` và trong một slot; trả về kết quả"""
+        def guarded():
+            with self.slot():
+                return fn()
+
+        result, shared = self.flight.do(key, guarded, timeout=self.max_wait + 120)
+        if shared:
+            self._count('coalesced')
+        return result
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            counters = dict(self.counters)
+        counters['max_concurrency'] = self.max_concurrency
+        return counters
+
+
+def is_quota_error(error: Exception) -> bool:
+    """Lỗi hết quota/429 từ upstream (google.api_core.exceptions.ResourceExhausted, ...)"""
+    text = f'{type(error).__name__} {error}'.lower()
+    return 'resourceexhausted' in text or 'quota' in text or '429' in text
@@ -1,5 +1,5 @@
-from datetime import datetime
-from typing import Any
+from datetime import datetime, date, timedelta
+from typing import Any, Optional, Tuple, Union
 
 def format_currency(amount: float) -> str:
     """Format số tiền thành VND"""
@@ -24,3 +24,52 @@ def validate_amount(amount: Any) -> float:
         return value
     except (TypeError, ValueError) as e:
         raise ValueError(f"Số tiền không hợp lệ: {amount}")
+
+def _parse_anchor(anchor: Union[None, str, date, datetime]) -> date:
+    if anchor is None:
+        return date.today()
+    if isinstance(anchor, datetime):
+        return anchor.date()
+    if isinstance(anchor, date):
+        return anchor
+    if len(anchor) == 7:  # 'YYYY-MM'
+        return datetime.strptime(anchor, '%Y-%m').date()
+    return datetime.fromisoformat(anchor[:10]).date()
+
+def _add_months(d: date, months: int) -> date:
+    """Ngày 1 của tháng cách d ``months`` tháng"""
+    index = d.year * 12 + (d.month - 1) + months
+    return date(index // 12, index % 12 + 1, 1)
+
+def period_range(period: str = 'month', anchor: Union[None, str, date, datetime] = None,
+                 fiscal_start_month: int = 1) -> Tuple[str, str]:
+    """
+    Khoảng ngày nửa mở [start, end) chứa ``anchor`` cho kỳ ``period``:
+    'day' | 'week' (bắt đầu thứ Hai) | 'month' | 'quarter' | 'year' | 'fiscal_year'.
+    Trả về chuỗi ISO 'YYYY-MM-DD' để so sánh trực tiếp với cột date (dùng được index).
+    """
+    d = _parse_anchor(anchor)
+    if period == 'day':
+        start, end = d, d + timedelta(days=1)
+    elif period == 'week':
+        start = d - timedelta(days=d.weekday())
+        end = start + timedelta(days=7)
+    elif period == 'month':
+        start = d.replace(day=1)
+        end = _add_months(start, 1)
+    elif period == 'quarter':
+        start = date(d.year, (d.month - 1) // 3 * 3 + 1, 1)
+        end = _add_months(start, 3)
+    elif period == 'year':
+        start, end = date(d.year, 1, 1), date(d.year + 1, 1, 1)
+    elif period == 'fiscal_year':
+        year = d.year if d.month >= fiscal_start_month else d.year - 1
+        start = date(year, fiscal_start_month, 1)
+        end = _add_months(start, 12)
+    else:
+        raise ValueError(f"Kỳ không hợp lệ: {period}")
+    return start.isoformat(), end.isoformat()
+
+def month_range(month: Optional[str] = None) -> Tuple[str, str]:
+    """Khoảng [ngày 1 tháng này, ngày 1 tháng sau) cho tháng 'YYYY-MM'"""
+    return period_range('month', month)